@@ -0,0 +1,227 @@
+import math
+import numpy as np
+
+from API.STU_Common import AsPoint
+from API.ObstacleMap import StoreSync
+from API.ObstacleProximity import DEFAULT_ENTITY_RADIUS_M
+
+# Cell cost values
+FREE = 0
+# Inside the rover radius of an obstacle; the rover's center cannot be here
+INSCRIBED = 253
+# Inside an obstacle
+LETHAL = 254
+
+
+class Costmap:
+    '''
+    Rasterized cost grid over the LocalCoordinateOrigin XY frame.
+
+    Obstacles are stamped as disks, inflated by the rover radius (INSCRIBED) and by a
+    further soft margin whose cost falls off with distance. The grid is split into
+    square tiles; adding or removing a disk only marks the tiles it touches dirty, and
+    Update() re-rasterizes just those tiles. Lookups call Update() themselves.
+
+    cost is indexed [row, col] = [y, x], with cell (0, 0) at (x_min, y_min).
+    '''
+    def __init__(self, x_min: float, y_min: float, width_m: float, height_m: float,
+                 resolution_m: float = 1.0, rover_radius_m: float = DEFAULT_ENTITY_RADIUS_M,
+                 inflation_m: float = 5.0, tile_cells: int = 64):
+        self.x_min = x_min
+        self.y_min = y_min
+        self.resolution = resolution_m
+        self.rover_radius = rover_radius_m
+        self.inflation = inflation_m
+        self.tile_cells = tile_cells
+        self.nx = int(math.ceil(width_m / resolution_m))
+        self.ny = int(math.ceil(height_m / resolution_m))
+        self.cost = np.zeros((self.ny, self.nx), dtype=np.uint8)
+        # disk id -> (x, y, radius)
+        self.disks: dict[int, tuple[float, float, float]] = {}
+        # (tile_row, tile_col) -> ids of disks whose inflated footprint touches the tile
+        self.tile_disks: dict[tuple[int, int], set[int]] = {}
+        self.dirty_tiles: set[tuple[int, int]] = set()
+        self._next_disk_id = 0
+        # Store obstacles taken in by SyncFromStore, and the disk id each one was stamped as
+        self._store_sync = StoreSync()
+        self._store_disk_ids: list[int] = []
+        # Bumped on every Update() that changed the grid
+        self.version = 0
+
+    @classmethod
+    def Around(cls, center, half_size_m: float, **kwargs) -> "Costmap":
+        '''
+        Builds a square costmap centered on an XY point.
+        '''
+        x, y = AsPoint(center)
+        return cls(x - half_size_m, y - half_size_m, 2.0 * half_size_m, 2.0 * half_size_m, **kwargs)
+
+    # Coordinate helpers
+
+    def WorldToCell(self, p) -> tuple[int, int]:
+        '''
+        Returns the (row, col) of the cell containing an XY point; may be out of bounds.
+        '''
+        x, y = AsPoint(p)
+        return (int(math.floor((y - self.y_min) / self.resolution)),
+                int(math.floor((x - self.x_min) / self.resolution)))
+
+    def CellToWorld(self, row: int, col: int) -> tuple[float, float]:
+        '''
+        Returns the XY of a cell's center.
+        '''
+        return (self.x_min + (col + 0.5) * self.resolution, self.y_min + (row + 0.5) * self.resolution)
+
+    def InBounds(self, row: int, col: int) -> bool:
+        return 0 <= row < self.ny and 0 <= col < self.nx
+
+    # Editing
+
+    def _Reach(self, r: float) -> float:
+        return r + self.rover_radius + self.inflation
+
+    def _TilesTouching(self, x: float, y: float, reach: float):
+        r0, c0 = self.WorldToCell((x - reach, y - reach))
+        r1, c1 = self.WorldToCell((x + reach, y + reach))
+        r0, c0 = max(r0, 0), max(c0, 0)
+        r1, c1 = min(r1, self.ny - 1), min(c1, self.nx - 1)
+        if r0 > r1 or c0 > c1:
+            return
+        t = self.tile_cells
+        for tr in range(r0 // t, r1 // t + 1):
+            for tc in range(c0 // t, c1 // t + 1):
+                yield (tr, tc)
+
+    def AddDisk(self, x: float, y: float, radius: float) -> int:
+        '''
+        Adds a circular obstacle and returns its id for RemoveDisk().
+        '''
+        disk_id = self._next_disk_id
+        self._next_disk_id += 1
+        self.disks[disk_id] = (x, y, radius)
+        for tile in self._TilesTouching(x, y, self._Reach(radius)):
+            self.tile_disks.setdefault(tile, set()).add(disk_id)
+            self.dirty_tiles.add(tile)
+        return disk_id
+
+    def RemoveDisk(self, disk_id: int):
+        x, y, radius = self.disks.pop(disk_id)
+        for tile in self._TilesTouching(x, y, self._Reach(radius)):
+            self.tile_disks[tile].discard(disk_id)
+            self.dirty_tiles.add(tile)
+
+    def AddDisks(self, circles) -> list[int]:
+        '''
+        Adds an (N,3) array of [x, y, radius] rows, e.g. static map data.
+        '''
+        return [self.AddDisk(x, y, r) for x, y, r in np.asarray(circles, dtype=np.float64).reshape(-1, 3).tolist()]
+
+    def SyncFromStore(self, store) -> int:
+        '''
+        Brings the map up to date with an ObstacleMap.ObstacleStore, which holds the
+        fleet's merged lidar obstacles. Only obstacles that are new or have moved since
+        the last sync are re-stamped. Returns how many disks were changed.
+        '''
+        circles, changed, n_old = self._store_sync.Pull(store)
+        for i in changed:
+            self.RemoveDisk(self._store_disk_ids[i])
+            self._store_disk_ids[i] = self.AddDisk(*circles[i])
+        for x, y, r in circles[n_old:].tolist():
+            self._store_disk_ids.append(self.AddDisk(x, y, r))
+        return len(changed) + len(circles) - n_old
+
+    def Update(self) -> int:
+        '''
+        Re-rasterizes every dirty tile. Returns how many tiles were redrawn.
+        '''
+        if not self.dirty_tiles:
+            return 0
+        t = self.tile_cells
+        for tr, tc in self.dirty_tiles:
+            r0, c0 = tr * t, tc * t
+            r1, c1 = min(r0 + t, self.ny), min(c0 + t, self.nx)
+            block = self.cost[r0:r1, c0:c1]
+            block[...] = FREE
+            ids = self.tile_disks.get((tr, tc))
+            if not ids:
+                continue
+            xs = self.x_min + (np.arange(c0, c1) + 0.5) * self.resolution
+            ys = self.y_min + (np.arange(r0, r1) + 0.5) * self.resolution
+            for disk_id in ids:
+                x, y, radius = self.disks[disk_id]
+                # Distance from each cell center to the disk's edge
+                d = np.hypot(xs[None, :] - x, ys[:, None] - y) - radius
+                np.maximum(block, self._CostFromDistance(d), out=block)
+        redrawn = len(self.dirty_tiles)
+        self.dirty_tiles.clear()
+        self.version += 1
+        return redrawn
+
+    def _CostFromDistance(self, d: np.ndarray) -> np.ndarray:
+        cost = np.zeros(d.shape, dtype=np.uint8)
+        if self.inflation > 0.0:
+            soft = (d > self.rover_radius) & (d <= self.rover_radius + self.inflation)
+            falloff = 1.0 - (d[soft] - self.rover_radius) / self.inflation
+            cost[soft] = np.ceil(falloff * (INSCRIBED - 1)).astype(np.uint8)
+        cost[d <= self.rover_radius] = INSCRIBED
+        cost[d <= 0.0] = LETHAL
+        return cost
+
+    # Lookups
+
+    def Cost(self, p) -> int:
+        '''
+        Returns the cost of the cell containing an XY point; LETHAL outside the map.
+        '''
+        self.Update()
+        row, col = self.WorldToCell(p)
+        if not self.InBounds(row, col):
+            return LETHAL
+        return int(self.cost[row, col])
+
+    def Costs(self, points) -> np.ndarray:
+        '''
+        Returns the costs for an (N,2) array of XY points; LETHAL outside the map.
+        '''
+        self.Update()
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        cols = np.floor((points[:, 0] - self.x_min) / self.resolution).astype(np.int64)
+        rows = np.floor((points[:, 1] - self.y_min) / self.resolution).astype(np.int64)
+        inside = (rows >= 0) & (rows < self.ny) & (cols >= 0) & (cols < self.nx)
+        costs = np.full(len(points), LETHAL, dtype=np.uint8)
+        costs[inside] = self.cost[rows[inside], cols[inside]]
+        return costs
+
+    def IsFree(self, p) -> bool:
+        '''
+        Returns whether the rover's center can be at an XY point.
+        '''
+        return self.Cost(p) < INSCRIBED
+
+    def Region(self, x0: float, y0: float, x1: float, y1: float) -> np.ndarray:
+        '''
+        Returns a read-only view of the cells covering an XY rectangle, clipped to the map.
+        '''
+        self.Update()
+        r0, c0 = self.WorldToCell((min(x0, x1), min(y0, y1)))
+        r1, c1 = self.WorldToCell((max(x0, x1), max(y0, y1)))
+        view = self.cost[max(r0, 0):max(r1 + 1, 0), max(c0, 0):max(c1 + 1, 0)]
+        view.flags.writeable = False
+        return view
+
+    def RegionMaxCost(self, x0: float, y0: float, x1: float, y1: float) -> int:
+        region = self.Region(x0, y0, x1, y1)
+        return int(region.max()) if region.size else LETHAL
+
+    def SegmentMaxCost(self, a, b) -> int:
+        '''
+        Returns the highest cost along the straight segment a->b, sampled every half cell.
+        '''
+        ax, ay = AsPoint(a)
+        bx, by = AsPoint(b)
+        steps = max(1, int(math.ceil(math.hypot(bx - ax, by - ay) / (0.5 * self.resolution))))
+        t = np.linspace(0.0, 1.0, steps + 1)
+        return int(self.Costs(np.column_stack((ax + (bx - ax) * t, ay + (by - ay) * t))).max())
+
+    def __repr__(self):
+        return f"<Costmap {self.nx}x{self.ny} @ {self.resolution}m | {len(self.disks)} disks, {len(self.dirty_tiles)} dirty tiles>"
@@ -1,4 +1,4 @@
-import os, sys, time, datetime, traceback
+import os, sys, time, datetime, traceback, json
 import spaceteams as st
 import numpy as np
 
@@ -54,9 +54,10 @@ class EntityBehavior:
             st.logger_warn(f"Entity {self.en.getName()} does not have a camera; camera functions will not work.")
         self.command_reactions = dict()
         self.camera_capture_reaction = None
-        #TODO may shift this to params so we can read the active commands from the 
-        #   mission manager through entity telemetry
+        # Mirrored to the "ActiveCommands" entity param, so the mission manager can read
+        # them through EntityTelemetry.GetActiveCommands (e.g. when resuming a saved task graph)
         self.active_commands = dict()
+        self._PublishActiveCommands()
     
 
     def _handleCommandReceived(self, payload : st.ParamMap, timestamp : st.timestamp):
@@ -78,6 +79,7 @@ class EntityBehavior:
             return
         # Store the command locally
         self.active_commands[commandType] = command
+        self._PublishActiveCommands()
         # Run the reaction for this command
         self.command_reactions[commandType](command)
 
@@ -125,6 +127,7 @@ class EntityBehavior:
         #                       "Entity Behavior", st.Severity.Info)
         if(self.HasComms()):
             del self.active_commands[command_type]
+            self._PublishActiveCommands()
             st.SimGlobals_DispatchEvent(commandID + "_Complete", payload)
             return True
         else:   
@@ -155,12 +158,27 @@ class EntityBehavior:
         #                       "Entity Behavior", st.Severity.Info)
         if(self.HasComms()):
             del self.active_commands[command_type]
+            self._PublishActiveCommands()
             st.SimGlobals_DispatchEvent(commandID + "_Fail", payload)
             return True
         else:   
             return False
     
     
+    def _PublishActiveCommands(self):
+        '''
+        Internal function; do not use.
+        Writes the active commands to the "ActiveCommands" entity param, as a JSON object of command type -> TaskID.
+        '''
+        task_ids = {}
+        for command_type, command in self.active_commands.items():
+            if command.payload.HasParam(st.VarType.string, "TaskID"):
+                task_ids[command_type] = command.payload.GetParam(st.VarType.string, "TaskID")
+            else:
+                task_ids[command_type] = ""
+        self.en.SetParam(st.VarType.string, "ActiveCommands", json.dumps(task_ids))
+
+
     def ActiveCommands(self) -> dict:
         '''
         Returns a dictionary of active commands.
@@ -1,17 +1,53 @@
-import os, sys, time, datetime, traceback
+import os, sys, time, datetime, traceback, json
 import spaceteams as st
 import numpy as np
 
 import API.SurfaceMovement as SM
-from API.STU_Common import XY, Command, CoordToXY
+from API.STU_Common import XY, XYArray, Command, CoordToXY, GetLocalFrame, SimTimeNs
 
 #TODO docstrings on all of these functions
 
+# Entity refs on the sim entity never change during a run, so they are only read once
+_sim_entity_refs: dict[str, st.Entity] = {}
+_sim_entity_ref_arrays: dict[str, list] = {}
+
+def _GetSimEntityRef(param_name: str) -> st.Entity:
+    en = _sim_entity_refs.get(param_name)
+    if en is None:
+        en = st.GetSimEntity().GetParam(st.VarType.entityRef, param_name)
+        _sim_entity_refs[param_name] = en
+    return en
+
+def _GetSimEntityRefArray(param_name: str) -> list:
+    ens = _sim_entity_ref_arrays.get(param_name)
+    if ens is None:
+        ens = st.GetSimEntity().GetParamArray(st.VarType.entityRef, param_name)
+        _sim_entity_ref_arrays[param_name] = ens
+    return ens
+
+# Sub-entity refs (Scanner, CamScanner, Battery) keyed by (entity name, param name)
+_entity_refs: dict[tuple[str, str], st.Entity] = {}
+
+def _GetEntityRef(en: st.Entity, param_name: str) -> st.Entity:
+    key = (en.getName(), param_name)
+    ref = _entity_refs.get(key)
+    if ref is None:
+        ref = en.GetParam(st.VarType.entityRef, param_name)
+        _entity_refs[key] = ref
+    return ref
+
+def InvalidateEntityRefs():
+    '''
+    Drops the cached sim and sub-entity refs so they are read again on next use.
+    Called by SurfaceMovement.InvalidateMovers.
+    '''
+    _sim_entity_refs.clear()
+    _sim_entity_ref_arrays.clear()
+    _entity_refs.clear()
+
 
 def LatLonAltToXY(lla: st.PlanetUtils.LatLonAlt) -> XY:
-    planet: st.Entity = st.GetSimEntity().GetParam(st.VarType.entityRef, "Planet")
-    radius = planet.GetParam(st.VarType.double, ["#Planet", "General", "Radius"]) * 1000.0
-    return CoordToXY(st.PlanetUtils.Coord(lla, 0.0, radius))
+    return CoordToXY(st.PlanetUtils.Coord(lla, 0.0, GetLocalFrame().radius))
 
 
 def XYToLatLonAlt(xy: XY) -> st.PlanetUtils.LatLonAlt:
@@ -38,10 +74,9 @@ def GetMovementState(en: st.Entity) -> tuple[str, bool]:
     Reversing   - The entity is moving in reverse to a destination.
     Cooldown    - (unused) The entity is shutting down.
     '''
-    mover = SM.SurfaceMover(en, st.GetSimEntity().GetParam(st.VarType.entityRef, "Planet"))
     has_comms = HasComms(en)
     if has_comms:
-        return mover.GetMovementState(), has_comms
+        return SM.GetMover(en).GetMovementState(), has_comms
     else:
         return "", has_comms
 
@@ -52,10 +87,9 @@ def IsMoving(en: st.Entity) -> tuple[bool, bool]:
     Also returns whether the entity had comms.
     If the entity does not have comms, the function will return a default value.
     '''
-    mover = SM.SurfaceMover(en, st.GetSimEntity().GetParam(st.VarType.entityRef, "Planet"))
     has_comms = HasComms(en)
     if has_comms:
-        return mover.IsMoving(), has_comms
+        return SM.GetMover(en).IsMoving(), has_comms
     else:
         return False, has_comms
 
@@ -66,10 +100,9 @@ def GetCurrentXY(en: st.Entity) -> tuple[XY, bool]:
     Also returns whether the entity had comms.
     If the entity does not have comms, the function will return a default value.
     '''
-    mover = SM.SurfaceMover(en, st.GetSimEntity().GetParam(st.VarType.entityRef, "Planet"))
     has_comms = HasComms(en)
     if has_comms:
-        current_coord = mover.GetCurrentCoord()
+        current_coord = SM.GetMover(en).GetCurrentCoord()
         return CoordToXY(current_coord), has_comms
     else:
         return XY(0, 0), has_comms
@@ -81,10 +114,9 @@ def GetMoveToXY(en: st.Entity) -> tuple[XY, bool]:
     Also returns whether the entity had comms.
     If the entity does not have comms, the function will return a default value.
     '''
-    mover = SM.SurfaceMover(en, st.GetSimEntity().GetParam(st.VarType.entityRef, "Planet"))
     has_comms = HasComms(en)
     if has_comms:
-        move_to_coord = mover.GetMoveToCoord()
+        move_to_coord = SM.GetMover(en).GetMoveToCoord()
         return CoordToXY(move_to_coord), has_comms
     else:
         return XY(0, 0), has_comms
@@ -96,10 +128,9 @@ def GetAzimuth(en: st.Entity) -> tuple[float, bool]:
     Also returns whether the entity had comms.
     If the entity does not have comms, the function will return a default value.
     '''
-    mover = SM.SurfaceMover(en, st.GetSimEntity().GetParam(st.VarType.entityRef, "Planet"))
     has_comms = HasComms(en)
     if has_comms:
-        return mover.GetAzimuth(), has_comms
+        return SM.GetMover(en).GetAzimuth(), has_comms
     else:
         return 0.0, has_comms
 
@@ -113,7 +144,7 @@ def GetLidarObstacles(en: st.Entity) -> tuple[list, list, bool]:
     '''
     has_comms = HasComms(en)
     if has_comms:
-        scanner_en : st.Entity = en.GetParam(st.VarType.entityRef, "Scanner")
+        scanner_en : st.Entity = _GetEntityRef(en, "Scanner")
         rel_vecs_and_radii = scanner_en.GetParamArray(st.VarType.doubleV4, "RelVecsAndRadii")
         rel_vecs = [np.asarray(rel_vec_and_radius[:3]) for rel_vec_and_radius in rel_vecs_and_radii]
         radii = [rel_vec_and_radius[3] for rel_vec_and_radius in rel_vecs_and_radii]
@@ -121,6 +152,47 @@ def GetLidarObstacles(en: st.Entity) -> tuple[list, list, bool]:
     else:
         return [], [], has_comms
 
+# Row layout of lidar obstacle arrays; view an (N,4) array with this dtype to get named fields
+LIDAR_DTYPE = np.dtype([("rel", np.float64, (3,)), ("radius", np.float64)])
+
+# Per-entity (N,4) buffers reused by GetLidarObstacleArray while N stays the same
+_lidar_buffers: dict[str, np.ndarray] = {}
+
+def _ReadLidarArray(scanner_en: st.Entity, out: np.ndarray = None) -> np.ndarray:
+    '''
+    Reads RelVecsAndRadii into an (N,4) float64 array in one conversion.
+    Fills out in place if it already has the right shape, otherwise allocates.
+    '''
+    rel_vecs_and_radii = scanner_en.GetParamArray(st.VarType.doubleV4, "RelVecsAndRadii")
+    n = len(rel_vecs_and_radii)
+    if out is None or out.shape != (n, 4):
+        out = np.empty((n, 4), dtype=np.float64)
+    if n > 0:
+        out[...] = rel_vecs_and_radii
+    return out
+
+def GetLidarObstacleArray(en: st.Entity, structured: bool = False) -> tuple[np.ndarray, bool]:
+    '''
+    Returns the lidar obstacles as one contiguous (N,4) float64 array of
+    [rel_x, rel_y, rel_z, radius] rows, plus whether the entity had comms.
+    With structured=True, returns a zero-copy (N,) view of the same data with
+    "rel" and "radius" fields (see LIDAR_DTYPE) instead.
+    If the entity does not have comms, the function will return an empty array.
+
+    The array is a per-entity buffer that the next call overwrites when N is unchanged;
+    copy it if it needs to outlive the tick.
+    '''
+    has_comms = HasComms(en)
+    if has_comms:
+        key = en.getName()
+        obstacles = _ReadLidarArray(_GetEntityRef(en, "Scanner"), _lidar_buffers.get(key))
+        _lidar_buffers[key] = obstacles
+    else:
+        obstacles = np.zeros((0, 4), dtype=np.float64)
+    if structured:
+        return obstacles.view(LIDAR_DTYPE).reshape(-1), has_comms
+    return obstacles, has_comms
+
 def GetTargetScanStatus(en: st.Entity) -> tuple[bool, XY, bool]:
     '''
     Returns whether a target has been found and the location of the found target.
@@ -129,14 +201,14 @@ def GetTargetScanStatus(en: st.Entity) -> tuple[bool, XY, bool]:
     '''
     has_comms = HasComms(en)
     if has_comms:
-        scanner_en : st.Entity = en.GetParam(st.VarType.entityRef, "Scanner") #LIDAR
+        scanner_en : st.Entity = _GetEntityRef(en, "Scanner") #LIDAR
         found: bool = scanner_en.GetParam(st.VarType.bool, "TargetFound")
         loc = scanner_en.GetParam(st.VarType.doubleV3, "TargetLocation")
         xy = CoordToXY(st.PlanetUtils.Coord(loc, np.identity(3), 1737400))
         # found = False 
         #NOTE ^ if uncommented, disables LIDAR recognizing the target
         if not found:
-            cam_scanner_en : st.Entity = en.GetParam(st.VarType.entityRef, "CamScanner") #Camera scan volume
+            cam_scanner_en : st.Entity = _GetEntityRef(en, "CamScanner") #Camera scan volume
             found: bool = cam_scanner_en.GetParam(st.VarType.bool, "TargetFound")
             loc = cam_scanner_en.GetParam(st.VarType.doubleV3, "TargetLocation")
             xy = CoordToXY(st.PlanetUtils.Coord(loc, np.identity(3), 1737400))
@@ -152,19 +224,30 @@ def GetStateOfCharge(en: st.Entity) -> tuple[float, bool]:
     '''
     has_comms = HasComms(en)
     if has_comms:
-        battery_en : st.Entity = en.GetParam(st.VarType.entityRef, "Battery")
+        battery_en : st.Entity = _GetEntityRef(en, "Battery")
         current_energy_J = battery_en.GetParam(st.VarType.double, ["Resources", "currentPower"])
         max_energy_storage_J = battery_en.GetParam(st.VarType.double, ["Resources", "Maximum_Power_Storage"])
         return current_energy_J / max_energy_storage_J, has_comms
     else:
         return 0.0, has_comms
 
+def GetActiveCommands(en: st.Entity) -> tuple[dict, bool]:
+    '''
+    Returns the entity's active commands, as a dict of command type -> TaskID ("" for commands without one).
+    Also returns whether the entity had comms.
+    If the entity does not have comms, the function will return an empty dict.
+    '''
+    has_comms = HasComms(en)
+    if has_comms and en.HasParam("ActiveCommands"):
+        return json.loads(en.GetParam(st.VarType.string, "ActiveCommands")), has_comms
+    return {}, has_comms
+
 def _GetStateOfCharge_Backend(en: st.Entity) -> float:
     '''
     BACKEND USE ONLY.
     Returns the 0-1 fraction of charge of the entity's battery.
     '''
-    battery_en : st.Entity = en.GetParam(st.VarType.entityRef, "Battery")
+    battery_en : st.Entity = _GetEntityRef(en, "Battery")
     current_energy_J = battery_en.GetParam(st.VarType.double, ["Resources", "currentPower"])
     max_energy_storage_J = battery_en.GetParam(st.VarType.double, ["Resources", "Maximum_Power_Storage"])
     return current_energy_J / max_energy_storage_J
@@ -174,9 +257,8 @@ def GetChargingStationXY():
     Returns the XY coordinate of the charging station.
     Doesn't require comms.
     '''
-    charging_station_en : st.Entity = st.GetSimEntity().GetParam(st.VarType.entityRef, "ChargingStation")
-    mover = SM.SurfaceMover(charging_station_en, st.GetSimEntity().GetParam(st.VarType.entityRef, "Planet"))
-    current_coord = mover.GetCurrentCoord()
+    charging_station_en : st.Entity = _GetSimEntityRef("ChargingStation")
+    current_coord = SM.GetMover(charging_station_en).GetCurrentCoord()
     return CoordToXY(current_coord)
 
 def GetAntennaXY(index: int):
@@ -187,7 +269,252 @@ def GetAntennaXY(index: int):
     '''
     if(index < 1 or index > 3):
         raise ValueError("Antenna index must be 1, 2, or 3.")
-    antenna_en : st.Entity = st.GetSimEntity().GetParamArray(st.VarType.entityRef, "Beacons")[index-1]
-    mover = SM.SurfaceMover(antenna_en, st.GetSimEntity().GetParam(st.VarType.entityRef, "Planet"))
-    current_coord = mover.GetCurrentCoord()
+    antenna_en : st.Entity = _GetSimEntityRefArray("Beacons")[index-1]
+    current_coord = SM.GetMover(antenna_en).GetCurrentCoord()
     return CoordToXY(current_coord)
+
+
+class FleetState:
+    '''
+    Immutable, array-backed telemetry for a set of entities at one sim time.
+    Row i of every array belongs to names[i]; use Index() to look up an entity's row.
+
+    Entities without comms hold the same default values the single-entity getters return
+    (XY(0,0), 0.0 azimuth, "" movement state, 0.0 charge, no target, no obstacles).
+    Build these with snapshot() rather than directly.
+    '''
+    __slots__ = ("time_ns", "names", "positions", "azimuths", "movement_states", "is_moving",
+                 "state_of_charge", "has_comms", "target_found", "target_xy", "lidar", "_index")
+
+    def __init__(self, time_ns: int, names: tuple, positions: np.ndarray, azimuths: np.ndarray,
+                 movement_states: tuple, state_of_charge: np.ndarray, has_comms: np.ndarray,
+                 target_found: np.ndarray, target_xy: np.ndarray, lidar: tuple):
+        is_moving = np.array([state in ("Moving", "Reversing") for state in movement_states], dtype=bool)
+        for arr in (positions, azimuths, is_moving, state_of_charge, has_comms, target_found, target_xy) + lidar:
+            arr.setflags(write=False)
+        values = {
+            "time_ns": time_ns,
+            "names": names,
+            # (N,2) local XY
+            "positions": positions,
+            "azimuths": azimuths,
+            "movement_states": movement_states,
+            "is_moving": is_moving,
+            "state_of_charge": state_of_charge,
+            "has_comms": has_comms,
+            "target_found": target_found,
+            # (N,2) local XY of the found target; only meaningful where target_found is set
+            "target_xy": target_xy,
+            # One (M,4) array of [rel_x, rel_y, rel_z, radius] rows per entity
+            "lidar": lidar,
+            "_index": {name: i for i, name in enumerate(names)},
+        }
+        for key, value in values.items():
+            object.__setattr__(self, key, value)
+
+    def __setattr__(self, key, value):
+        raise AttributeError("FleetState is immutable")
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def Index(self, en: st.Entity) -> int:
+        return self._index[en.getName()]
+
+    def GetXY(self, en: st.Entity) -> XY:
+        i = self.Index(en)
+        return XY(self.positions[i, 0], self.positions[i, 1])
+
+    def GetTargetXY(self, en: st.Entity) -> XY:
+        i = self.Index(en)
+        return XY(self.target_xy[i, 0], self.target_xy[i, 1])
+
+    def __repr__(self):
+        return f"<FleetState t={self.time_ns}ns | {len(self.names)} entities, {int(self.has_comms.sum())} in comms>"
+
+
+_last_snapshot: FleetState = None
+
+def snapshot(entities: list[st.Entity]) -> FleetState:
+    '''
+    Returns telemetry for all given entities in one pass.
+    Each entity's HasComms is read once, and only entities with comms are queried further.
+
+    The result is memoized on the sim time, so repeated calls within the same sim tick
+    return the same FleetState without touching the sim again.
+    '''
+    global _last_snapshot
+    time_ns = SimTimeNs()
+    names = tuple(en.getName() for en in entities)
+    if _last_snapshot is not None and _last_snapshot.time_ns == time_ns and _last_snapshot.names == names:
+        return _last_snapshot
+
+    n = len(entities)
+    locs = np.zeros((n, 3))
+    target_locs = np.zeros((n, 3))
+    azimuths = np.zeros(n)
+    state_of_charge = np.zeros(n)
+    has_comms = np.zeros(n, dtype=bool)
+    target_found = np.zeros(n, dtype=bool)
+    movement_states = [""] * n
+    lidar = [np.zeros((0, 4))] * n
+
+    for i, en in enumerate(entities):
+        if not HasComms(en):
+            continue
+        has_comms[i] = True
+        mover = SM.GetMover(en)
+        locs[i] = mover.GetCurrentCoord().getLoc()
+        azimuths[i] = mover.GetAzimuth()
+        movement_states[i] = mover.GetMovementState()
+
+        battery_en = _GetEntityRef(en, "Battery")
+        state_of_charge[i] = (battery_en.GetParam(st.VarType.double, ["Resources", "currentPower"]) /
+                              battery_en.GetParam(st.VarType.double, ["Resources", "Maximum_Power_Storage"]))
+
+        scanner_en = _GetEntityRef(en, "Scanner")
+        lidar[i] = _ReadLidarArray(scanner_en)
+        found = scanner_en.GetParam(st.VarType.bool, "TargetFound")
+        target_loc = scanner_en.GetParam(st.VarType.doubleV3, "TargetLocation")
+        if not found:
+            cam_scanner_en = _GetEntityRef(en, "CamScanner")
+            found = cam_scanner_en.GetParam(st.VarType.bool, "TargetFound")
+            target_loc = cam_scanner_en.GetParam(st.VarType.doubleV3, "TargetLocation")
+        target_found[i] = found
+        target_locs[i] = target_loc
+
+    # Entities without comms keep XY(0,0), like the single-entity getters
+    positions = np.where(has_comms[:, None], XYArray.from_pcpf(locs).xy, 0.0)
+    target_xy = np.where(has_comms[:, None], XYArray.from_pcpf(target_locs).xy, 0.0)
+
+    _last_snapshot = FleetState(time_ns, names, positions, azimuths, tuple(movement_states),
+                                state_of_charge, has_comms, target_found, target_xy, tuple(lidar))
+    return _last_snapshot
+
+
+class Reading:
+    '''
+    A cached telemetry value with the sim time it was read at.
+    value is None if the field has never been read while the entity had comms.
+    stale is set when the reading is older than the field's max age, or missing.
+    '''
+    __slots__ = ("value", "time_ns", "age_s", "stale")
+
+    def __init__(self, value, time_ns: int, age_s: float, stale: bool):
+        self.value = value
+        self.time_ns = time_ns
+        self.age_s = age_s
+        self.stale = stale
+
+    def __repr__(self):
+        return f"<Reading {self.value} | age {self.age_s:.3f}s{' (stale)' if self.stale else ''}>"
+
+
+class TelemetryCache:
+    '''
+    Keeps each entity's last valid telemetry reading and the sim time it was taken at.
+
+    While an entity has comms, the getters read through to the sim and store the result.
+    Without comms they return the last good value with its age instead of a dummy value,
+    and make no further sim queries beyond HasComms.
+    Update() ingests a whole FleetState from snapshot() at once.
+
+    Fields: "xy", "move_to_xy", "azimuth", "movement_state", "state_of_charge", "target", "lidar".
+    "lidar" is always an (N,4) obstacle array, as from GetLidarObstacleArray.
+    '''
+    DEFAULT_MAX_AGE_S = {
+        "xy": 5.0,
+        "move_to_xy": 5.0,
+        "azimuth": 5.0,
+        "movement_state": 5.0,
+        "state_of_charge": 60.0,
+        "target": float("inf"),
+        "lidar": 1.0,
+    }
+
+    def __init__(self, max_age_s: dict[str, float] = None):
+        self.max_age_s = dict(self.DEFAULT_MAX_AGE_S)
+        if max_age_s:
+            self.max_age_s.update(max_age_s)
+        # (entity name, field) -> (value, time_ns)
+        self.readings: dict[tuple[str, str], tuple] = {}
+        self._last_update_ns = None
+
+    def SetMaxAge(self, field: str, max_age_s: float):
+        '''
+        Sets how old a field's reading may get before it is reported stale.
+        '''
+        self.max_age_s[field] = max_age_s
+
+    def Store(self, en: st.Entity, field: str, value, time_ns: int = None):
+        if time_ns is None:
+            time_ns = SimTimeNs()
+        self.readings[(en.getName(), field)] = (value, time_ns)
+
+    def Get(self, en: st.Entity, field: str, now_ns: int = None) -> Reading:
+        '''
+        Returns the last stored reading for a field without querying the sim.
+        '''
+        if now_ns is None:
+            now_ns = SimTimeNs()
+        stored = self.readings.get((en.getName(), field))
+        if stored is None:
+            return Reading(None, 0, float("inf"), True)
+        value, time_ns = stored
+        age_s = (now_ns - time_ns) / 1e9
+        return Reading(value, time_ns, age_s, age_s > self.max_age_s.get(field, float("inf")))
+
+    def Update(self, fleet: FleetState):
+        '''
+        Stores every field of every entity that had comms in the snapshot.
+        '''
+        if fleet.time_ns == self._last_update_ns:
+            return
+        self._last_update_ns = fleet.time_ns
+        for i, name in enumerate(fleet.names):
+            if not fleet.has_comms[i]:
+                continue
+            t = fleet.time_ns
+            self.readings[(name, "xy")] = (XY(fleet.positions[i, 0], fleet.positions[i, 1]), t)
+            self.readings[(name, "azimuth")] = (fleet.azimuths[i], t)
+            self.readings[(name, "movement_state")] = (fleet.movement_states[i], t)
+            self.readings[(name, "state_of_charge")] = (fleet.state_of_charge[i], t)
+            self.readings[(name, "target")] = ((bool(fleet.target_found[i]), XY(fleet.target_xy[i, 0], fleet.target_xy[i, 1])), t)
+            self.readings[(name, "lidar")] = (fleet.lidar[i], t)
+
+    def _ReadThrough(self, en: st.Entity, field: str, value, has_comms: bool) -> Reading:
+        now_ns = SimTimeNs()
+        if has_comms:
+            self.readings[(en.getName(), field)] = (value, now_ns)
+            return Reading(value, now_ns, 0.0, False)
+        return self.Get(en, field, now_ns)
+
+    def GetCurrentXY(self, en: st.Entity) -> Reading:
+        return self._ReadThrough(en, "xy", *GetCurrentXY(en))
+
+    def GetMoveToXY(self, en: st.Entity) -> Reading:
+        return self._ReadThrough(en, "move_to_xy", *GetMoveToXY(en))
+
+    def GetAzimuth(self, en: st.Entity) -> Reading:
+        return self._ReadThrough(en, "azimuth", *GetAzimuth(en))
+
+    def GetMovementState(self, en: st.Entity) -> Reading:
+        return self._ReadThrough(en, "movement_state", *GetMovementState(en))
+
+    def GetStateOfCharge(self, en: st.Entity) -> Reading:
+        return self._ReadThrough(en, "state_of_charge", *GetStateOfCharge(en))
+
+    def GetTargetScanStatus(self, en: st.Entity) -> Reading:
+        '''
+        The reading's value is a (found, XY) tuple.
+        '''
+        found, xy, has_comms = GetTargetScanStatus(en)
+        return self._ReadThrough(en, "target", (found, xy), has_comms)
+
+    def GetLidarObstacleArray(self, en: st.Entity) -> Reading:
+        '''
+        The reading's value is an (N,4) array of [rel_x, rel_y, rel_z, radius] rows, as Update() stores.
+        '''
+        obstacles, has_comms = GetLidarObstacleArray(en)
+        # A copy, as GetLidarObstacleArray's buffer is overwritten by its next call
+        return self._ReadThrough(en, "lidar", obstacles.copy(), has_comms)
@@ -0,0 +1,278 @@
+import math
+import numpy as np
+
+from API.STU_Common import AsPoint, GetLocalFrame
+
+
+def _GrowBox(box: tuple[int, int, int, int], cell: tuple[int, int]) -> tuple[int, int, int, int]:
+    cx, cy = cell
+    if box is None:
+        return (cx, cy, cx, cy)
+    return (min(box[0], cx), min(box[1], cy), max(box[2], cx), max(box[3], cy))
+
+
+class ObstacleStore:
+    '''
+    Fleet-wide map of discovered obstacles, as circles in local XY.
+
+    Every rover's lidar reports are merged into one store: a report whose center and
+    radius fall within the merge tolerances of a known obstacle refines that obstacle
+    instead of adding a new one. Obstacles are kept in flat arrays and indexed by a
+    spatial hash grid, so ingestion and queries only touch nearby cells.
+    '''
+    def __init__(self, cell_size_m: float = 40.0, center_tol_m: float = 1.0, radius_tol_m: float = 1.0):
+        self.cell_size = cell_size_m
+        self.center_tol = center_tol_m
+        self.radius_tol = radius_tol_m
+        self.count = 0
+        # Flat storage, grown by doubling; only the first `count` rows are valid
+        self.centers = np.zeros((64, 2))
+        self.radii = np.zeros(64)
+        self.observations = np.zeros(64, dtype=np.int64)
+        # (cell_x, cell_y) -> indices of obstacles whose disk overlaps that cell
+        self.grid: dict[tuple[int, int], list[int]] = {}
+        # (min_cx, min_cy, max_cx, max_cy) over the grid's occupied cells, or None if there are none;
+        # recomputed on the next nearest() once removing an obstacle empties a cell on its edge
+        self._cell_box: tuple[int, int, int, int] = None
+        self._cell_box_dirty = False
+        # Quantized (x, y, radius) -> index, so repeat reports of a known rock skip the merge search
+        self._seen: dict[tuple[int, int, int], int] = {}
+        self.max_radius = 0.0
+        # Bumped whenever an obstacle is added or moved
+        self.version = 0
+        self._last_fleet_ns = None
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _Cell(self, x: float, y: float) -> tuple[int, int]:
+        return (math.floor(x / self.cell_size), math.floor(y / self.cell_size))
+
+    def _CellsOverlapping(self, x: float, y: float, r: float):
+        x0, y0 = self._Cell(x - r, y - r)
+        x1, y1 = self._Cell(x + r, y + r)
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                yield (cx, cy)
+
+    def _Register(self, i: int):
+        x, y = self.centers[i]
+        for cell in self._CellsOverlapping(x, y, self.radii[i]):
+            self.grid.setdefault(cell, []).append(i)
+            if not self._cell_box_dirty:
+                self._cell_box = _GrowBox(self._cell_box, cell)
+
+    def _Unregister(self, i: int):
+        x, y = self.centers[i]
+        for cell in self._CellsOverlapping(x, y, self.radii[i]):
+            indices = self.grid[cell]
+            indices.remove(i)
+            if not indices:
+                del self.grid[cell]
+                box = self._cell_box
+                if cell[0] in (box[0], box[2]) or cell[1] in (box[1], box[3]):
+                    self._cell_box_dirty = True
+
+    def _CellBox(self) -> tuple[int, int, int, int]:
+        if self._cell_box_dirty:
+            self._cell_box = None
+            for cell in self.grid:
+                self._cell_box = _GrowBox(self._cell_box, cell)
+            self._cell_box_dirty = False
+        return self._cell_box
+
+    def _Candidates(self, cells) -> np.ndarray:
+        found = set()
+        for cell in cells:
+            found.update(self.grid.get(cell, ()))
+        return np.fromiter(found, dtype=np.int64, count=len(found))
+
+    def _Grow(self):
+        capacity = 2 * len(self.radii)
+        self.centers = np.resize(self.centers, (capacity, 2))
+        self.radii = np.resize(self.radii, capacity)
+        self.observations = np.resize(self.observations, capacity)
+
+    def Ingest(self, centers, radii) -> int:
+        '''
+        Adds obstacle reports given as (N,2) local XY centers and (N,) radii.
+        Returns how many new obstacles were added.
+        '''
+        centers = np.asarray(centers, dtype=np.float64).reshape(-1, 2)
+        radii = np.asarray(radii, dtype=np.float64).reshape(-1)
+        keys = np.column_stack((np.round(centers / self.center_tol), np.round(radii / self.radius_tol))).astype(np.int64)
+        added = 0
+        for (x, y), r, key in zip(centers.tolist(), radii.tolist(), map(tuple, keys.tolist())):
+            if key in self._seen:
+                continue
+            i = self._Merge(x, y, r)
+            if i < 0:
+                i = self._Add(x, y, r)
+                added += 1
+            self._seen[key] = i
+        return added
+
+    def _Merge(self, x: float, y: float, r: float) -> int:
+        candidates = self._Candidates(self._CellsOverlapping(x, y, self.center_tol))
+        if len(candidates) == 0:
+            return -1
+        d = np.hypot(self.centers[candidates, 0] - x, self.centers[candidates, 1] - y)
+        match = (d <= self.center_tol) & (np.abs(self.radii[candidates] - r) <= self.radius_tol)
+        if not match.any():
+            return -1
+        i = int(candidates[np.argmin(np.where(match, d, np.inf))])
+        # Running average of every report of this obstacle
+        n = self.observations[i]
+        old_cells = set(self._CellsOverlapping(*self.centers[i], self.radii[i]))
+        new_center = (self.centers[i] * n + (x, y)) / (n + 1)
+        new_radius = (self.radii[i] * n + r) / (n + 1)
+        if set(self._CellsOverlapping(*new_center, new_radius)) != old_cells:
+            self._Unregister(i)
+            self.centers[i] = new_center
+            self.radii[i] = new_radius
+            self._Register(i)
+        else:
+            self.centers[i] = new_center
+            self.radii[i] = new_radius
+        self.observations[i] = n + 1
+        self.max_radius = max(self.max_radius, new_radius)
+        self.version += 1
+        return i
+
+    def _Add(self, x: float, y: float, r: float) -> int:
+        if self.count == len(self.radii):
+            self._Grow()
+        i = self.count
+        self.centers[i] = (x, y)
+        self.radii[i] = r
+        self.observations[i] = 1
+        self.count += 1
+        self._Register(i)
+        self.max_radius = max(self.max_radius, r)
+        self.version += 1
+        return i
+
+    def IngestRelative(self, rover_xy, obstacles: np.ndarray) -> int:
+        '''
+        Adds a rover's lidar report: an (N,4) array of [rel_x, rel_y, rel_z, radius] rows
+        relative to the rover, as from EntityTelemetry.GetLidarObstacleArray or a FleetState.
+        The relative vectors are projected into local XY with one matrix multiply.
+        '''
+        obstacles = np.asarray(obstacles, dtype=np.float64).reshape(-1, 4)
+        if len(obstacles) == 0:
+            return 0
+        centers = np.asarray(AsPoint(rover_xy)) + obstacles[:, :3] @ GetLocalFrame().basis.T
+        return self.Ingest(centers, obstacles[:, 3])
+
+    def IngestFleet(self, fleet) -> int:
+        '''
+        Adds the lidar reports of every entity that had comms in a FleetState.
+        A snapshot that has already been ingested is skipped.
+        '''
+        if fleet.time_ns == self._last_fleet_ns:
+            return 0
+        self._last_fleet_ns = fleet.time_ns
+        added = 0
+        for i in range(len(fleet)):
+            if fleet.has_comms[i]:
+                added += self.IngestRelative(fleet.positions[i], fleet.lidar[i])
+        return added
+
+    def query_radius(self, p, radius: float) -> np.ndarray:
+        '''
+        Returns the indices of obstacles whose edge is within radius of point p.
+        '''
+        x, y = AsPoint(p)
+        candidates = self._Candidates(self._CellsOverlapping(x, y, radius))
+        if len(candidates) == 0:
+            return candidates
+        d = np.hypot(self.centers[candidates, 0] - x, self.centers[candidates, 1] - y) - self.radii[candidates]
+        return candidates[d <= radius]
+
+    def nearest(self, p) -> tuple[int, float]:
+        '''
+        Returns the index of the obstacle whose edge is closest to point p and the distance
+        to that edge (negative if p is inside it), or (-1, inf) if the store is empty.
+        '''
+        if self.count == 0:
+            return -1, float("inf")
+        x, y = AsPoint(p)
+        cx, cy = self._Cell(x, y)
+        best_i, best_d = -1, float("inf")
+        # Grid rings of growing size; every cell in ring k is at least (k-1) cells away.
+        # Every obstacle is in some occupied cell, so no ring past the farthest edge of their box is needed
+        x0, y0, x1, y1 = self._CellBox()
+        max_ring = max(cx - x0, x1 - cx, cy - y0, y1 - cy, 0)
+        for k in range(max_ring + 1):
+            if best_i >= 0 and (k - 1) * self.cell_size > best_d:
+                break
+            ring = [(cx + dx, cy + dy) for dx in range(-k, k + 1) for dy in range(-k, k + 1)
+                    if max(abs(dx), abs(dy)) == k]
+            candidates = self._Candidates(ring)
+            if len(candidates) == 0:
+                continue
+            d = np.hypot(self.centers[candidates, 0] - x, self.centers[candidates, 1] - y) - self.radii[candidates]
+            j = int(np.argmin(d))
+            if d[j] < best_d:
+                best_i, best_d = int(candidates[j]), float(d[j])
+        return best_i, best_d
+
+    def segment_hits(self, a, b, inflate: float = 0.0) -> np.ndarray:
+        '''
+        Returns the indices of obstacles, grown by inflate, that the segment a->b passes through.
+        '''
+        ax, ay = AsPoint(a)
+        bx, by = AsPoint(b)
+        length = math.hypot(bx - ax, by - ay)
+        # Sample the segment every half cell and take every cell within inflate of a sample
+        steps = max(1, int(np.ceil(length / (0.5 * self.cell_size))))
+        reach = inflate + 0.5 * self.cell_size
+        cells = set()
+        for t in np.linspace(0.0, 1.0, steps + 1).tolist():
+            cells.update(self._CellsOverlapping(ax + (bx - ax) * t, ay + (by - ay) * t, reach))
+        candidates = self._Candidates(cells)
+        if len(candidates) == 0:
+            return candidates
+        seg = np.array([bx - ax, by - ay])
+        rel = self.centers[candidates] - (ax, ay)
+        t = np.clip(rel @ seg / max(length * length, 1e-12), 0.0, 1.0)
+        closest = np.outer(t, seg)
+        d = np.hypot(rel[:, 0] - closest[:, 0], rel[:, 1] - closest[:, 1])
+        return candidates[d < self.radii[candidates] + inflate]
+
+    def segment_intersects(self, a, b, inflate: float = 0.0) -> bool:
+        '''
+        Returns whether the segment a->b passes through any obstacle grown by inflate.
+        '''
+        return len(self.segment_hits(a, b, inflate)) > 0
+
+    def Circles(self) -> np.ndarray:
+        '''
+        Returns an (N,3) array of [x, y, radius] rows for every known obstacle.
+        '''
+        return np.column_stack((self.centers[:self.count], self.radii[:self.count]))
+
+    def __repr__(self):
+        return f"<ObstacleStore | {self.count} obstacles in {len(self.grid)} cells>"
+
+
+class StoreSync:
+    '''
+    Which of an ObstacleStore's obstacles a map built from it (Costmap, VisibilityGraph) has
+    taken in, so its SyncFromStore only touches obstacles that are new, or have moved or grown
+    as the store refined repeat sightings. Store rows keep their index, so rows are compared in place.
+    '''
+    def __init__(self):
+        # Store circles as of the last Pull()
+        self.circles = np.zeros((0, 3))
+
+    def Pull(self, store: ObstacleStore) -> tuple[np.ndarray, list[int], int]:
+        '''
+        Returns the store's (N,3) circles, the rows pulled before that have changed since, and how
+        many rows were pulled before; the rows after those are new. Remembers the circles as pulled.
+        '''
+        circles = store.Circles()
+        n_old = len(self.circles)
+        changed = np.flatnonzero(np.any(np.abs(circles[:n_old] - self.circles) > 1e-6, axis=1)).tolist()
+        self.circles = circles
+        return circles, changed, n_old
@@ -0,0 +1,78 @@
+import numpy as np
+
+# Same default footprint the entity behaviors use for obstacle hit detection
+DEFAULT_ENTITY_RADIUS_M = 0.3
+
+
+class ProximityResult:
+    '''
+    Proximity of one entity to every obstacle in a lidar array, from a single vectorized pass.
+
+    distances           - (N,) center-to-center distance to each obstacle.
+    separations         - (N,) surface-to-surface gap; negative means overlapping.
+    hit_mask            - (N,) True where the entity is overlapping the obstacle.
+    time_to_contact     - (N,) seconds until contact along the given velocity; 0 if already
+                          in contact, inf if the obstacle is not in the way or no velocity was given.
+    nearest_index       - row of the obstacle with the smallest separation, or -1 if there are none.
+    '''
+    __slots__ = ("distances", "separations", "hit_mask", "time_to_contact", "nearest_index")
+
+    def __init__(self, distances: np.ndarray, separations: np.ndarray, hit_mask: np.ndarray,
+                 time_to_contact: np.ndarray, nearest_index: int):
+        self.distances = distances
+        self.separations = separations
+        self.hit_mask = hit_mask
+        self.time_to_contact = time_to_contact
+        self.nearest_index = nearest_index
+
+    @property
+    def any_hit(self) -> bool:
+        return bool(self.hit_mask.any())
+
+    @property
+    def nearest_separation(self) -> float:
+        if self.nearest_index < 0:
+            return float("inf")
+        return float(self.separations[self.nearest_index])
+
+    @property
+    def min_time_to_contact(self) -> float:
+        if len(self.time_to_contact) == 0:
+            return float("inf")
+        return float(self.time_to_contact.min())
+
+
+def Evaluate(obstacles: np.ndarray, entity_radius: float = DEFAULT_ENTITY_RADIUS_M,
+             velocity: np.ndarray = None) -> ProximityResult:
+    '''
+    Computes separations, the nearest obstacle, a hit mask and time-to-contact for an
+    (N,4) array of [rel_x, rel_y, rel_z, radius] rows, as returned by
+    EntityTelemetry.GetLidarObstacleArray.
+
+    velocity is the entity's velocity in the same frame as the relative vectors; with it,
+    time_to_contact is the time until the entity's footprint touches each obstacle if it
+    keeps moving in a straight line.
+    '''
+    obstacles = np.asarray(obstacles, dtype=np.float64).reshape(-1, 4)
+    rel = obstacles[:, :3]
+    contact_radii = obstacles[:, 3] + entity_radius
+
+    dist_sq = np.einsum("ij,ij->i", rel, rel)
+    distances = np.sqrt(dist_sq)
+    separations = distances - contact_radii
+    hit_mask = separations < 0.0
+    nearest_index = int(np.argmin(separations)) if len(separations) > 0 else -1
+
+    time_to_contact = np.full(len(obstacles), np.inf)
+    time_to_contact[hit_mask] = 0.0
+    if velocity is not None:
+        velocity = np.asarray(velocity, dtype=np.float64)
+        speed_sq = float(velocity @ velocity)
+        if speed_sq > 0.0:
+            # Solve |rel - velocity * t| = contact_radius for the first t > 0
+            closing = rel @ velocity
+            disc = closing * closing - speed_sq * (dist_sq - contact_radii * contact_radii)
+            approaching = ~hit_mask & (closing > 0.0) & (disc >= 0.0)
+            time_to_contact[approaching] = (closing[approaching] - np.sqrt(disc[approaching])) / speed_sq
+
+    return ProximityResult(distances, separations, hit_mask, time_to_contact, nearest_index)
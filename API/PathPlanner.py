@@ -0,0 +1,502 @@
+import heapq
+import math
+import numpy as np
+
+from API.STU_Common import XY
+from API.Costmap import Costmap, INSCRIBED
+
+# 8-connected grid moves as (d_row, d_col, length in cells)
+_MOVES = [(-1, 0, 1.0), (1, 0, 1.0), (0, -1, 1.0), (0, 1, 1.0),
+          (-1, -1, math.sqrt(2.0)), (-1, 1, math.sqrt(2.0)), (1, -1, math.sqrt(2.0)), (1, 1, math.sqrt(2.0))]
+
+_SQRT2_MINUS_1 = math.sqrt(2.0) - 1.0
+
+# D* Lite keys are quantized to integer micrometers, which compare faster than rounded floats
+_KEY_SCALE = 1e6
+
+
+class _Grid:
+    '''
+    Flat, per-plan view of a costmap: per-cell travel multipliers and neighbor lookups.
+    A cell's multiplier is 1 on free ground, grows with the cell's soft cost, and is
+    infinite at INSCRIBED and above. Moving between two cells costs the step length
+    times the mean of their multipliers, so edge costs are symmetric.
+    '''
+    def __init__(self, costmap: Costmap, cost_weight: float):
+        costmap.Update()
+        self.costmap = costmap
+        self.nx = costmap.nx
+        self.ny = costmap.ny
+        self.resolution = costmap.resolution
+        self.cost_weight = cost_weight
+        self.mult: list[float] = self._Mults(costmap.cost.ravel()).tolist()
+        # Cell that may always be left, even if it is inside an inflated obstacle (the rover's own cell)
+        self.free_cell = -1
+        self._free_cell_mult = math.inf
+        # (index offset, d_row, d_col, step length in meters) per move
+        self.moves = [(dr * self.nx + dc, dr, dc, length * self.resolution) for dr, dc, length in _MOVES]
+
+    def _Mults(self, cost: np.ndarray) -> np.ndarray:
+        mult = 1.0 + self.cost_weight * cost.astype(np.float64) / (INSCRIBED - 1)
+        mult[cost >= INSCRIBED] = math.inf
+        return mult
+
+    def SetCells(self, indices: np.ndarray):
+        '''
+        Refreshes the multipliers of the given flat cell indices from the costmap.
+        '''
+        if len(indices) == 0:
+            return
+        values = self._Mults(self.costmap.cost.ravel()[indices]).tolist()
+        for idx, m in zip(indices.tolist(), values):
+            if idx == self.free_cell:
+                self._free_cell_mult = m
+            else:
+                self.mult[idx] = m
+
+    def SetFreeCell(self, idx: int):
+        if self.free_cell >= 0:
+            self.mult[self.free_cell] = self._free_cell_mult
+        self.free_cell = idx
+        self._free_cell_mult = self.mult[idx]
+        self.mult[idx] = min(self.mult[idx], 1.0)
+
+    def Neighbors(self, idx: int):
+        '''
+        Yields (neighbor index, edge cost in meters) for every passable neighbor.
+        '''
+        mult = self.mult
+        m = mult[idx]
+        if m == math.inf:
+            return
+        r, c = divmod(idx, self.nx)
+        for offset, dr, dc, step in self.moves:
+            if 0 <= r + dr < self.ny and 0 <= c + dc < self.nx:
+                n = idx + offset
+                mn = mult[n]
+                if mn != math.inf:
+                    yield n, step * 0.5 * (m + mn)
+
+    def Heuristic(self, a: int, b: int) -> float:
+        # Octile distance; admissible because no multiplier is below 1
+        ar, ac = divmod(a, self.nx)
+        br, bc = divmod(b, self.nx)
+        dr = abs(ar - br)
+        dc = abs(ac - bc)
+        if dr > dc:
+            return (dr + _SQRT2_MINUS_1 * dc) * self.resolution
+        return (dc + _SQRT2_MINUS_1 * dr) * self.resolution
+
+    def Index(self, p) -> int:
+        row, col = self.costmap.WorldToCell(p)
+        if not self.costmap.InBounds(row, col):
+            return -1
+        return row * self.nx + col
+
+    def Cell(self, idx: int) -> tuple[int, int]:
+        return divmod(idx, self.nx)
+
+
+def AStar(costmap: Costmap, start, goal, cost_weight: float = 4.0,
+          heuristic_weight: float = 1.0) -> list[tuple[int, int]]:
+    '''
+    Plans over a costmap with A* and returns the path as (row, col) cells from start to
+    goal, or None if the goal cannot be reached. The start cell is always allowed to be
+    left, so a rover that has just hit an obstacle can still plan its way out.
+
+    A heuristic_weight above 1 (weighted A*) expands far fewer cells on large maps, and
+    the path cost is at most heuristic_weight times the optimum.
+    '''
+    grid = _Grid(costmap, cost_weight)
+    s = grid.Index(start)
+    g = grid.Index(goal)
+    if s < 0 or g < 0:
+        return None
+    grid.SetFreeCell(s)
+    if grid.mult[g] == math.inf:
+        return None
+
+    # Inlined neighbor expansion; this loop is the planner's hot path
+    nx, ny, mult, moves = grid.nx, grid.ny, grid.mult, grid.moves
+    gr, gc = divmod(g, nx)
+    h_diag = _SQRT2_MINUS_1 * grid.resolution * heuristic_weight
+    h_straight = grid.resolution * heuristic_weight
+    g_score = {s: 0.0}
+    came_from = {s: -1}
+    open_heap = [(grid.Heuristic(s, g) * heuristic_weight, 0.0, s)]
+    closed = set()
+    while open_heap:
+        _, g_u, u = heapq.heappop(open_heap)
+        if u in closed:
+            continue
+        if u == g:
+            break
+        closed.add(u)
+        m = mult[u]
+        r, c = divmod(u, nx)
+        for offset, dr, dc, step in moves:
+            rr = r + dr
+            cc = c + dc
+            if rr < 0 or rr >= ny or cc < 0 or cc >= nx:
+                continue
+            v = u + offset
+            mv = mult[v]
+            if mv == math.inf or v in closed:
+                continue
+            g_v = g_u + step * 0.5 * (m + mv)
+            if g_v < g_score.get(v, math.inf):
+                g_score[v] = g_v
+                came_from[v] = u
+                dy = abs(rr - gr)
+                dx = abs(cc - gc)
+                h = (dy * h_straight + dx * h_diag) if dy > dx else (dx * h_straight + dy * h_diag)
+                heapq.heappush(open_heap, (g_v + h, g_v, v))
+    else:
+        return None
+
+    path = []
+    u = g
+    while u >= 0:
+        path.append(grid.Cell(u))
+        u = came_from[u]
+    path.reverse()
+    return path
+
+
+class DStarLite:
+    '''
+    Incremental grid planner (D* Lite, Koenig & Likhachev 2002) over a costmap.
+
+    Searches backwards from the goal, so after the costmap changes or the rover moves,
+    Replan() only repairs the part of the search the change affects instead of starting
+    over. Changed cells are found by diffing the costmap against the copy seen last time.
+
+    The first search is a plain backward A*, which leaves the same state as D* Lite's at a
+    fraction of the cost. A repair that has to raise the cost-to-goal of more cells than
+    repair_budget times the cells the last search from scratch expanded (e.g. a new rock
+    walling off the region the path ran through) is abandoned, and the search is started
+    over from the rover's cell instead. Cells whose cost drops are settled as a search
+    from scratch would settle them, so they don't count against the budget.
+    '''
+    # A repair may raise g on at most this fraction of the cells the last search from scratch expanded
+    repair_budget = 0.5
+
+    def __init__(self, costmap: Costmap, start, goal, cost_weight: float = 4.0):
+        self.costmap = costmap
+        self.cost_weight = cost_weight
+        self.grid = _Grid(costmap, cost_weight)
+        self.start = self.grid.Index(start)
+        self.goal = self.grid.Index(goal)
+        if self.start < 0 or self.goal < 0:
+            raise ValueError("DStarLite start and goal must be inside the costmap.")
+        self.grid.SetFreeCell(self.start)
+        self._seen_cost = costmap.cost.copy()
+        # Cells the last search from scratch and the last repair expanded, and how many repairs went over budget
+        self.search_size = 0
+        self.repair_size = 0
+        self.restarts = 0
+        self._Search()
+
+    def _Search(self):
+        # Search from scratch: A* from the goal to the start. Expanded cells end up with g = rhs, and the
+        # frontier with rhs = their best cost through an expanded cell, as D* Lite's own search would leave them
+        grid = self.grid
+        nx, ny, mult, moves = grid.nx, grid.ny, grid.mult, grid.moves
+        n = nx * ny
+        self.last_start = self.start
+        self.km = 0.0
+        g = self.g = [math.inf] * n
+        rhs = self.rhs = [math.inf] * n
+        goal, start = self.goal, self.start
+        rhs[goal] = 0.0
+        sr, sc = divmod(start, nx)
+        h_diag = _SQRT2_MINUS_1 * grid.resolution
+        h_straight = grid.resolution
+        heap = [(grid.Heuristic(start, goal), 0.0, goal)]
+        expanded = 0
+        while heap:
+            _, g_u, u = heapq.heappop(heap)
+            if g_u > rhs[u] or g[u] != math.inf:
+                continue
+            if u == start:
+                # Left on the frontier: D* Lite stops before expanding the start
+                break
+            g[u] = g_u
+            expanded += 1
+            m = mult[u]
+            if m == math.inf:
+                continue
+            r, c = divmod(u, nx)
+            for offset, dr, dc, step in moves:
+                rr = r + dr
+                cc = c + dc
+                if rr < 0 or rr >= ny or cc < 0 or cc >= nx:
+                    continue
+                v = u + offset
+                mv = mult[v]
+                if mv == math.inf or g[v] != math.inf:
+                    continue
+                g_v = g_u + step * 0.5 * (m + mv)
+                if g_v < rhs[v]:
+                    rhs[v] = g_v
+                    dy = abs(rr - sr)
+                    dx = abs(cc - sc)
+                    heapq.heappush(heap, (g_v + ((dy * h_straight + dx * h_diag) if dy > dx else (dx * h_straight + dy * h_diag)), g_v, v))
+        self.search_size = expanded
+        self.open_heap = []
+        self.open_keys: dict[int, tuple[float, float]] = {}
+        for _, _, v in heap:
+            if g[v] == math.inf and v not in self.open_keys:
+                self._Push(v)
+
+    def _Key(self, u: int) -> tuple[float, float]:
+        m = min(self.g[u], self.rhs[u])
+        if m == math.inf:
+            return (math.inf, math.inf)
+        # Keys tie exactly on open ground (octile heuristic); quantizing them keeps float
+        # noise from ordering a tie ahead of its second component, which can end the
+        # search with inconsistent cells still on the path
+        return (int((m + self.grid.Heuristic(self.start, u) + self.km) * _KEY_SCALE + 0.5), int(m * _KEY_SCALE + 0.5))
+
+    def _Push(self, u: int):
+        key = self._Key(u)
+        self.open_keys[u] = key
+        heapq.heappush(self.open_heap, (key[0], key[1], u))
+
+    def _BestRhs(self, u: int) -> float:
+        # One-step lookahead: the cheapest way to the goal through a neighbour
+        best = math.inf
+        grid = self.grid
+        mult = grid.mult
+        m = mult[u]
+        if m != math.inf:
+            g = self.g
+            nx, ny = grid.nx, grid.ny
+            r, c = divmod(u, nx)
+            for offset, dr, dc, step in grid.moves:
+                rr = r + dr
+                cc = c + dc
+                if rr < 0 or rr >= ny or cc < 0 or cc >= nx:
+                    continue
+                v = u + offset
+                g_v = g[v]
+                if g_v == math.inf:
+                    continue
+                mv = mult[v]
+                if mv != math.inf:
+                    cand = g_v + step * 0.5 * (m + mv)
+                    if cand < best:
+                        best = cand
+        return best
+
+    def _Requeue(self, u: int):
+        self.open_keys.pop(u, None)
+        if self.g[u] != self.rhs[u]:
+            self._Push(u)
+
+    def _UpdateVertex(self, u: int):
+        if u != self.goal:
+            self.rhs[u] = self._BestRhs(u)
+        self._Requeue(u)
+
+    def _ComputeShortestPath(self, max_raised: int = None) -> bool:
+        # Returns False if it gave up after raising g on max_raised cells, leaving the search inconsistent.
+        # Raising g undoes the previous search where a change invalidated it; lowering g settles cells
+        # a search from scratch would settle too, so only raises count as the cost of reusing the search.
+        # Uses the optimized vertex updates from the D* Lite paper: lowering g[u] can only lower the
+        # neighbours' rhs through u, and raising it only changes those whose rhs came through u, so an
+        # expansion scans its neighbours once instead of running a full lookahead for each of them
+        g, rhs, open_heap, open_keys = self.g, self.rhs, self.open_heap, self.open_keys
+        grid, best_rhs = self.grid, self._BestRhs
+        nx, ny, mult, moves, res = grid.nx, grid.ny, grid.mult, grid.moves, grid.resolution
+        goal, start, km = self.goal, self.start, self.km
+        sr, sc = divmod(start, nx)
+        heappush, heappop = heapq.heappush, heapq.heappop
+
+        def key(u):
+            # _Key() inlined, since it runs on every push and pop
+            m = min(g[u], rhs[u])
+            if m == math.inf:
+                return (math.inf, math.inf)
+            r, c = divmod(u, nx)
+            dr = abs(sr - r)
+            dc = abs(sc - c)
+            h = (dr + _SQRT2_MINUS_1 * dc) * res if dr > dc else (dc + _SQRT2_MINUS_1 * dr) * res
+            return (int((m + h + km) * _KEY_SCALE + 0.5), int(m * _KEY_SCALE + 0.5))
+
+        def requeue(u):
+            open_keys.pop(u, None)
+            if g[u] != rhs[u]:
+                k = open_keys[u] = key(u)
+                heappush(open_heap, (k[0], k[1], u))
+
+        expanded = raised = 0
+        start_state = None
+        while open_heap:
+            k1, k2, u = open_heap[0]
+            if open_keys.get(u) != (k1, k2):
+                heappop(open_heap)
+                continue
+            if (g[start], rhs[start]) != start_state:
+                start_state = (g[start], rhs[start])
+                start_key = key(start)
+            if (k1, k2) >= start_key and rhs[start] <= g[start]:
+                break
+            if max_raised is not None and raised >= max_raised:
+                self.repair_size = expanded
+                return False
+            heappop(open_heap)
+            del open_keys[u]
+            new_key = key(u)
+            if (k1, k2) < new_key:
+                open_keys[u] = new_key
+                heappush(open_heap, (new_key[0], new_key[1], u))
+                continue
+            expanded += 1
+            m = mult[u]
+            r, c = divmod(u, nx)
+            if g[u] > rhs[u]:
+                g_u = g[u] = rhs[u]
+                if m == math.inf:
+                    continue
+                for offset, dr, dc, step in moves:
+                    rr = r + dr
+                    cc = c + dc
+                    if rr < 0 or rr >= ny or cc < 0 or cc >= nx:
+                        continue
+                    v = u + offset
+                    mv = mult[v]
+                    if v == goal or mv == math.inf:
+                        continue
+                    cand = g_u + step * 0.5 * (m + mv)
+                    if cand < rhs[v]:
+                        rhs[v] = cand
+                        requeue(v)
+            else:
+                raised += 1
+                g_old = g[u]
+                g[u] = math.inf
+                requeue(u)
+                for offset, dr, dc, step in moves:
+                    rr = r + dr
+                    cc = c + dc
+                    if rr < 0 or rr >= ny or cc < 0 or cc >= nx:
+                        continue
+                    v = u + offset
+                    mv = mult[v]
+                    if v == goal or mv == math.inf or m == math.inf:
+                        continue
+                    # Within float noise of the cost through u: the best way may have been through u
+                    if rhs[v] >= g_old + step * 0.5 * (m + mv) - 1e-9:
+                        rhs[v] = best_rhs(v)
+                        requeue(v)
+        if max_raised is not None:
+            self.repair_size = expanded
+        return True
+
+    def _AffectedByCell(self, idx: int):
+        r, c = self.grid.Cell(idx)
+        yield idx
+        for dr, dc, _ in _MOVES:
+            rr, cc = r + dr, c + dc
+            if 0 <= rr < self.grid.ny and 0 <= cc < self.grid.nx:
+                yield rr * self.grid.nx + cc
+
+    def MoveStart(self, start):
+        '''
+        Tells the planner the rover is now at a new XY point.
+        '''
+        idx = self.grid.Index(start)
+        if idx < 0:
+            raise ValueError("DStarLite start must be inside the costmap.")
+        self.start = idx
+        self.grid.SetFreeCell(idx)
+
+    def Replan(self) -> list[tuple[int, int]]:
+        '''
+        Picks up costmap changes and rover movement since the last plan, repairs the
+        search, and returns the new path as (row, col) cells, or None if unreachable.
+        '''
+        self.costmap.Update()
+        self.repair_size = 0
+        changed = np.flatnonzero(self.costmap.cost.ravel() != self._seen_cost.ravel()).tolist()
+        if self.start != self.last_start:
+            self.km += self.grid.Heuristic(self.last_start, self.start)
+            # The rover's own cell is always passable, so moving it changes edge costs at both ends
+            changed += [self.last_start, self.start]
+            self.last_start = self.start
+        if changed:
+            self.grid.SetCells(np.asarray(changed, dtype=np.int64))
+            np.copyto(self._seen_cost, self.costmap.cost)
+            affected = set()
+            for idx in changed:
+                affected.update(self._AffectedByCell(idx))
+            for u in affected:
+                self._UpdateVertex(u)
+            if not self._ComputeShortestPath(max(1, int(self.search_size * self.repair_budget))):
+                self.restarts += 1
+                self._Search()
+        return self.Plan()
+
+    def Plan(self) -> list[tuple[int, int]]:
+        '''
+        Returns the current best path as (row, col) cells, or None if unreachable.
+        '''
+        self._ComputeShortestPath()
+        # The search may stop with the start's g still unset; rhs holds its cost-to-goal
+        if self.rhs[self.start] == math.inf:
+            return None
+        path = [self.grid.Cell(self.start)]
+        u = self.start
+        visited = {u}
+        while u != self.goal:
+            best, best_cost = -1, math.inf
+            for v, edge_cost in self.grid.Neighbors(u):
+                cand = edge_cost + self.g[v]
+                if cand < best_cost:
+                    best, best_cost = v, cand
+            if best < 0 or best in visited:
+                return None
+            visited.add(best)
+            path.append(self.grid.Cell(best))
+            u = best
+        return path
+
+
+def Simplify(costmap: Costmap, cells: list[tuple[int, int]]) -> list[XY]:
+    '''
+    Turns a cell path into a short list of XY waypoints, excluding the start.
+    Each leg is stretched along the path for as long as it stays out of inflated
+    obstacles and is no costlier than the worst cell it replaces.
+    '''
+    if not cells:
+        return []
+    points = np.array([costmap.CellToWorld(r, c) for r, c in cells])
+    costs = costmap.Costs(points)
+    waypoints = []
+    anchor = 0
+    while anchor < len(points) - 1:
+        nxt = anchor + 1
+        worst = int(costs[nxt])
+        for j in range(anchor + 2, len(points)):
+            worst = max(worst, int(costs[j]))
+            leg_cost = costmap.SegmentMaxCost(points[anchor], points[j])
+            if leg_cost >= INSCRIBED or leg_cost > worst:
+                break
+            nxt = j
+        waypoints.append(XY(float(points[nxt, 0]), float(points[nxt, 1])))
+        anchor = nxt
+    return waypoints
+
+
+def PlanWaypoints(costmap: Costmap, start, goal, cost_weight: float = 4.0,
+                  heuristic_weight: float = 1.5) -> list[XY]:
+    '''
+    Plans from start to goal with (weighted) A* and returns simplified XY waypoints,
+    excluding the start, or None if the goal cannot be reached. Feed the result to
+    TaskGraph.CreateMoveChain to get MoveToCoord tasks.
+    '''
+    cells = AStar(costmap, start, goal, cost_weight, heuristic_weight)
+    if cells is None:
+        return None
+    return Simplify(costmap, cells)
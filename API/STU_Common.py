@@ -15,37 +15,201 @@ class Command:
         self.payload.AddParam(st.VarType.string, ["#meta", "command_id"], self.command_id)
 
 
+class LocalFrame:
+    '''
+    The LocalCoordinateOrigin frame that all XY coordinates are expressed in.
+
+    The origin location, rotation, NWU basis and planet radius are read from the sim once,
+    on first use, and kept until Refresh() is called. Use GetLocalFrame() rather than
+    constructing this directly so every XY shares the same cached frame.
+    '''
+    def __init__(self):
+        self.resolved = False
+        self.originLoc = None
+        self.originRot = None
+        self.originNWU: st.PlanetUtils.NorthWestUp = None
+        self.north = None
+        self.west = None
+        # (2,3) matrix with north and west as rows; maps XY offsets to PCPF offsets
+        self.basis = None
+        self.radius = 0.0
+
+    def Refresh(self):
+        '''
+        Re-reads the origin and planet from the sim.
+        Only needed if the LocalCoordinateOrigin entity or the planet changes.
+        '''
+        originEn: st.Entity = st.GetSimEntity().GetParam(st.VarType.entityRef, "LocalCoordinateOrigin")
+        originSM = SM.GetMover(originEn)
+        self.SetOrigin(originSM.GetCurrentCoord(), originSM.radius)
+
+    def SetOrigin(self, originCoord: st.PlanetUtils.Coord, radius: float):
+        '''
+        Uses originCoord on a planet of the given radius (m) as the origin, without reading the sim.
+        '''
+        self.originLoc = np.asarray(originCoord.getLoc(), dtype=np.float64)
+        self.originRot = originCoord.getRot()
+        self.originNWU = originCoord.getNWU()
+        self.north = np.asarray(self.originNWU.north(), dtype=np.float64)
+        self.west = np.asarray(self.originNWU.west(), dtype=np.float64)
+        self.basis = np.vstack((self.north, self.west))
+        self.radius = radius
+        self.resolved = True
+
+    def Resolve(self) -> "LocalFrame":
+        '''
+        Returns this frame, reading it from the sim first if it has never been resolved.
+        '''
+        if not self.resolved:
+            self.Refresh()
+        return self
+
+
+_local_frame = LocalFrame()
+
+def GetLocalFrame() -> LocalFrame:
+    '''
+    Returns the process-wide LocalCoordinateOrigin frame, resolving it on first use.
+    '''
+    return _local_frame.Resolve()
+
+def SetLocalFrame(originCoord: st.PlanetUtils.Coord, radius: float) -> LocalFrame:
+    '''
+    Sets the process-wide frame's origin by hand instead of reading it from the sim, e.g. for
+    offline tools and benchmarks. Returns the frame.
+    '''
+    _local_frame.SetOrigin(originCoord, radius)
+    return _local_frame
+
+
 class XY:
+    __slots__ = ("x", "y")
+
     def __init__(self, _x, _y):
         self.x = _x
         self.y = _y
-        originEn: st.Entity = st.GetSimEntity().GetParam(st.VarType.entityRef, "LocalCoordinateOrigin")
-        self.originSM = SM.SurfaceMover(originEn, st.GetSimEntity().GetParam(st.VarType.entityRef, "Planet"))
-        self.originCoord: st.PlanetUtils.Coord = self.originSM.GetCurrentCoord()
-        self.originLoc = self.originCoord.getLoc()
-        self.originRot = self.originCoord.getRot()
-        self.originNWU: st.PlanetUtils.NorthWestUp = self.originCoord.getNWU()
     
     def toCoord(self) -> st.PlanetUtils.Coord:
-        loc = self.originLoc + self.originNWU.north() * self.x + self.originNWU.west() * self.y
-        rot = self.originRot
-        return st.PlanetUtils.Coord(loc, rot, self.originSM.radius)
+        frame = GetLocalFrame()
+        loc = frame.originLoc + frame.north * self.x + frame.west * self.y
+        return st.PlanetUtils.Coord(loc, frame.originRot, frame.radius)
     
     def toLLA(self) -> st.PlanetUtils.LatLonAlt:
-        loc = self.originLoc + self.originNWU.north() * self.x + self.originNWU.west() * self.y
-        return st.PlanetUtils.PCPF_to_LLA(loc, self.originSM.radius)
+        frame = GetLocalFrame()
+        loc = frame.originLoc + frame.north * self.x + frame.west * self.y
+        return st.PlanetUtils.PCPF_to_LLA(loc, frame.radius)
     
     def __str__(self) -> str:
         # rounds to nearest cm
         return f"({round(self.x, 2)}, {round(self.y, 2)})"
 
 
+def AsPoint(p) -> tuple[float, float]:
+    '''
+    Returns (x, y) floats for an XY or any (x, y) sequence, e.g. a tuple or an XYArray row.
+    '''
+    if isinstance(p, XY):
+        return float(p.x), float(p.y)
+    return float(p[0]), float(p[1])
+
+
 def CoordToXY(_coord: st.PlanetUtils.Coord) -> XY:
-    xy = XY(0, 0)
-    coord_offset = _coord.getLoc() - xy.originLoc
-    xy.x = np.dot(coord_offset, xy.originNWU.north())
-    xy.y = np.dot(coord_offset, xy.originNWU.west())
-    return xy
+    frame = GetLocalFrame()
+    coord_offset = _coord.getLoc() - frame.originLoc
+    return XY(np.dot(coord_offset, frame.north), np.dot(coord_offset, frame.west))
+
+
+class XYArray:
+    '''
+    A batch of XY coordinates backed by an (N,2) float64 array.
+
+    Conversions go through the cached LocalFrame with a single matrix multiply, so
+    converting thousands of points costs about as much as converting one.
+    LLA arrays are (N,3) rows of [lat_deg, lon_deg, alt_m] on a spherical planet,
+    matching st.PlanetUtils.PCPF_to_LLA.
+    '''
+    __slots__ = ("xy",)
+
+    def __init__(self, xy):
+        self.xy: np.ndarray = np.ascontiguousarray(xy, dtype=np.float64).reshape(-1, 2)
+
+    @classmethod
+    def from_xys(cls, xys: list[XY]) -> "XYArray":
+        return cls([(xy.x, xy.y) for xy in xys])
+
+    @classmethod
+    def from_pcpf(cls, locs) -> "XYArray":
+        '''
+        Builds an XYArray from an (N,3) array of planet-centered planet-fixed locations.
+        '''
+        frame = GetLocalFrame()
+        offsets = np.asarray(locs, dtype=np.float64).reshape(-1, 3) - frame.originLoc
+        return cls(offsets @ frame.basis.T)
+
+    @classmethod
+    def from_lla(cls, lla) -> "XYArray":
+        '''
+        Builds an XYArray from an (N,3) array of [lat_deg, lon_deg, alt_m] rows.
+        '''
+        frame = GetLocalFrame()
+        lla = np.asarray(lla, dtype=np.float64).reshape(-1, 3)
+        lat = np.radians(lla[:, 0])
+        lon = np.radians(lla[:, 1])
+        r = frame.radius + lla[:, 2]
+        cos_lat = np.cos(lat)
+        locs = np.column_stack((r * cos_lat * np.cos(lon), r * cos_lat * np.sin(lon), r * np.sin(lat)))
+        return cls.from_pcpf(locs)
+
+    def to_pcpf(self) -> np.ndarray:
+        '''
+        Returns an (N,3) array of planet-centered planet-fixed locations.
+        '''
+        frame = GetLocalFrame()
+        return frame.originLoc + self.xy @ frame.basis
+
+    def to_lla(self) -> np.ndarray:
+        '''
+        Returns an (N,3) array of [lat_deg, lon_deg, alt_m] rows.
+        '''
+        frame = GetLocalFrame()
+        locs = self.to_pcpf()
+        r = np.linalg.norm(locs, axis=1)
+        lat = np.degrees(np.arcsin(locs[:, 2] / r))
+        lon = np.degrees(np.arctan2(locs[:, 1], locs[:, 0]))
+        return np.column_stack((lat, lon, r - frame.radius))
+
+    def to_xys(self) -> list[XY]:
+        return [XY(x, y) for x, y in self.xy.tolist()]
+
+    @property
+    def x(self) -> np.ndarray:
+        return self.xy[:, 0]
+
+    @property
+    def y(self) -> np.ndarray:
+        return self.xy[:, 1]
+
+    def __len__(self) -> int:
+        return self.xy.shape[0]
+
+    def __getitem__(self, i: int) -> XY:
+        return XY(self.xy[i, 0], self.xy[i, 1])
+
+
+_SIM_TIME_EPOCH = datetime.datetime(2000, 1, 1)
+
+def SimTimeNs(ts: st.timestamp = None) -> int:
+    '''
+    Returns a sim timestamp as integer nanoseconds, suitable for comparing and hashing.
+    With no timestamp given, reads the sim clock.
+    '''
+    if ts is None:
+        ts = st.SimGlobals_SimClock_GetTimeNow()
+    dt = ts.as_datetime()
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    delta = dt - _SIM_TIME_EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000_000 + delta.microseconds * 1000
 
 
 def _commandID_Str(en : st.Entity, cmd_type : str):
@@ -106,3 +270,44 @@ def Command_PlaceDownAntenna(en: st.Entity, task_id: str):
     cmd = Command("PlaceDownAntenna", en)
     cmd.payload.AddParam(st.VarType.string, "TaskID", task_id)
     return cmd
+
+
+# Payload params of each command type beyond TaskID, as (key, VarType name), for CommandToDict/CommandFromDict
+_COMMAND_PARAMS = {
+    "MoveToCoord": [("Loc", "doubleV3")],
+    "Stop": [],
+    "RotateToAzimuth": [("Azimuth", "double")],
+    "CameraPan": [("Azimuth", "double"), ("Elevation", "double")],
+    "CaptureImage": [("Exposure", "double")],
+    "PickUpAntenna": [("ParamListName", "string")],
+    "PlaceDownAntenna": [],
+}
+# Command types whose payload also names the entity, at ["#meta", "Entity"]
+_COMMANDS_WITH_ENTITY = {"MoveToCoord", "Stop"}
+
+def CommandToDict(cmd: Command) -> dict:
+    '''
+    Returns a command's type, entity name and payload params as plain JSON-friendly values,
+    e.g. for saving a task graph. Rebuild it with CommandFromDict.
+    '''
+    data = {"type": cmd.command_type, "en": cmd.en.getName()}
+    if cmd.payload.HasParam(st.VarType.string, "TaskID"):
+        data["TaskID"] = cmd.payload.GetParam(st.VarType.string, "TaskID")
+    for key, var_type in _COMMAND_PARAMS.get(cmd.command_type, []):
+        value = cmd.payload.GetParam(getattr(st.VarType, var_type), key)
+        data[key] = np.asarray(value, dtype=np.float64).tolist() if var_type == "doubleV3" else value
+    return data
+
+def CommandFromDict(data: dict, en: st.Entity) -> Command:
+    '''
+    Rebuilds a command saved by CommandToDict, for the given entity.
+    '''
+    cmd = Command(data["type"], en)
+    if cmd.command_type in _COMMANDS_WITH_ENTITY:
+        cmd.payload.AddParam(st.VarType.entityRef, ["#meta", "Entity"], en)
+    if "TaskID" in data:
+        cmd.payload.AddParam(st.VarType.string, "TaskID", data["TaskID"])
+    for key, var_type in _COMMAND_PARAMS.get(cmd.command_type, []):
+        value = np.array(data[key], dtype=np.float64) if var_type == "doubleV3" else data[key]
+        cmd.payload.AddParam(getattr(st.VarType, var_type), key, value)
+    return cmd
@@ -3,13 +3,92 @@ import spaceteams as st
 import numpy as np
 
 
-class SurfaceMover:
-    def __init__(self, en: st.Entity, planet: st.Entity):
-        self.en = en
+class PlanetHandle:
+    '''
+    A planet entity together with its body-fixed frame and radius, read from the sim once.
+    '''
+    def __init__(self, planet: st.Entity):
         self.planet = planet
         self.pcpf: st.Frame = planet.GetBodyFixedFrame()
         # Radius in km, converted to m
         self.radius = planet.GetParam(st.VarType.double, ["#Planet", "General", "Radius"]) * 1000.0
+
+
+# Keyed by planet name; None holds the sim's default "Planet"
+_planet_handles: dict[str, PlanetHandle] = {}
+# Keyed by the (entity, planet) GetMover was called with, so a lookup makes no SDK calls
+_movers: dict[tuple, "SurfaceMover"] = {}
+# The same movers keyed by (entity name, planet name), so different handles to one entity share a mover
+_movers_by_name: dict[tuple[str, str], "SurfaceMover"] = {}
+
+
+def GetPlanetHandle(planet: st.Entity = None) -> PlanetHandle:
+    '''
+    Returns the cached handle for a planet, creating it on first use.
+    With no planet given, uses the sim's "Planet" param.
+    '''
+    if planet is None:
+        handle = _planet_handles.get(None)
+        if handle is None:
+            handle = GetPlanetHandle(st.GetSimEntity().GetParam(st.VarType.entityRef, "Planet"))
+            _planet_handles[None] = handle
+        return handle
+    key = planet.getName()
+    handle = _planet_handles.get(key)
+    if handle is None:
+        handle = PlanetHandle(planet)
+        _planet_handles[key] = handle
+    return handle
+
+
+def GetMover(en: st.Entity, planet: st.Entity = None) -> "SurfaceMover":
+    '''
+    Returns the shared SurfaceMover for an entity on a planet, creating it on first use.
+    With no planet given, uses the sim's "Planet" param.
+    '''
+    mover = _movers.get((en, planet))
+    if mover is None:
+        name_key = (en.getName(), GetPlanetHandle(planet).planet.getName())
+        mover = _movers_by_name.get(name_key)
+        if mover is None:
+            mover = SurfaceMover(en, planet)
+            _movers_by_name[name_key] = mover
+        _movers[(en, planet)] = mover
+    return mover
+
+
+def InvalidateMovers(planet: st.Entity = None):
+    '''
+    Drops cached planet handles and movers so they are rebuilt from the sim on next use,
+    along with EntityTelemetry's cached entity refs. With a planet given, only that planet's
+    handle and the movers on it are dropped, but the entity refs still are.
+
+    The local XY frame caches the planet too; call STU_Common.GetLocalFrame().Refresh()
+    afterwards if the LocalCoordinateOrigin's planet changed.
+    '''
+    # Imported here: EntityTelemetry imports this module
+    import API.EntityTelemetry as ET
+    ET.InvalidateEntityRefs()
+    if planet is None:
+        _planet_handles.clear()
+        _movers.clear()
+        _movers_by_name.clear()
+        return
+    name = planet.getName()
+    for key in [key for key, handle in _planet_handles.items() if handle.planet.getName() == name]:
+        del _planet_handles[key]
+    for movers in (_movers, _movers_by_name):
+        for key in [key for key, mover in movers.items() if mover.planet.getName() == name]:
+            del movers[key]
+
+
+class SurfaceMover:
+    def __init__(self, en: st.Entity, planet: st.Entity = None):
+        handle = GetPlanetHandle(planet)
+        self.en = en
+        self.planet = handle.planet
+        self.pcpf: st.Frame = handle.pcpf
+        self.radius = handle.radius
     
     def GetMovementState(self) -> str:
         return st.SurfaceMove.GetMovementState(self.en)
@@ -0,0 +1,549 @@
+import heapq
+import math
+import bisect
+import numpy as np
+
+from API.STU_Common import XY, AsPoint
+from API.ObstacleProximity import DEFAULT_ENTITY_RADIUS_M
+from API.ObstacleMap import StoreSync
+
+_TWO_PI = 2.0 * math.pi
+# Tangent segments graze their own circles; anything closer than this counts as a hit
+_EPS = 1e-6
+
+
+def _NonZero(mask: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    '''
+    np.nonzero() of a 2-D mask, sorted by row; going through flatnonzero() is several times faster.
+    '''
+    return np.divmod(np.flatnonzero(mask), mask.shape[1])
+
+
+def _PairsBlocked(ax, ay, bx, by, rows, cols, cx, cy, radii) -> np.ndarray:
+    '''
+    For each (segment row, circle col) pair, whether segment a->b passes strictly inside the circle.
+    '''
+    dx = bx[rows] - ax[rows]
+    dy = by[rows] - ay[rows]
+    rx = cx[cols] - ax[rows]
+    ry = cy[cols] - ay[rows]
+    t = np.clip((rx * dx + ry * dy) / np.maximum(dx * dx + dy * dy, 1e-12), 0.0, 1.0)
+    ex = rx - t * dx
+    ey = ry - t * dy
+    return ex * ex + ey * ey < (radii[cols] - _EPS) ** 2
+
+
+def _SegmentsBlocked(ax, ay, bx, by, cx, cy, radii) -> np.ndarray:
+    '''
+    (S,C) mask of which segments a->b pass strictly inside which circles.
+    '''
+    dx = bx - ax
+    dy = by - ay
+    length = np.maximum(np.hypot(dx, dy), 1e-12)
+    ux = dx / length
+    uy = dy / length
+    r = radii - _EPS
+    # Distance along and across each segment's line to each center, so only pairs whose
+    # line passes through the circle near the segment get the exact test
+    centers = np.vstack((cx, cy))
+    proj = np.column_stack((ux, uy)) @ centers - (ux * ax + uy * ay)[:, None]
+    perp = np.column_stack((-uy, ux)) @ centers - (ux * ay - uy * ax)[:, None]
+    rows, cols = _NonZero((np.abs(perp) < r) & (proj > -r) & (proj < length[:, None] + r))
+    blocked = np.zeros((len(length), len(r)), dtype=bool)
+    blocked[rows, cols] = _PairsBlocked(ax, ay, bx, by, rows, cols, cx, cy, radii)
+    return blocked
+
+
+def _RaysBlocked(px: float, py: float, tx, ty, cx, cy, radii, skip, own=None) -> np.ndarray:
+    '''
+    (S,) mask of which segments from the common point p to each t pass strictly inside
+    a circle, leaving out the circles in the skip mask and each segment's own circle.
+    Cheaper than _SegmentsBlocked since all segments share one end.
+    '''
+    dx = tx - px
+    dy = ty - py
+    length = np.maximum(np.hypot(dx, dy), 1e-12)
+    wx = cx - px
+    wy = cy - py
+    r_sq = (radii - _EPS) ** 2
+    d_sq = wx * wx + wy * wy
+    # A ray enters a circle's cone only where its projection on the center passes the
+    # tangent length, and it cannot reach a circle whose near side is past its end, so
+    # one compare per pair leaves only a few pairs for the exact test
+    reach = np.sqrt(np.maximum(d_sq - r_sq, 0.0))
+    reach[skip] = np.inf
+    near = np.sqrt(d_sq) - radii
+    proj = np.column_stack((dx / length, dy / length)) @ np.vstack((wx, wy))
+    rows, cols = _NonZero((proj > reach) & (near[None, :] < length[:, None]))
+    if own is not None:
+        other = cols != own[rows]
+        rows, cols = rows[other], cols[other]
+    p = proj[rows, cols]
+    # Where the ray enters the circle
+    entry = p - np.sqrt(np.maximum(r_sq[cols] - (d_sq[cols] - p * p), 0.0))
+    blocked = np.zeros(len(length), dtype=bool)
+    blocked[rows[entry < length[rows]]] = True
+    return blocked
+
+
+class VisibilityGraph:
+    '''
+    Exact shortest paths around circular obstacles in local XY.
+
+    Every obstacle is inflated by the rover radius (plus an optional clearance). The graph's
+    nodes are the tangent points of the segments that touch two circles without cutting any
+    other circle; travel along a circle between neighboring tangent points is an arc edge.
+    A query adds tangents from the start and goal and runs A* with a straight-line
+    heuristic, so the result is the true shortest path rather than a grid approximation.
+
+    AddObstacle() updates the graph in place: it drops the tangent segments the new circle
+    cuts and adds the new circle's own tangents, instead of rebuilding every pair.
+
+    On the 200-rock field in benchmarks/VisibilityGraph_Benchmark.py a query takes 1-3 ms,
+    short of the sub-millisecond target, so PathPlanner.PlanWaypoints stays the planner
+    the mission uses; use this one where exact, shortest traverses are worth the build.
+    '''
+    def __init__(self, rover_radius_m: float = DEFAULT_ENTITY_RADIUS_M, clearance_m: float = 0.0,
+                 max_arc_step_deg: float = 30.0):
+        self.inflate = rover_radius_m + clearance_m
+        self.max_arc_step = math.radians(max_arc_step_deg)
+        # Circles, inflated
+        self.cx: list[float] = []
+        self.cy: list[float] = []
+        self.radii: list[float] = []
+        self._arrays = None
+        # Tangent points: position, circle, angle on that circle, and the node at the other
+        # end of the node's tangent segment (-1 once the segment has been cut)
+        self.node_x: list[float] = []
+        self.node_y: list[float] = []
+        self.node_circle: list[int] = []
+        self.node_angle: list[float] = []
+        self.node_partner: list[int] = []
+        self.node_length: list[float] = []
+        # Per circle, live nodes sorted by angle, as (angle, node) pairs
+        self.circle_nodes: list[list[tuple[float, int]]] = []
+        # Per circle, angular intervals covered by overlapping circles, as (center, half width)
+        self.circle_blocked: list[list[tuple[float, float]]] = []
+        # Per circle, cached edges out of its nodes: node -> [(neighbor, kind, length)], where
+        # kind is 0 for the node's tangent segment and the arc direction (+1/-1) otherwise
+        self._edges: dict[int, dict[int, list[tuple[int, int, float]]]] = {}
+        # Live tangent segments as flat arrays, for cutting them when a circle is added
+        self._seg = np.zeros((0, 4))
+        self._seg_nodes = np.zeros((0, 2), dtype=np.int64)
+        # Store obstacles taken in by SyncFromStore
+        self._store_sync = StoreSync()
+        # Outdated copies of moved or grown store obstacles still in the graph
+        self._stale = 0
+        # Bumped whenever the graph changes
+        self.version = 0
+        # (goal x, goal y, version, ignore mask) -> visible tangents, since replans usually keep the goal
+        self._goal_key = None
+        self._goal_tangents = None
+
+    def __len__(self) -> int:
+        return len(self.radii)
+
+    def _Circles(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        if self._arrays is None:
+            self._arrays = (np.array(self.cx), np.array(self.cy), np.array(self.radii))
+        return self._arrays
+
+    # Building
+
+    def AddObstacle(self, x: float, y: float, radius: float) -> int:
+        '''
+        Adds a circular obstacle given by its real (uninflated) radius and returns its index.
+        '''
+        k = len(self.radii)
+        r = radius + self.inflate
+        self.cx.append(x)
+        self.cy.append(y)
+        self.radii.append(r)
+        self._arrays = None
+        self.circle_nodes.append([])
+        self.circle_blocked.append([])
+        self._CutSegments(x, y, r)
+        self._AddOverlaps(k)
+        self._AddTangents(k)
+        self.version += 1
+        return k
+
+    def AddObstacles(self, circles) -> list[int]:
+        '''
+        Adds an (N,3) array of [x, y, radius] rows.
+        '''
+        return [self.AddObstacle(x, y, r) for x, y, r in np.asarray(circles, dtype=np.float64).reshape(-1, 3).tolist()]
+
+    def SyncFromStore(self, store) -> int:
+        '''
+        Brings the graph up to date with an ObstacleMap.ObstacleStore. New obstacles are
+        added incrementally. Circles can't be taken out of the graph, so an obstacle that
+        the store has moved or grown (refining repeat sightings) is added again over its
+        old circle, and the graph is rebuilt once those stale circles reach a quarter of
+        the store. Returns how many obstacles were added.
+        '''
+        sync = self._store_sync
+        circles, changed, n_old = sync.Pull(store)
+        stale = self._stale + len(changed)
+        if stale * 4 > len(circles):
+            self.Clear()
+            self._store_sync = sync
+            self.AddObstacles(circles)
+            return len(circles)
+        self._stale = stale
+        self.AddObstacles(np.vstack((circles[changed], circles[n_old:])))
+        return len(changed) + len(circles) - n_old
+
+    def Clear(self):
+        self.__init__(self.inflate, 0.0, math.degrees(self.max_arc_step))
+
+    def _CutSegments(self, x: float, y: float, r: float):
+        if len(self._seg) == 0:
+            return
+        seg = self._seg
+        cut = _SegmentsBlocked(seg[:, 0], seg[:, 1], seg[:, 2], seg[:, 3],
+                               np.array([x]), np.array([y]), np.array([r]))[:, 0]
+        if not cut.any():
+            return
+        for a, b in self._seg_nodes[cut].tolist():
+            self._RemoveNode(a)
+            self._RemoveNode(b)
+        self._seg = seg[~cut]
+        self._seg_nodes = self._seg_nodes[~cut]
+
+    def _RemoveNode(self, node: int):
+        nodes = self.circle_nodes[self.node_circle[node]]
+        i = bisect.bisect_left(nodes, (self.node_angle[node], node))
+        del nodes[i]
+        self.node_partner[node] = -1
+        self._edges.pop(self.node_circle[node], None)
+
+    def _AddOverlaps(self, k: int):
+        cx, cy, radii = self._Circles()
+        d = np.hypot(cx[:k] - cx[k], cy[:k] - cy[k])
+        rk = radii[k]
+        for j in np.flatnonzero(d < radii[:k] + rk).tolist():
+            dj, rj = float(d[j]), float(radii[j])
+            if dj <= abs(rj - rk):
+                # One circle inside the other; the inner one has no usable boundary
+                inner = j if rj < rk else k
+                self.circle_blocked[inner].append((0.0, math.pi))
+                self._edges.pop(inner, None)
+                continue
+            toward_k = math.atan2(cy[k] - cy[j], cx[k] - cx[j])
+            self.circle_blocked[j].append((toward_k, math.acos((rj * rj + dj * dj - rk * rk) / (2.0 * rj * dj))))
+            toward_j = toward_k + math.pi
+            self.circle_blocked[k].append((toward_j, math.acos((rk * rk + dj * dj - rj * rj) / (2.0 * rk * dj))))
+            self._edges.pop(j, None)
+            self._edges.pop(k, None)
+
+    def _AddTangents(self, k: int):
+        cx, cy, radii = self._Circles()
+        if k == 0:
+            return
+        j = np.arange(k)
+        vx = cx[j] - cx[k]
+        vy = cy[j] - cy[k]
+        d = np.hypot(vx, vy)
+        vx = vx / np.maximum(d, 1e-12)
+        vy = vy / np.maximum(d, 1e-12)
+        rk, rj = radii[k], radii[j]
+        ax, ay, bx, by, ja = [], [], [], [], []
+        # sign1 = +1 gives the outer tangents, -1 the inner ones; sign2 picks the side
+        for sign1 in (1.0, -1.0):
+            c = (rk - sign1 * rj) / np.maximum(d, 1e-12)
+            ok = c * c < 1.0
+            h = np.sqrt(np.maximum(0.0, 1.0 - c * c))
+            for sign2 in (1.0, -1.0):
+                nx = vx * c - sign2 * h * vy
+                ny = vy * c + sign2 * h * vx
+                ax.append((cx[k] + rk * nx)[ok])
+                ay.append((cy[k] + rk * ny)[ok])
+                bx.append((cx[j] + sign1 * rj * nx)[ok])
+                by.append((cy[j] + sign1 * rj * ny)[ok])
+                ja.append(j[ok])
+        ax, ay, bx, by, ja = (np.concatenate(v) for v in (ax, ay, bx, by, ja))
+        if len(ja) == 0:
+            return
+        # Every tangent between k and j lies in the capsule of the larger radius around the
+        # segment between their centers, so only circles reaching into it need the exact test
+        wx = cx - cx[k]
+        wy = cy - cy[k]
+        t = np.clip(np.column_stack((vx, vy)) @ np.vstack((wx, wy)), 0.0, d[:, None])
+        ex = wx - t * vx[:, None]
+        ey = wy - t * vy[:, None]
+        reach = np.maximum(rk, rj)[:, None] + radii
+        near_j, near_c = _NonZero(ex * ex + ey * ey < reach * reach)
+        # Pair every segment with the circles near its j; _NonZero() returns them sorted by j
+        first = np.searchsorted(near_j, ja, "left")
+        counts = np.searchsorted(near_j, ja, "right") - first
+        rows = np.repeat(np.arange(len(ja)), counts)
+        cols = near_c[np.arange(len(rows)) - np.repeat(np.cumsum(counts) - counts - first, counts)]
+        # A tangent only grazes its own two circles
+        own = (cols == k) | (cols == ja[rows])
+        rows, cols = rows[~own], cols[~own]
+        keep = np.ones(len(ja), dtype=bool)
+        keep[rows[_PairsBlocked(ax, ay, bx, by, rows, cols, cx, cy, radii)]] = False
+        ax, ay, bx, by, ja = ax[keep], ay[keep], bx[keep], by[keep], ja[keep]
+        new_nodes = []
+        for x0, y0, x1, y1, other in zip(ax.tolist(), ay.tolist(), bx.tolist(), by.tolist(), ja.tolist()):
+            a = self._AddNode(x0, y0, k)
+            b = self._AddNode(x1, y1, other)
+            self.node_partner[a] = b
+            self.node_partner[b] = a
+            self.node_length[a] = self.node_length[b] = math.hypot(x1 - x0, y1 - y0)
+            new_nodes.append((a, b))
+        self._seg = np.vstack((self._seg, np.column_stack((ax, ay, bx, by))))
+        self._seg_nodes = np.vstack((self._seg_nodes, np.array(new_nodes, dtype=np.int64).reshape(-1, 2)))
+
+    def _AddNode(self, x: float, y: float, circle: int) -> int:
+        node = len(self.node_x)
+        angle = math.atan2(y - self.cy[circle], x - self.cx[circle]) % _TWO_PI
+        self.node_x.append(x)
+        self.node_y.append(y)
+        self.node_circle.append(circle)
+        self.node_angle.append(angle)
+        self.node_partner.append(-1)
+        self.node_length.append(0.0)
+        bisect.insort(self.circle_nodes[circle], (angle, node))
+        self._edges.pop(circle, None)
+        return node
+
+    # Queries
+
+    def _ArcFree(self, circle: int, start_angle: float, sweep: float) -> bool:
+        '''
+        Whether the counterclockwise arc from start_angle through sweep stays clear of
+        every overlapping circle.
+        '''
+        for center, half in self.circle_blocked[circle]:
+            s = (center - half - start_angle) % _TWO_PI
+            if s <= sweep or s + 2.0 * half >= _TWO_PI:
+                return False
+        return True
+
+    def _Edges(self, circle: int, nodes: list[tuple[float, int]]) -> dict[int, list[tuple[int, int, float]]]:
+        '''
+        Edges out of the nodes on a circle: node -> [(neighbor, kind, length)], where kind
+        is 0 for the node's tangent segment, and +1 (counterclockwise) or -1 (clockwise)
+        for arcs between angle-adjacent nodes.
+        '''
+        n = len(self.node_partner)
+        arcs = {}
+        for _, node in nodes:
+            partner = self.node_partner[node] if node < n else -1
+            arcs[node] = [(partner, 0, self.node_length[node])] if partner >= 0 else []
+        if len(nodes) < 2:
+            return arcs
+        r = self.radii[circle]
+        for i, (angle_u, u) in enumerate(nodes):
+            angle_v, v = nodes[(i + 1) % len(nodes)]
+            sweep = (angle_v - angle_u) % _TWO_PI
+            if self._ArcFree(circle, angle_u, sweep):
+                arcs[u].append((v, 1, r * sweep))
+                arcs[v].append((u, -1, r * sweep))
+        return arcs
+
+    def _CircleEdges(self, circle: int) -> dict[int, list[tuple[int, int, float]]]:
+        edges = self._edges.get(circle)
+        if edges is None:
+            edges = self._edges[circle] = self._Edges(circle, self.circle_nodes[circle])
+        return edges
+
+    def _MergedEdges(self, circle: int, extra: list[tuple[float, int]]) -> dict[int, list[tuple[int, int, float]]]:
+        '''
+        A circle's edges with query-only nodes spliced in between their angle neighbors.
+        Arcs between permanent nodes stay, since they remain free and as long as before,
+        so only the lists of the nodes next to an extra node are copied.
+        '''
+        edges = dict(self._CircleEdges(circle))
+        nodes = sorted(self.circle_nodes[circle] + extra)
+        m = len(nodes)
+        copied = set()
+        for _, node in extra:
+            edges[node] = []
+            copied.add(node)
+        if m < 2:
+            return edges
+        pairs = set()
+        for item in extra:
+            i = bisect.bisect_left(nodes, item)
+            pairs.add(((i - 1) % m, i))
+            pairs.add((i, (i + 1) % m))
+        r = self.radii[circle]
+        for i, j in pairs:
+            angle_u, u = nodes[i]
+            angle_v, v = nodes[j]
+            sweep = (angle_v - angle_u) % _TWO_PI
+            if self._ArcFree(circle, angle_u, sweep):
+                for node in (u, v):
+                    if node not in copied:
+                        edges[node] = list(edges[node])
+                        copied.add(node)
+                edges[u].append((v, 1, r * sweep))
+                edges[v].append((u, -1, r * sweep))
+        return edges
+
+    def _PointTangents(self, px: float, py: float, ignore: np.ndarray):
+        '''
+        Tangent points from p to every circle whose segment from p is clear of every
+        other circle, as arrays (x, y, circle).
+        '''
+        cx, cy, radii = self._Circles()
+        dx = cx - px
+        dy = cy - py
+        d = np.hypot(dx, dy)
+        ok = (d > radii) & ~ignore
+        base = np.arctan2(-dy, -dx)
+        alpha = np.arccos(np.clip(radii / np.maximum(d, 1e-12), -1.0, 1.0))
+        idx = np.flatnonzero(ok)
+        idx = np.concatenate((idx, idx))
+        theta = np.concatenate((base[ok] + alpha[ok], base[ok] - alpha[ok]))
+        tx = cx[idx] + radii[idx] * np.cos(theta)
+        ty = cy[idx] + radii[idx] * np.sin(theta)
+        keep = ~_RaysBlocked(px, py, tx, ty, cx, cy, radii, ignore, idx)
+        return tx[keep], ty[keep], idx[keep]
+
+    def ShortestPath(self, start, goal) -> tuple[list[XY], float]:
+        '''
+        Returns (waypoints, length) for the shortest path from start to goal, where the
+        waypoints exclude the start and follow arcs with a circumscribed polygon, so every
+        straight leg between them stays clear. Returns (None, inf) if goal is unreachable.
+        Obstacles that contain the start or goal are ignored, so a rover that is already
+        too close to a rock can still plan its way out.
+        '''
+        sx, sy = AsPoint(start)
+        gx, gy = AsPoint(goal)
+        if not self.radii:
+            return [XY(gx, gy)], math.hypot(gx - sx, gy - sy)
+        cx, cy, radii = self._Circles()
+        ignore = (np.hypot(cx - sx, cy - sy) <= radii) | (np.hypot(cx - gx, cy - gy) <= radii)
+        if not _RaysBlocked(sx, sy, np.array([gx]), np.array([gy]), cx, cy, radii, ignore)[0]:
+            return [XY(gx, gy)], math.hypot(gx - sx, gy - sy)
+
+        # Query-only nodes are numbered after the permanent ones: start, goal, then the
+        # visible tangent points seen from each
+        n = len(self.node_x)
+        S, G = n, n + 1
+        node_x, node_y, node_circle = self.node_x, self.node_y, self.node_circle
+        extra_x = [sx, gx]
+        extra_y = [sy, gy]
+        extra_circle = [-1, -1]
+        extra_angle = [0.0, 0.0]
+        start_edges = []
+        goal_edges = {}
+        extra_nodes: dict[int, list[tuple[float, int]]] = {}
+        goal_key = (gx, gy, self.version, ignore.tobytes())
+        if goal_key != self._goal_key:
+            self._goal_key = goal_key
+            self._goal_tangents = self._PointTangents(gx, gy, ignore)
+        for end in (S, G):
+            tx, ty, idx = self._PointTangents(sx, sy, ignore) if end == S else self._goal_tangents
+            for x, y, circle in zip(tx.tolist(), ty.tolist(), idx.tolist()):
+                node = n + len(extra_x)
+                angle = math.atan2(y - self.cy[circle], x - self.cx[circle]) % _TWO_PI
+                extra_x.append(x)
+                extra_y.append(y)
+                extra_circle.append(circle)
+                extra_angle.append(angle)
+                extra_nodes.setdefault(circle, []).append((angle, node))
+                if end == S:
+                    start_edges.append((node, 0, math.hypot(x - sx, y - sy)))
+                else:
+                    goal_edges[node] = (G, 0, math.hypot(gx - x, gy - y))
+
+        # Circles with query-only nodes get their edges rebuilt for this query
+        merged: dict[int, dict[int, list[tuple[int, int, float]]]] = {}
+        cached = self._edges
+        ignored = ignore.tolist()
+        # A* with the straight-line distance to the goal as heuristic
+        g_score = {S: 0.0}
+        came_from = {S: (-1, 0)}
+        open_heap = [(math.hypot(gx - sx, gy - sy), 0.0, S)]
+        hypot, heappush, heappop = math.hypot, heapq.heappush, heapq.heappop
+        while open_heap:
+            _, g_u, u = heappop(open_heap)
+            # The heuristic is consistent (no edge is shorter than its chord), so an expanded
+            # node is never improved again and any entry above its best score is stale
+            if g_u > g_score[u]:
+                continue
+            if u == G:
+                break
+            if u == S:
+                edges = start_edges
+            else:
+                circle = node_circle[u] if u < n else extra_circle[u - n]
+                if circle in extra_nodes:
+                    arcs = merged.get(circle)
+                    if arcs is None:
+                        arcs = merged[circle] = self._MergedEdges(circle, extra_nodes[circle])
+                else:
+                    arcs = cached.get(circle) or self._CircleEdges(circle)
+                edges = arcs[u]
+                if ignored[circle]:
+                    # No arcs around an obstacle the rover is inside of
+                    edges = [edge for edge in edges if edge[1] == 0]
+                if u in goal_edges:
+                    edges = edges + [goal_edges[u]]
+            for v, kind, length in edges:
+                g_v = g_u + length
+                if g_v < g_score.get(v, math.inf):
+                    g_score[v] = g_v
+                    came_from[v] = (u, kind)
+                    if v < n:
+                        h = hypot(gx - node_x[v], gy - node_y[v])
+                    else:
+                        h = hypot(gx - extra_x[v - n], gy - extra_y[v - n])
+                    heappush(open_heap, (g_v + h, g_v, v))
+        else:
+            return None, math.inf
+
+        # Walk back to the start, then emit waypoints front to back
+        path = []
+        v = G
+        while v != S:
+            u, kind = came_from[v]
+            path.append((u, v, kind))
+            v = u
+        path.reverse()
+
+        def Angle(v):
+            return self.node_angle[v] if v < n else extra_angle[v - n]
+
+        waypoints = []
+        for i, (u, v, kind) in enumerate(path):
+            if kind == 0:
+                # A tangent point where an arc starts is collinear with the arc's first polygon edge
+                if i + 1 < len(path) and path[i + 1][2] != 0:
+                    continue
+                waypoints.append(XY(node_x[v], node_y[v]) if v < n else XY(extra_x[v - n], extra_y[v - n]))
+            else:
+                circle = node_circle[u] if u < n else extra_circle[u - n]
+                waypoints.extend(self._ArcWaypoints(circle, Angle(u), Angle(v), kind))
+        return waypoints, g_score[G]
+
+    def _ArcWaypoints(self, circle: int, from_angle: float, to_angle: float, direction: int) -> list[XY]:
+        '''
+        Vertices of the polygon circumscribing an arc, so each leg touches the circle at
+        most at one point and the arc's tangent points are edge midpoints.
+        '''
+        sweep = ((to_angle - from_angle) * direction) % _TWO_PI
+        m = max(1, int(math.ceil(sweep / self.max_arc_step)))
+        step = sweep / m
+        r = self.radii[circle] / math.cos(0.5 * step)
+        waypoints = []
+        for k in range(m):
+            a = from_angle + direction * (k + 0.5) * step
+            waypoints.append(XY(self.cx[circle] + r * math.cos(a), self.cy[circle] + r * math.sin(a)))
+        return waypoints
+
+    def PlanWaypoints(self, start, goal) -> list[XY]:
+        '''
+        Returns shortest-path waypoints from start to goal, excluding the start, or None
+        if the goal cannot be reached. Feed the result to TaskGraph.CreateMoveChain to
+        get MoveToCoord tasks.
+        '''
+        return self.ShortestPath(start, goal)[0]
+
+    def __repr__(self):
+        return f"<VisibilityGraph | {len(self.radii)} obstacles, {len(self._seg)} tangent segments>"
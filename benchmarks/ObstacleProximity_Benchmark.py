@@ -0,0 +1,46 @@
+# Per-tick cost of the lidar obstacle checks, comparing the old per-obstacle Python loop
+# against API.ObstacleProximity.Evaluate. Run from the repository root:
+#   python benchmarks/ObstacleProximity_Benchmark.py
+import os, sys, time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import API.ObstacleProximity as OP
+
+TICKS = 2000
+
+
+def LoopCheck(rel_vecs, radii):
+    # The obstacle-hit block from EntityBehavior_LTV before it was vectorized
+    hit = False
+    closest_dist = 9999999
+    closest_idx = -1
+    for i in range(len(rel_vecs)):
+        distance_away = np.linalg.norm(rel_vecs[i])
+        if distance_away - OP.DEFAULT_ENTITY_RADIUS_M - radii[i] < 0.0:
+            hit = True
+        if distance_away - radii[i] < closest_dist:
+            closest_dist = distance_away - radii[i]
+            closest_idx = i
+    return hit, closest_idx
+
+
+def TimePerTick(func, *args) -> float:
+    start = time.perf_counter()
+    for _ in range(TICKS):
+        func(*args)
+    return (time.perf_counter() - start) / TICKS
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    velocity = np.array([1.0, 0.5, 0.0])
+    print(f"{'obstacles':>10} {'loop (us)':>12} {'vectorized (us)':>16} {'+ttc (us)':>10}")
+    for n in (10, 100, 1000):
+        obstacles = np.column_stack((rng.uniform(-200.0, 200.0, (n, 3)), rng.uniform(8.0, 20.0, n)))
+        rel_vecs = [np.asarray(row[:3]) for row in obstacles]
+        radii = [row[3] for row in obstacles]
+        loop_s = TimePerTick(LoopCheck, rel_vecs, radii)
+        vec_s = TimePerTick(OP.Evaluate, obstacles)
+        ttc_s = TimePerTick(OP.Evaluate, obstacles, OP.DEFAULT_ENTITY_RADIUS_M, velocity)
+        print(f"{n:>10} {loop_s * 1e6:>12.1f} {vec_s * 1e6:>16.1f} {ttc_s * 1e6:>10.1f}")
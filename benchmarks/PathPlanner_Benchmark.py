@@ -0,0 +1,86 @@
+# Planning time on a 1 km x 1 km costmap at 1 m resolution with a 200-rock field,
+# for A* and for D* Lite's initial plan and incremental replans, then D* Lite replans
+# on small maps against searches from scratch. Run from the repository root:
+#   python benchmarks/PathPlanner_Benchmark.py
+import os, sys, time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import API.Costmap as CM
+import API.PathPlanner as PP
+
+
+def Timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    costmap = CM.Costmap(0.0, 0.0, 1000.0, 1000.0, resolution_m=1.0, rover_radius_m=2.0, inflation_m=5.0)
+    # Two ProceduralRocks-style fields, 100 rocks each, radius 8-20 m
+    for center in ((300.0, 300.0), (700.0, 650.0)):
+        rocks = np.column_stack((rng.normal(center, 120.0, (100, 2)), rng.uniform(8.0, 20.0, 100)))
+        costmap.AddDisks(rocks)
+    _, build_s = Timed(costmap.Update)
+    print(f"costmap rasterize: {build_s * 1e3:.1f} ms")
+
+    start, goal = (20.0, 20.0), (980.0, 960.0)
+    cells, astar_s = Timed(PP.AStar, costmap, start, goal)
+    print(f"A*: {astar_s * 1e3:.1f} ms, {len(cells)} cells")
+    weighted_cells, weighted_s = Timed(PP.AStar, costmap, start, goal, 4.0, 1.5)
+    print(f"weighted A* (1.5): {weighted_s * 1e3:.1f} ms, {len(weighted_cells)} cells")
+    waypoints, simplify_s = Timed(PP.Simplify, costmap, cells)
+    print(f"simplify: {simplify_s * 1e3:.1f} ms, {len(waypoints)} waypoints")
+
+    # The first search runs in the constructor
+    planner, initial_s = Timed(PP.DStarLite, costmap, start, goal)
+    cells = planner.Plan()
+    print(f"D* Lite initial: {initial_s * 1e3:.1f} ms, {len(cells)} cells, {planner.search_size} cells expanded")
+
+    # The rover drives along the path and its lidar finds a rock just ahead of it
+    position = 0
+    for k in range(3):
+        position += 60
+        planner.MoveStart(costmap.CellToWorld(*cells[position]))
+        row, col = cells[position + 25]
+        costmap.AddDisk(*costmap.CellToWorld(row, col), 10.0)
+        restarts = planner.restarts
+        cells, replan_s = Timed(planner.Replan)
+        position = 0
+        restarted = planner.restarts > restarts
+        print(f"D* Lite replan {k + 1}: {replan_s * 1e3:.1f} ms, {len(cells)} cells"
+              + (" (repair over budget, searched from scratch)" if restarted else ""))
+        astar_cells, astar_s = Timed(PP.AStar, costmap, costmap.CellToWorld(*cells[0]), goal)
+        print(f"  A* from scratch: {astar_s * 1e3:.1f} ms, {len(astar_cells)} cells")
+
+    # Small maps: 100 m x 100 m with 15 rocks; the rover drives and a rock turns up ahead of it
+    replans = restarts = repaired = from_scratch = 0
+    replan_s = scratch_s = 0.0
+    for trial in range(20):
+        costmap = CM.Costmap(0.0, 0.0, 100.0, 100.0, resolution_m=1.0, rover_radius_m=2.0, inflation_m=2.0)
+        costmap.AddDisks(np.column_stack((rng.uniform(10.0, 90.0, (15, 2)), rng.uniform(1.0, 5.0, 15))))
+        start, goal = (3.0, 3.0), (96.0, 95.0)
+        if costmap.Cost(start) >= CM.INSCRIBED or costmap.Cost(goal) >= CM.INSCRIBED:
+            continue
+        planner = PP.DStarLite(costmap, start, goal)
+        cells = planner.Plan()
+        for k in range(3):
+            if cells is None or len(cells) < 40:
+                break
+            planner.MoveStart(costmap.CellToWorld(*cells[10]))
+            costmap.AddDisk(*costmap.CellToWorld(*cells[25]), 3.0)
+            # Rasterized up front, so both timings leave it out
+            costmap.Update()
+            restarts_before = planner.restarts
+            cells, seconds = Timed(planner.Replan)
+            fresh, fresh_s = Timed(PP.DStarLite, costmap, costmap.CellToWorld(*planner.grid.Cell(planner.start)), goal)
+            replans += 1
+            restarts += planner.restarts - restarts_before
+            repaired += planner.repair_size
+            from_scratch += fresh.search_size
+            replan_s += seconds
+            scratch_s += fresh_s
+    print(f"D* Lite small maps, {replans} replans: {restarts} searched from scratch, repairs expanded "
+          f"{repaired} cells ({replan_s * 1e3:.1f} ms) vs {from_scratch} ({scratch_s * 1e3:.1f} ms) searching from scratch")
@@ -0,0 +1,80 @@
+# Cost of keeping PlanAnalysis up to date as a plan runs: a full refresh() against the
+# incremental update a task completion triggers. The plan is a single rover's chain of
+# moves with a camera capture after every fifth one. Run from the repository root:
+#   python benchmarks/TaskGraphAnalysis_Benchmark.py
+import os, sys, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+import numpy as np
+import TaskGraph as TG
+import TaskGraphAnalysis as TGA
+import API.STU_Common as STU
+
+COMPLETIONS = 50
+REPEATS = 5
+
+
+class _Entity:
+    # Stands in for st.Entity; commands only need its name
+    def __init__(self, name: str):
+        self.name = name
+
+    def getName(self) -> str:
+        return self.name
+
+
+class _Clock:
+    # Sim time in ns that only moves when told to
+    def __init__(self):
+        self.now_ns = 0
+
+    def __call__(self) -> int:
+        return self.now_ns
+
+
+def BuildGraph(n_moves: int) -> TG.TaskGraph:
+    en = _Entity("Rover")
+    graph = TG.TaskGraph()
+    graph.clock = _Clock()
+    previous = []
+    for i in range(n_moves):
+        task_id = f"Move{i}"
+        command = STU.CommandFromDict({"type": "MoveToCoord", "en": "Rover", "TaskID": task_id, "Loc": [10.0 * (i + 1), 0.0, 1737400.0]}, en)
+        graph.add_task(TG.Task(task_id, command), previous)
+        previous = [task_id]
+        if i % 5 == 4:
+            capture_id = f"Capture{i}"
+            graph.add_task(TG.Task(capture_id, STU.Command_CaptureImage(en, 15.0, capture_id)), previous)
+    return graph
+
+
+def Run(n_moves: int) -> tuple:
+    graph = BuildGraph(n_moves)
+    analysis = TGA.PlanAnalysis(graph, start_loc=np.array([0.0, 0.0, 1737400.0]))
+    start = time.perf_counter()
+    analysis.refresh()
+    refresh_s = time.perf_counter() - start
+    # The first move teaches the model the rover's speed, which moves every later estimate
+    graph.mark_started("Move0")
+    graph.clock.now_ns += 5_000_000_000
+    graph.mark_completed("Move0")
+    # Then drive on as the executor would, starting each move as the one before it completes
+    start = time.perf_counter()
+    for i in range(1, COMPLETIONS + 1):
+        graph.mark_started(f"Move{i}")
+        graph.clock.now_ns += 5_000_000_000
+        graph.mark_completed(f"Move{i}")
+    update_s = (time.perf_counter() - start) / COMPLETIONS
+    start = time.perf_counter()
+    analysis.critical_path()
+    analysis.slack()
+    query_s = time.perf_counter() - start
+    return refresh_s, update_s, query_s
+
+
+if __name__ == "__main__":
+    for n_moves in (100, 1000, 10000):
+        refresh_s, update_s, query_s = (min(times) for times in zip(*(Run(n_moves) for _ in range(REPEATS))))
+        print(f"{n_moves:>6} moves: refresh {refresh_s * 1e3:8.2f} ms, start + completion {update_s * 1e3:8.2f} ms, "
+              f"critical path + slack {query_s * 1e3:8.2f} ms")
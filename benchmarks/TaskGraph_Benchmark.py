@@ -0,0 +1,249 @@
+# Per-tick cost of TaskGraphExecutor against the old scan-every-pending-task loop, as
+# the graph grows to 10k tasks. Half the tasks are commands that have been sent and are
+# waiting on completion; the rest are blocked behind them. Each tick a few commands
+# complete, unblocking a few more. Also times a fleet that is out of comms, how long a
+# capture-while-driving plan takes when tasks share a rover's resources, saving a plan
+# part-way through and resuming it with TaskGraph.load(), and the memory a long coverage
+# plan holds once it has run, with and without compaction. Run from the repository root:
+#   python benchmarks/TaskGraph_Benchmark.py
+import json, os, sys, time, tempfile, tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+import TaskGraph as TG
+import API.STU_Common as STU
+
+COMPLETIONS_PER_TICK = 5
+# Few enough that even the smallest graph still has completions left on the last tick
+TICKS = 10
+REPEATS = 20
+
+
+class _Command:
+    command_type = "MoveToCoord"
+
+
+class _Entity:
+    # Stands in for st.Entity; commands only need its name
+    def __init__(self, name: str):
+        self.name = name
+
+    def getName(self) -> str:
+        return self.name
+
+
+class _MissionManager:
+    # Stands in for MissionManager.SendCommand, counting sends; entities are in comms unless told otherwise
+    def __init__(self, has_comms: bool = True):
+        self.has_comms = has_comms
+        self.sends = 0
+
+    def SendCommand(self, en, command_type, command) -> bool:
+        self.sends += 1
+        return self.has_comms
+
+
+def _Unshared(task: TG.Task) -> TG.Task:
+    # Uses no rover resources, so any number can run at once
+    task.resources = set()
+    return task
+
+
+def BuildGraph(n_tasks: int) -> TG.TaskGraph:
+    graph = TG.TaskGraph()
+    heads = n_tasks // 2
+    for i in range(heads):
+        graph.add_task(_Unshared(TG.Task(f"Head{i}", _Command())), [])
+    for i in range(n_tasks - heads):
+        graph.add_task(_Unshared(TG.Task(f"Tail{i}", _Command())), [f"Head{i}"])
+    return graph
+
+
+def LegacyTicker(mm, graph: TG.TaskGraph):
+    # The loop ExampleMM_TaskFinal.py used to run once per entity
+    def Tick():
+        for task_id in list(graph.pending_tasks):
+            task = graph.get_task(task_id)
+            if not task.started:
+                if mm.SendCommand("Rover", task.command.command_type, task.command):
+                    graph.mark_started(task_id)
+    return Tick
+
+
+def ExecutorTicker(mm, graph: TG.TaskGraph):
+    return TG.TaskGraphExecutor(mm, {"Rover": graph}).tick
+
+
+def Run(n_tasks: int, make_ticker) -> float:
+    graph = BuildGraph(n_tasks)
+    tick = make_ticker(_MissionManager(), graph)
+    tick()
+    running = sorted(graph.running_tasks)
+    elapsed = 0.0
+    for t in range(TICKS):
+        for task_id in running[t * COMPLETIONS_PER_TICK:(t + 1) * COMPLETIONS_PER_TICK]:
+            graph.mark_completed(task_id)
+        start = time.perf_counter()
+        tick()
+        elapsed += time.perf_counter() - start
+    return elapsed / TICKS
+
+
+def TimerTick(n_timers: int) -> float:
+    # Tick cost with n_timers long Timer tasks running and none expiring
+    graph = TG.TaskGraph()
+    for i in range(n_timers):
+        task = TG.Task(f"Wait{i}")
+        task.task_type = "Timer"
+        task.timer_duration = 1e6
+        graph.add_task(task, [])
+    executor = TG.TaskGraphExecutor(_MissionManager(), {"Rover": graph})
+    executor.tick()
+    start = time.perf_counter()
+    for _ in range(TICKS):
+        executor.tick()
+    return (time.perf_counter() - start) / TICKS
+
+
+def OutOfCommsTick(n_entities: int) -> float:
+    # Tick cost while every entity has 100 commands ready and is waiting out its retry backoff
+    mm = _MissionManager(has_comms=False)
+    executor = TG.TaskGraphExecutor(mm)
+    for e in range(n_entities):
+        executor.add_graph(f"Rover{e}", BuildGraph(200))
+    executor.tick()
+    start = time.perf_counter()
+    for _ in range(TICKS):
+        executor.tick()
+    assert mm.sends == n_entities
+    return (time.perf_counter() - start) / TICKS
+
+
+class _Capture:
+    command_type = "CaptureImage"
+
+
+def CaptureWhileDriving(n_moves: int, by_hand: bool) -> int:
+    # Ticks to drive n_moves legs, taking a picture at the end of each: moves take 5 ticks, pictures 2.
+    # by_hand chains every picture before the next move, as plans had to before tasks declared resources.
+    graph = TG.TaskGraph()
+    previous = []
+    for i in range(n_moves):
+        graph.add_task(TG.Task(f"Move{i}", _Command()), previous)
+        graph.add_task(TG.Task(f"Capture{i}", _Capture()), [f"Move{i}"])
+        previous = [f"Capture{i}"] if by_hand else [f"Move{i}"]
+    executor = TG.TaskGraphExecutor(_MissionManager(), {"Rover": graph})
+    durations = {"MoveToCoord": 5, "CaptureImage": 2}
+    ends = {}
+    ticks = 0
+    while len(graph.completed_tasks) < len(graph.tasks):
+        for task_id in [task_id for task_id, end in ends.items() if end <= ticks]:
+            graph.mark_completed(task_id)
+            del ends[task_id]
+        executor.tick()
+        for task_id in graph.running_tasks:
+            ends.setdefault(task_id, ticks + durations[graph.tasks[task_id].command.command_type])
+        ticks += 1
+    return ticks
+
+
+def FleetCompletion(n_entities: int) -> float:
+    # Cost of one completion when every entity's Tail tasks also wait on the next entity's Head of the same number
+    entities = [_Entity(f"Rover{e}") for e in range(n_entities)]
+    fleet = TG.FleetTaskGraph()
+    for en in entities:
+        fleet.add_graph(en, TG.TaskGraph())
+    for e, en in enumerate(entities):
+        other = entities[(e + 1) % n_entities]
+        for i in range(100):
+            fleet.add_task(en, TG.Task(f"Head{i}", _Command()), [])
+        for i in range(100):
+            fleet.add_task(en, TG.Task(f"Tail{i}", _Command()), [f"Head{i}", (other, f"Head{i}")])
+    start = time.perf_counter()
+    for i in range(100):
+        for en in entities:
+            fleet.mark_completed(en, f"Head{i}")
+    elapsed_s = time.perf_counter() - start
+    assert all(len(graph.ready_tasks) == 100 for graph in fleet.graphs.values())
+    return elapsed_s / (100 * n_entities)
+
+
+def ResumeTimes(n_tasks: int, path: str) -> tuple:
+    # A chain of moves, 30% driven, saved and loaded back as after a mission manager restart
+    en = _Entity("Rover")
+    graph = TG.TaskGraph()
+    for i in range(n_tasks):
+        task_id = f"Move{i}"
+        command = STU.CommandFromDict({"type": "MoveToCoord", "en": "Rover", "TaskID": task_id, "Loc": [float(i), 0.0, 1737400.0]}, en)
+        graph.add_task(TG.Task(task_id, command), [f"Move{i - 1}"] if i else [])
+    for i in range(int(0.3 * n_tasks)):
+        graph.mark_started(f"Move{i}")
+        graph.mark_completed(f"Move{i}")
+    current = f"Move{int(0.3 * n_tasks)}"
+    graph.mark_started(current)
+
+    start = time.perf_counter()
+    graph.save(path)
+    save_s = time.perf_counter() - start
+    start = time.perf_counter()
+    loaded = TG.TaskGraph.load(path, [en])
+    loaded.reconcile({"MoveToCoord": current})
+    TG.TaskGraphExecutor(_MissionManager(), {en: loaded})
+    resume_s = time.perf_counter() - start
+    # The part of the load spent rebuilding command payloads
+    with open(path) as f:
+        records = json.load(f)["tasks"]
+    start = time.perf_counter()
+    for record in records:
+        STU.CommandFromDict(record["cmd"], en)
+    commands_s = time.perf_counter() - start
+    return save_s, resume_s, commands_s
+
+
+def MissionMemory(n_moves: int, keep_finished: int, keep_history: int = None) -> int:
+    # Bytes still held once a chain of n_moves waypoints has run, one completion per tick
+    tracemalloc.start()
+    en = _Entity("Rover")
+    graph = TG.TaskGraph()
+    previous = []
+    for i in range(n_moves):
+        task_id = f"Waypoint{i}"
+        command = STU.CommandFromDict({"type": "MoveToCoord", "en": "Rover", "TaskID": task_id, "Loc": [10.0 * (i + 1), 0.0, 1737400.0]}, en)
+        graph.add_task(TG.Task(task_id, command), previous)
+        previous = [task_id]
+    executor = TG.TaskGraphExecutor(_MissionManager(), {en: graph}, keep_finished=keep_finished, keep_history=keep_history)
+    executor.tick()
+    while graph.running_tasks:
+        graph.mark_completed(next(iter(graph.running_tasks)))
+        executor.tick()
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return held
+
+
+if __name__ == "__main__":
+    for n_tasks in (100, 1000, 10000):
+        executor_s = min(Run(n_tasks, ExecutorTicker) for _ in range(REPEATS))
+        legacy_s = min(Run(n_tasks, LegacyTicker) for _ in range(REPEATS))
+        print(f"{n_tasks:>6} tasks: executor {executor_s * 1e6:8.1f} us/tick, legacy loop {legacy_s * 1e6:8.1f} us/tick")
+    for n_timers in (10, 1000, 10000):
+        timer_s = min(TimerTick(n_timers) for _ in range(REPEATS))
+        print(f"{n_timers:>6} running timers: executor {timer_s * 1e6:8.1f} us/tick")
+    for n_entities in (7, 100):
+        tick_s = min(OutOfCommsTick(n_entities) for _ in range(REPEATS))
+        print(f"{n_entities:>6} entities out of comms: executor {tick_s * 1e6:8.1f} us/tick")
+    by_hand_ticks, by_resource_ticks = CaptureWhileDriving(100, True), CaptureWhileDriving(100, False)
+    print(f"   100 moves with a picture after each: {by_hand_ticks} ticks chained by hand, {by_resource_ticks} ticks by resource")
+    for n_entities in (7, 100):
+        completion_s = min(FleetCompletion(n_entities) for _ in range(5))
+        print(f"{n_entities:>6} entities in a fleet graph: {completion_s * 1e6:8.1f} us/completion")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "plan.json")
+        for n_tasks in (100, 1000, 10000):
+            save_s, resume_s, commands_s = (min(times) for times in zip(*(ResumeTimes(n_tasks, path) for _ in range(5))))
+            print(f"{n_tasks:>6} task plan: save {save_s * 1e3:6.2f} ms, load + reconcile {resume_s * 1e3:6.2f} ms "
+                  f"(commands {commands_s * 1e3:6.2f} ms), {os.path.getsize(path) / 1024:.0f} KiB")
+    for n_moves in (1000, 10000, 20000):
+        kept, compacted, trimmed = MissionMemory(n_moves, None), MissionMemory(n_moves, 200), MissionMemory(n_moves, 200, 1000)
+        print(f"{n_moves:>6} waypoints run: {kept / 1024:7.0f} KiB held in full, {compacted / 1024:7.0f} KiB compacted past 200, "
+              f"{trimmed / 1024:5.0f} KiB with history trimmed to 1000")
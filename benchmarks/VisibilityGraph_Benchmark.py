@@ -0,0 +1,49 @@
+# Build, incremental-add and query times for the visibility-graph planner on the same
+# 1 km x 1 km, 200-rock field as PathPlanner_Benchmark, with grid A* for comparison.
+# Run from the repository root:
+#   python benchmarks/VisibilityGraph_Benchmark.py
+import os, sys, time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import API.Costmap as CM
+import API.PathPlanner as PP
+import API.VisibilityGraph as VG
+
+
+def Timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def PathLength(start, waypoints) -> float:
+    points = np.array([start] + [(w.x, w.y) for w in waypoints])
+    return float(np.hypot(*np.diff(points, axis=0).T).sum())
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    rocks = []
+    # Two ProceduralRocks-style fields, 100 rocks each, radius 8-20 m
+    for center in ((300.0, 300.0), (700.0, 650.0)):
+        rocks.append(np.column_stack((rng.normal(center, 120.0, (100, 2)), rng.uniform(8.0, 20.0, 100))))
+    rocks = np.vstack(rocks)
+
+    graph = VG.VisibilityGraph(rover_radius_m=2.0)
+    _, build_s = Timed(graph.AddObstacles, rocks[:-10])
+    print(f"build, {len(rocks) - 10} rocks: {build_s * 1e3:.1f} ms, {graph}")
+    add_times = [Timed(graph.AddObstacle, *rock)[1] for rock in rocks[-10:].tolist()]
+    print(f"incremental add: {np.mean(add_times) * 1e3:.2f} ms mean, {np.max(add_times) * 1e3:.2f} ms max")
+
+    queries = [((20.0, 20.0), (980.0, 960.0)), ((50.0, 600.0), (900.0, 200.0)), ((300.0, 20.0), (700.0, 980.0))]
+    costmap = CM.Costmap(0.0, 0.0, 1000.0, 1000.0, resolution_m=1.0, rover_radius_m=2.0, inflation_m=0.0)
+    costmap.AddDisks(rocks)
+    for start, goal in queries:
+        # Repeat queries to one goal reuse its cached tangents, as replans from a moving rover do
+        times = [Timed(graph.ShortestPath, start, goal)[1] for _ in range(20)]
+        waypoints, length = graph.ShortestPath(start, goal)
+        print(f"query {start} -> {goal}: {np.median(times) * 1e3:.2f} ms median, "
+              f"{length:.1f} m, {len(waypoints)} waypoints")
+        grid_waypoints, grid_s = Timed(PP.PlanWaypoints, costmap, start, goal, 0.0, 1.0)
+        print(f"  grid A* + simplify: {grid_s * 1e3:.1f} ms, {PathLength(start, grid_waypoints):.1f} m")
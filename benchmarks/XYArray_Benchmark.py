@@ -0,0 +1,95 @@
+# Batch coordinate conversion with API.STU_Common.XYArray against converting one XY at a time
+# through st.PlanetUtils, and how far the two disagree: XYArray's LLA conversion assumes the same
+# spherical planet as the SDK, and is expected to agree with it to within 1 mm. Each XYArray
+# conversion is checked against the scalar XY / st.PlanetUtils conversion of the same input
+# points, and the script exits non-zero if any disagree by more. The local frame is set with
+# STU.SetLocalFrame near the lunar south pole, so the spaceteams SDK must be installed, but no
+# sim needs to be running. Run from the repository root:
+#   python benchmarks/XYArray_Benchmark.py
+import os, sys, time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import spaceteams as st
+import API.STU_Common as STU
+
+MOON_RADIUS_M = 1737400.0
+ORIGIN_LAT_DEG, ORIGIN_LON_DEG = -85.0, 30.0
+# XY points spread over a square this many metres across, centred on the origin
+SPAN_M = 20000.0
+# LLA points spread over about the same area: 0.1 deg of latitude is about 3 km here
+SPAN_LAT_DEG, SPAN_LON_DEG = 0.3, 3.0
+TOLERANCE_M = 0.001
+REPEATS = 5
+
+
+def RandomXY(n_points: int, seed: int) -> STU.XYArray:
+    return STU.XYArray(np.random.default_rng(seed).uniform(-SPAN_M / 2, SPAN_M / 2, (n_points, 2)))
+
+
+def RandomLLA(n_points: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return np.column_stack((rng.uniform(ORIGIN_LAT_DEG - SPAN_LAT_DEG / 2, ORIGIN_LAT_DEG + SPAN_LAT_DEG / 2, n_points),
+                            rng.uniform(ORIGIN_LON_DEG - SPAN_LON_DEG / 2, ORIGIN_LON_DEG + SPAN_LON_DEG / 2, n_points),
+                            rng.uniform(0.0, 100.0, n_points)))
+
+
+def ScalarLLAToXY(lla_rows: np.ndarray, radius: float) -> np.ndarray:
+    # The LatLonAltToXY path: one SDK Coord per point
+    xy = np.empty((len(lla_rows), 2))
+    for i, (lat, lon, alt) in enumerate(lla_rows.tolist()):
+        point = STU.CoordToXY(st.PlanetUtils.Coord(st.PlanetUtils.LatLonAlt(lat, lon, alt), 0.0, radius))
+        xy[i] = (point.x, point.y)
+    return xy
+
+
+def ScalarXYToPCPF(xys: list) -> np.ndarray:
+    return np.array([xy.toCoord().getLoc() for xy in xys])
+
+
+def ScalarPCPFToXY(locs: np.ndarray, radius: float) -> np.ndarray:
+    xy = np.empty((len(locs), 2))
+    for i, loc in enumerate(locs):
+        point = STU.CoordToXY(st.PlanetUtils.Coord(loc, 0.0, radius))
+        xy[i] = (point.x, point.y)
+    return xy
+
+
+def Errors(n_points: int) -> dict:
+    # Largest difference, in metres, between each XYArray conversion and the scalar one of the same points
+    radius = STU.GetLocalFrame().radius
+    points = RandomXY(n_points, 0)
+    scalar_locs = ScalarXYToPCPF(points.to_xys())
+    lla = RandomLLA(n_points, 2)
+    return {
+        "to_pcpf": np.abs(points.to_pcpf() - scalar_locs).max(),
+        "from_pcpf": np.abs(STU.XYArray.from_pcpf(scalar_locs).xy - ScalarPCPFToXY(scalar_locs, radius)).max(),
+        # The SDK has no XY -> LLA rows to compare with, so XYArray's LLA goes back through the scalar path
+        "to_lla": np.abs(ScalarLLAToXY(points.to_lla(), radius) - points.xy).max(),
+        "from_lla": np.abs(STU.XYArray.from_lla(lla).xy - ScalarLLAToXY(lla, radius)).max(),
+    }
+
+
+def Times(n_points: int) -> tuple:
+    lla = RandomLLA(n_points, 1)
+    radius = STU.GetLocalFrame().radius
+    start = time.perf_counter()
+    ScalarLLAToXY(lla, radius)
+    scalar_s = time.perf_counter() - start
+    start = time.perf_counter()
+    STU.XYArray.from_lla(lla)
+    batch_s = time.perf_counter() - start
+    return scalar_s, batch_s
+
+
+if __name__ == "__main__":
+    origin = st.PlanetUtils.Coord(st.PlanetUtils.LatLonAlt(ORIGIN_LAT_DEG, ORIGIN_LON_DEG, 0.0), 0.0, MOON_RADIUS_M)
+    STU.SetLocalFrame(origin, MOON_RADIUS_M)
+    errors = Errors(2000)
+    for name, error_m in errors.items():
+        print(f"{name:>9}: {error_m * 1e3:.6f} mm from the scalar path")
+    for n_points in (100, 10000):
+        scalar_s, batch_s = (min(times) for times in zip(*(Times(n_points) for _ in range(REPEATS))))
+        print(f"{n_points:>6} points from LLA: scalar {scalar_s * 1e3:8.2f} ms, XYArray {batch_s * 1e3:8.3f} ms")
+    if max(errors.values()) >= TOLERANCE_M:
+        sys.exit(f"XYArray disagrees with st.PlanetUtils by more than {TOLERANCE_M * 1e3:.0f} mm")
@@ -138,11 +138,9 @@ while not exit_flag:
     #     end_condition = False
 
     # LTV1 proximity
-    ltv1_mover = SM.SurfaceMover(LTV1, st.GetSimEntity().GetParam(st.VarType.entityRef, "Planet"))
-    ltv1_xy = CoordToXY(ltv1_mover.GetCurrentCoord())
+    ltv1_xy = CoordToXY(SM.GetMover(LTV1).GetCurrentCoord())
     #NOTE: this is only valid in the competition backend; you aren't supposed to directly sample the crash site location
-    crash_mover = SM.SurfaceMover(crash_site, st.GetSimEntity().GetParam(st.VarType.entityRef, "Planet"))
-    crash_xy = CoordToXY(crash_mover.GetCurrentCoord())
+    crash_xy = CoordToXY(SM.GetMover(crash_site).GetCurrentCoord())
 
     if ((ltv1_xy.x - crash_xy.x) ** 2 + (ltv1_xy.y - crash_xy.y) ** 2) > RESCUE_START_RADIUS_M ** 2:
         end_condition = False
@@ -12,14 +12,15 @@ import numpy as np
 # DON'T CHANGE ANY OF THE ABOVE; NECESSARY FOR JOINING SIMULATION
 #################################################################
 
-from API.STU_Common import Command, _commandID_Str, CoordToXY
+from API.STU_Common import Command, _commandID_Str, CoordToXY, SimTimeNs
 import API.EntityBehaviorFuncs as EB
 import API.EntityTelemetry as ET
 import API.SurfaceMovement as SM
+import API.ObstacleProximity as OP
 
 en: st.Entity = st.GetThisSystem().GetParam(st.VarType.entityRef, "Entity")
 planet: st.Entity = st.GetThisSystem().GetParam(st.VarType.entityRef, "Planet")
-mover = SM.SurfaceMover(en, planet)
+mover = SM.GetMover(en, planet)
 en_behavior = EB.EntityBehavior(en)
 
 moving_back_to_comm_range = False
@@ -163,7 +164,14 @@ en_behavior.OnCommandReceived("PlaceDownAntenna", PlaceDownAntenna_Received)
 #######################
 
 ranIntoSomething = False
-DEFAULT_ENTITY_RADIUS_M = 0.3
+DEFAULT_ENTITY_RADIUS_M = OP.DEFAULT_ENTITY_RADIUS_M
+# Warn when the current velocity reaches an obstacle within this many seconds
+CONTACT_WARNING_S = 2.0
+closingOnSomething = False
+# PCPF velocity from the last two positions read while obstacles were in range, for time-to-contact
+velocity = None
+last_loc = None
+last_loc_ns = None
 
 last_comm_coord: st.PlanetUtils.Coord = mover.GetCurrentCoord()
 
@@ -186,36 +194,45 @@ while not exit_flag:
             mover.TurnAndMoveToCoord(last_comm_coord)
             # will be cleaned up in On_MoveComplete
 
-    rel_vecs, radii, had_comms = ET.GetLidarObstacles(en)
-    # st.logger_info("Lidar info: " + str(np.asarray(rel_vecs)) + ", " + str(np.asarray(radii)) + ", " + str(had_comms))
+    # (N,4) rows of [rel_x, rel_y, rel_z, radius]
+    obstacles, had_comms = ET.GetLidarObstacleArray(en)
+    # st.logger_info("Lidar info: " + str(obstacles) + ", " + str(had_comms))
     
     ######################
     # Obstacle hit detection; you must include this code in your loop!
     # Use "ObstaclesStopMovement": false on SimEntity in the sim config to disable stopping on obstacles
-    ran_into_something_thistime = False
-    for i in range(len(rel_vecs)):
-        rel_vec = rel_vecs[i]
-        obstacle_radius = radii[i]
-        distance_away = np.linalg.norm(rel_vec)
-        separation = distance_away - DEFAULT_ENTITY_RADIUS_M - obstacle_radius
-        if separation < 0.0:
-            ran_into_something_thistime = True
-            if not ranIntoSomething:
-                st.OnScreenLogMessage(f"Entity {en.getName()} ran into an obstacle, {distance_away:.3f}m away with {obstacle_radius:.3f}m radius.", "LTV Behavior", st.Severity.Warning)
-                # Handle stopping the entity
-                if st.GetSimEntity().GetParam(st.VarType.bool, "ObstaclesStopMovement"):
-                    if ("MoveToCoord" in en_behavior.ActiveCommands()):
-                        en.SetParam(st.VarType.string, "State", "Loiter")
-                        move_fail_payload = st.ParamMap()
-                        move_fail_payload.AddParam(st.VarType.string, "Reason", "Hit Obstacle")
-                        en_behavior.FailCommand("MoveToCoord", move_fail_payload)
-
-
-                ranIntoSomething = True
+    # Positions are only read while there is something to run into; lidar vectors are PCPF offsets too
+    if len(obstacles) > 0:
+        now_ns = SimTimeNs()
+        if now_ns != last_loc_ns:
+            loc = np.asarray(mover.GetCurrentCoord().getLoc(), dtype=np.float64)
+            if last_loc is not None:
+                velocity = (loc - last_loc) * (1e9 / (now_ns - last_loc_ns))
+            last_loc, last_loc_ns = loc, now_ns
+    else:
+        velocity, last_loc, last_loc_ns = None, None, None
+    proximity = OP.Evaluate(obstacles, DEFAULT_ENTITY_RADIUS_M, velocity)
+    ran_into_something_thistime = proximity.any_hit
+    if ran_into_something_thistime and not ranIntoSomething:
+        distance_away = proximity.distances[proximity.nearest_index]
+        obstacle_radius = obstacles[proximity.nearest_index, 3]
+        st.OnScreenLogMessage(f"Entity {en.getName()} ran into an obstacle, {distance_away:.3f}m away with {obstacle_radius:.3f}m radius.", "LTV Behavior", st.Severity.Warning)
+        # Handle stopping the entity
+        if st.GetSimEntity().GetParam(st.VarType.bool, "ObstaclesStopMovement"):
+            if ("MoveToCoord" in en_behavior.ActiveCommands()):
+                en.SetParam(st.VarType.string, "State", "Loiter")
+                move_fail_payload = st.ParamMap()
+                move_fail_payload.AddParam(st.VarType.string, "Reason", "Hit Obstacle")
+                en_behavior.FailCommand("MoveToCoord", move_fail_payload)
+        ranIntoSomething = True
     if not ran_into_something_thistime:
         if ranIntoSomething:
             st.OnScreenLogMessage(f"Entity {en.getName()} is no longer running into an obstacle.", "LTV Behavior", st.Severity.Warning)
         ranIntoSomething = False
+    closing_on_something_thistime = not ran_into_something_thistime and proximity.min_time_to_contact < CONTACT_WARNING_S
+    if closing_on_something_thistime and not closingOnSomething:
+        st.OnScreenLogMessage(f"Entity {en.getName()} will reach an obstacle in {proximity.min_time_to_contact:.1f}s at its current velocity.", "LTV Behavior", st.Severity.Info)
+    closingOnSomething = closing_on_something_thistime
     #######################
 
     # Loop delay so we don't use too much CPU resources
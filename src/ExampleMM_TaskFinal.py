@@ -16,9 +16,13 @@ from API.STU_Common import *
 import API.MissionManagerFuncs as MM
 mm = MM.MissionManager()
 import API.EntityTelemetry as ET
+import API.ObstacleProximity as OP
+import API.ObstacleMap as OM
+import API.Costmap as CM
 # ^ NECESSARY STU IMPORTS
 
 import TaskGraph as TG
+import TaskGraphAnalysis as TGA
 import cv2 # for camera pixel work
 
 #############################
@@ -57,6 +61,13 @@ entity_to_task_graph = {
     SamplingRover: SamplingRover_task_graph
 }
 
+# Lets a task for one entity depend on another entity's tasks, named "<entity name>/<task_id>"
+fleet_graph = TG.FleetTaskGraph(entity_to_task_graph)
+
+# Sends ready commands and runs timers for every task graph once per loop.
+# Finished tasks past the latest 200 per graph are archived to each graph's history, so long coverage plans stay small
+executor = TG.TaskGraphExecutor(mm, entity_to_task_graph, keep_finished=200)
+
 # Camera image processing
 img_rgb = None
 image_changed = False
@@ -117,10 +128,11 @@ def SamplingRover_TaskFail(payload : st.ParamMap):
 
 def General_TaskComplete(payload : st.ParamMap, entity : st.Entity):
     task_id = payload.GetParam(st.VarType.string, ["Orig_Cmd", "TaskID"])
-    entity_to_task_graph[entity].mark_completed(task_id)
+    # A move preempted for a more urgent one is sent again; the count tells the stopped send's report apart
+    entity_to_task_graph[entity].mark_completed(task_id, resend=TG.ReportedResend(payload))
 def General_TaskFail(payload : st.ParamMap, entity : st.Entity):
     task_id = payload.GetParam(st.VarType.string, ["Orig_Cmd", "TaskID"])
-    entity_to_task_graph[entity].mark_completed(task_id)
+    entity_to_task_graph[entity].mark_failed(task_id, resend=TG.ReportedResend(payload))
 
 # MOVING
 
@@ -141,33 +153,43 @@ def MoveToCoord_Failed(payload : st.ParamMap, en : st.Entity):
             st.OnScreenLogMessage(f"{en.getName()}: Moving away from obstacle now.", "MM Surface Movement", st.Severity.Warning)
             #Code to handle this, probably by moving away a bit and then moving around the obstacle
             currentxy, _ = ET.GetCurrentXY(en)
-            rel_vecs, radii, _ = ET.GetLidarObstacles(en)
-            closest_dist = 9999999
-            closest_idx = -1
-            for i in range(len(rel_vecs)):
-                dist = np.linalg.norm(rel_vecs[i]) - radii[i]
-                if(dist < closest_dist):
-                    closest_dist = dist
-                    closest_idx = i
-            
-            closest_rel_vec = np.asarray(rel_vecs[closest_idx])
-            closest_radius = radii[closest_idx]
-            
-            # Move away from the obstacle
-            currentcoord = currentxy.toCoord()
-            currentLoc = currentcoord.getLoc()
-            # move away 2x radius
-            away_from_obstacle_loc = currentLoc - (closest_radius * 2.0 * closest_rel_vec)/np.linalg.norm(closest_rel_vec)
-            away_from_obstacle_xy = CoordToXY(st.PlanetUtils.Coord(away_from_obstacle_loc, currentcoord.getRot(), currentcoord.getRadius()))
-
-            move_from_obstacle = TG.Task("MoveFromObstacle", Command_MoveToCoord(en, away_from_obstacle_xy, "MoveFromObstacle")) 
-            entity_to_task_graph[en].add_task(move_from_obstacle, [])
-            # Continue with search?
+            obstacles, _ = ET.GetLidarObstacleArray(en)
+            closest_idx = OP.Evaluate(obstacles).nearest_index
+            if closest_idx >= 0:
+                closest_rel_vec = obstacles[closest_idx, :3]
+                closest_radius = obstacles[closest_idx, 3]
+
+                # Move away from the obstacle
+                currentcoord = currentxy.toCoord()
+                currentLoc = currentcoord.getLoc()
+                # move away 2x radius
+                away_from_obstacle_loc = currentLoc - (closest_radius * 2.0 * closest_rel_vec)/np.linalg.norm(closest_rel_vec)
+                away_from_obstacle_xy = CoordToXY(st.PlanetUtils.Coord(away_from_obstacle_loc, currentcoord.getRot(), currentcoord.getRadius()))
+
+                # Task ids must be unique, and this can happen more than once
+                graph = entity_to_task_graph[en]
+                move_id = graph.unique_id("MoveFromObstacle")
+                move_from_obstacle = TG.Task(move_id, Command_MoveToCoord(en, away_from_obstacle_xy, move_id))
+                # Backing off goes before any other ready move, and preempts a routine one already running
+                move_from_obstacle.priority = 10
+                detour = [(move_from_obstacle, [])]
+                failed_id = payload.GetParam(st.VarType.string, ["Orig_Cmd", "TaskID"])
+                failed = graph.tasks.get(failed_id)
+                if failed is not None and failed.command is not None and failed.command.command_type == "MoveToCoord":
+                    # Then try for the same spot again from there
+                    retry_id = graph.unique_id(f"{failed_id}_Retry")
+                    retry_data = CommandToDict(failed.command)
+                    retry_data["TaskID"] = retry_id
+                    detour.append((TG.Task(retry_id, CommandFromDict(retry_data, en)), [move_id]))
+                if failed_id in graph.running_tasks:
+                    # Swap the failed move for the detour; whatever waited on it waits on the detour instead,
+                    # so the rest of the plan carries on (the mark_failed below is then ignored)
+                    graph.splice(failed_id, detour, failed=True)
+                else:
+                    graph.add_tasks(detour)
     else:
         st.OnScreenLogMessage(f"{en.getName()}: MoveToCoord command failed.", "MM Surface Movement", st.Severity.Error)
     General_TaskFail(payload, en)
-    # Example of handling move failure by clearing all tasks, then letting the loop pick up where we left off
-    # LTV1_task_graph.clear_all() #wipe existing tasks
 mm.OnCommandFail(LTV1, "MoveToCoord", lambda payload : MoveToCoord_Failed(payload, LTV1))
 mm.OnCommandFail(LTV2, "MoveToCoord", lambda payload : MoveToCoord_Failed(payload, LTV2))
 mm.OnCommandFail(Scout1, "MoveToCoord", lambda payload : MoveToCoord_Failed(payload, Scout1))
@@ -179,16 +201,15 @@ mm.OnCommandFail(Scout2, "MoveToCoord", lambda payload : MoveToCoord_Failed(payl
 def Stop_Complete(payload : st.ParamMap, en : st.Entity):
     st.OnScreenLogMessage(f"{en.getName()}: Stop command complete.", "MM Surface Movement", st.Severity.Info)
     General_TaskComplete(payload, en)
-mm.OnCommandComplete(LTV1, "Stop", lambda payload : Stop_Complete(payload, LTV1))
-mm.OnCommandComplete(LTV2, "Stop", lambda payload : Stop_Complete(payload, LTV2))
-#TODO could add the rest of the entities here
+# TaskGraph.cancel() queues Stop tasks for any entity, so every entity needs these reactions
+for en in entities:
+    mm.OnCommandComplete(en, "Stop", lambda payload, en=en : Stop_Complete(payload, en))
 
 def Stop_Failed(payload : st.ParamMap, en : st.Entity):
     st.OnScreenLogMessage(f"{en.getName()}: Stop command failed.", "MM Surface Movement", st.Severity.Error)
     General_TaskFail(payload, en)
-mm.OnCommandFail(LTV1, "Stop", lambda payload : Stop_Failed(payload, LTV1))
-mm.OnCommandFail(LTV2, "Stop", lambda payload : Stop_Failed(payload, LTV2))
-#TODO could add the rest of the entities here
+for en in entities:
+    mm.OnCommandFail(en, "Stop", lambda payload, en=en : Stop_Failed(payload, en))
 
 # ROTATING TO AZIMUTH
 
@@ -307,11 +328,13 @@ waypoint_3 = XY(xy_LTV1.x + 20, xy_LTV1.y + 40)
 exposure = 15.0
 
 # EXAMPLE CODE FOR ADDING PLANNED IMAGE-CAPTURE TASKS
+# Camera tasks use the camera, not mobility (TG.COMMAND_RESOURCES), so they run while the rover drives on.
+# Ones that share the camera wait for each other without needing a dependency, in the order they become ready.
 # img_cap1 = TG.Task("Capture1", Command_CaptureImage(LTV1, exposure, "Capture1"))
 # LTV1_task_graph.add_task(img_cap1, ["Move1"])
 
 # img_cap2 = TG.Task("Capture2", Command_CaptureImage(LTV1, exposure, "Capture2"))
-# LTV1_task_graph.add_task(img_cap2, ["Capture1"])
+# LTV1_task_graph.add_task(img_cap2, ["Move1"])
 
 # cam_turn = TG.Task("camturn", Command_CameraPan(LTV1, 60.0, 11.0, "camturn"))
 # LTV1_task_graph.add_task(cam_turn, ["Capture2"])
@@ -358,9 +381,9 @@ LTV2_task_graph.add_task(LTV2_stop1, ["TimeBeforeStop"])
 # Move scout rovers to waypoints
 waypoint_far = XY(antenna1_initialLoc.x + 20000, antenna1_initialLoc.y + 40)
 Scout1_move1 = TG.Task("Move1", Command_MoveToCoord(Scout1, waypoint_1, "Move1"))
-Scout1_move1 = TG.Task("MoveFar", Command_MoveToCoord(Scout1, waypoint_far, "MoveFar"))
+Scout1_move_far = TG.Task("MoveFar", Command_MoveToCoord(Scout1, waypoint_far, "MoveFar"))
 Scout1_task_graph.add_task(Scout1_move1, [])
-Scout1_task_graph.add_task(Scout1_move1, ["Move1"])
+Scout1_task_graph.add_task(Scout1_move_far, ["Move1"])
 
 Scout2_move1 = TG.Task("Move1", Command_MoveToCoord(Scout2, waypoint_2, "Move1"))
 Scout2_task_graph.add_task(Scout2_move1, [])
@@ -375,6 +398,47 @@ TruckRover_move1 = TG.Task("Move1", Command_MoveToCoord(TruckRover, waypoint_tru
 TruckRover_task_graph.add_task(TruckRover_move_charge, [])
 TruckRover_task_graph.add_task(CreateTimerTask("WaitWhileCharging", 15.0), ["MoveCharge"])
 TruckRover_task_graph.add_task(TruckRover_move1, ["WaitWhileCharging"])
+# A task can also wait on other entities' tasks, e.g. to leave the charger only once LTV2 has finished its first move:
+# fleet_graph.add_task(TruckRover, TruckRover_move1, ["WaitWhileCharging", "LTV2/Move1"])
+
+# Fail now, rather than stall in the loop, if a plan depends on a task that was never added or has a cycle, within or across entities
+fleet_graph.validate()
+
+# Task graphs are saved here during the loop, one file per entity
+CHECKPOINT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "checkpoints")
+# Set to True when restarting the mission manager mid-run, to pick up the saved plans instead of starting over
+RESUME_FROM_CHECKPOINT = False
+
+if RESUME_FROM_CHECKPOINT:
+    for en in entities:
+        checkpoint_path = os.path.join(CHECKPOINT_DIR, f"{en.getName()}.json")
+        if not os.path.exists(checkpoint_path):
+            continue
+        task_graph = TG.TaskGraph.load(checkpoint_path, entities)
+        # Commands may have finished while the mission manager was down; resend those, and keep the ones still running
+        active_commands, had_comms = ET.GetActiveCommands(en)
+        if had_comms:
+            st.logger_info(f"{en.getName()}: resumed task graph; {task_graph.reconcile(active_commands)}")
+        else:
+            st.OnScreenLogMessage(f"{en.getName()}: no comms while resuming; running commands are assumed to still be running.", "Mission Manager", st.Severity.Warning)
+        entity_to_task_graph[en] = task_graph
+        fleet_graph.add_graph(en, task_graph)
+        executor.add_graph(en, task_graph)
+    LTV1_task_graph = entity_to_task_graph[LTV1]
+    LTV2_task_graph = entity_to_task_graph[LTV2]
+    Scout1_task_graph = entity_to_task_graph[Scout1]
+    Scout2_task_graph = entity_to_task_graph[Scout2]
+    TruckRover_task_graph = entity_to_task_graph[TruckRover]
+    ExcavatorRover_task_graph = entity_to_task_graph[ExcavatorRover]
+    SamplingRover_task_graph = entity_to_task_graph[SamplingRover]
+
+# Finish-time estimates for every plan, kept up to date as tasks start and complete.
+# One DurationModel is shared, so camera and pick-up durations are learned fleet-wide.
+duration_model = TGA.DurationModel()
+plan_analyses = {}
+for en, task_graph in entity_to_task_graph.items():
+    xy, had_comms = ET.GetCurrentXY(en)
+    plan_analyses[en] = TGA.PlanAnalysis(task_graph, duration_model, xy.toCoord().getLoc() if had_comms else None)
 
 
 #################################
@@ -391,27 +455,89 @@ st.OnScreenLogMessage("Starting movements.", "Mission Manager", st.Severity.Info
 #######################
 
 iterator = 0
+# Ticks between fleet telemetry snapshots
+TELEMETRY_EVERY = 10
 
 crash_site_loc = XY(0, 0)
 crash_site_found = False
 
+def FindCrashSite(fleet : ET.FleetState) -> bool:
+    global crash_site_loc, crash_site_found
+    for en in entities:
+        i = fleet.Index(en)
+        if fleet.has_comms[i] and fleet.target_found[i]:
+            xy = fleet.GetTargetXY(en)
+            st.OnScreenLogMessage(f"{en.getName()} found target at {xy.x}, {xy.y}", "Mission Manager", st.Severity.Info)
+            crash_site_loc = xy
+            crash_site_found = True
+            return True
+    return False
+
+# The executor checks this against each tick's telemetry, and completes it once any rover sees the target;
+# rescue tasks can depend on "CrashSiteFound" instead of being added from the loop
+if "CrashSiteFound" in LTV1_task_graph.tasks:
+    # Resumed from a checkpoint; functions are not saved
+    LTV1_task_graph.get_task("CrashSiteFound").predicate = FindCrashSite
+elif "CrashSiteFound" not in LTV1_task_graph.history:
+    # (If it is in the history, it finished and was archived before the checkpoint)
+    LTV1_task_graph.add_task(TG.CreatePredicateTask("CrashSiteFound", FindCrashSite), [])
+#NOTE: should send LTV1 to crash site with >50% battery remaining to rescue. A Branch task can pick
+# between plans once the site is found, cancelling the other one; e.g. charge first if the battery is low:
+# rescue_or_charge = TG.Task("RescueOrCharge")
+# rescue_or_charge.choose = lambda fleet : "Rescue" if fleet.state_of_charge[fleet.Index(LTV1)] > 0.5 else "Charge"
+# LTV1_task_graph.add_branch(rescue_or_charge, {"Rescue": rescue_tasks, "Charge": charge_then_rescue_tasks}, ["CrashSiteFound"])
+# A join runs after the first few of its dependencies, cancelling the rest (unless cancel_losers is False),
+# e.g. LTV1 follows as soon as either scout reaches its first waypoint, and the other scout stops:
+# LTV1_follow = TG.Task("Follow", Command_MoveToCoord(LTV1, waypoint_1, "Follow"))
+# LTV1_follow.join_count = 1
+# fleet_graph.add_task(LTV1, LTV1_follow, ["Scout1/Move1", "Scout2/Move1"])
+
+# Last-known telemetry for rovers out of comms; its getters read through to the sim only when asked,
+# so nothing fills it each tick
+telemetry = ET.TelemetryCache()
+# Every obstacle any rover has seen, in local XY
+obstacle_store = OM.ObstacleStore()
+# 2 km x 2 km cost grid around the charging station for planning; synced from the obstacle store
+costmap = CM.Costmap.Around(ET.GetChargingStationXY(), 1000.0, resolution_m=1.0, rover_radius_m=2.0)
+# TaskGraph.version of each entity's last checkpoint
+os.makedirs(CHECKPOINT_DIR, exist_ok=True)
+saved_versions = {}
+
+def AnyDriving() -> bool:
+    for task_graph in entity_to_task_graph.values():
+        for task_id in task_graph.running_tasks:
+            task = task_graph.tasks[task_id]
+            if task.task_type == "Command" and task.command.command_type in TG.MOVE_COMMAND_TYPES:
+                return True
+    return False
+
 exit_flag = False
 while not exit_flag:
     LoopFreqHz = st.GetThisSystem().GetParam(st.VarType.double, "LoopFreqHz")
     time.sleep(1.0 / LoopFreqHz)
     iterator += 1
 
-    if not crash_site_found:
-        for en in entities:
-            found, xy, had_comms = ET.GetTargetScanStatus(en)
-            if had_comms and found:
-                st.OnScreenLogMessage(f"{en.getName()} found target at {xy.x}, {xy.y}", "Mission Manager", st.Severity.Info)
-                crash_site_loc = xy
-                crash_site_found = True
-                #NOTE: should send LTV1 to crash site with >50% battery remaining to rescue
-                # battery_fraction, had_comms = ET.GetStateOfCharge(LTV1)
-                # if had_comms and battery_fraction > 0.5:
-                #     st.OnScreenLogMessage(f"{LTV1.getName()} has enough battery to go to crash site.", "Mission Manager", st.Severity.Info)
+    # A fleet snapshot reads every rover's telemetry, so it is only taken every TELEMETRY_EVERY ticks,
+    # and only while a Predicate or Branch task or a rover waiting for comms needs it
+    fleet = None
+    if iterator % TELEMETRY_EVERY == 0 and executor.needs_telemetry():
+        fleet = ET.snapshot(entities)
+        # Predicate and Branch tasks are checked against this telemetry, and entities back in comms
+        # send their waiting commands this tick instead of after their retry backoff
+        executor.update_telemetry(fleet)
+    if iterator % 100 == 0:
+        # Lidar only finds new obstacles while a rover drives
+        if AnyDriving():
+            if fleet is None:
+                fleet = ET.snapshot(entities)
+            obstacle_store.IngestFleet(fleet)
+            # Only tiles around new or moved obstacles are redrawn
+            costmap.SyncFromStore(obstacle_store)
+        # Checkpoint the task graphs that changed, for RESUME_FROM_CHECKPOINT
+        for en, task_graph in entity_to_task_graph.items():
+            if saved_versions.get(en) != task_graph.version:
+                task_graph.save(os.path.join(CHECKPOINT_DIR, f"{en.getName()}.json"))
+                saved_versions[en] = task_graph.version
 
     # EXAMPLE: Take a camera image periodically, outside of the task graph
     # if iterator % 500 == 0:
@@ -426,8 +552,8 @@ while not exit_flag:
 
 
     #NOTE: Here is an example of modifying the task graph based on some condition
-    # state_of_charge, had_comms = ET.GetStateOfCharge(LTV1)
-    # if(had_comms and state_of_charge < 0.1):
+    # state_of_charge = telemetry.GetStateOfCharge(LTV1)
+    # if(not state_of_charge.stale and state_of_charge.value < 0.1):
     #     st.OnScreenLogMessage("LTV1 is low on power; rerouting to charging station.", "Mission Manager", st.Severity.Info)
     #     move_task = TG.Task("MoveToCharge", Command_MoveToCoord(LTV1, ET.GetChargingStationXY(), "MoveToCharge"))
     #     LTV1_task_graph.clear_all() #wipe existing tasks
@@ -437,116 +563,18 @@ while not exit_flag:
     # Example of logging taskgraph status:
     # st.logger_info("LTV1 task status: " + str(LTV1_task_graph.get_status()))
 
-    # Start all unstarted ready-to-start tasks
-    for task_id in LTV1_task_graph.pending_tasks:
-        task = LTV1_task_graph.get_task(task_id)
-        if not task.started:
-            if task.task_type == "Command":
-                received = mm.SendCommand(LTV1, task.command.command_type, task.command)
-                if received:
-                    task.started = True
-            elif task.task_type == "Timer":
-                task.start_time = st.SimGlobals_SimClock_GetTimeNow()
-                task.started = True
-        else: # task has started
-            if task.task_type == "Timer":
-                if st.SimGlobals_SimClock_GetTimeNow().as_datetime() - task.start_time.as_datetime() > datetime.timedelta(seconds=task.timer_duration):
-                    LTV1_task_graph.mark_completed(task_id)
-    
-    for task_id in LTV2_task_graph.pending_tasks:
-        task = LTV2_task_graph.get_task(task_id)
-        if not task.started:
-            if task.task_type == "Command":
-                received = mm.SendCommand(LTV2, task.command.command_type, task.command)
-                if received:
-                    task.started = True
-            elif task.task_type == "Timer":
-                task.start_time = st.SimGlobals_SimClock_GetTimeNow()
-                task.started = True
-        else: # task has started
-            if task.task_type == "Timer":
-                if st.SimGlobals_SimClock_GetTimeNow().as_datetime() - task.start_time.as_datetime() > datetime.timedelta(seconds=task.timer_duration):
-                    LTV2_task_graph.mark_completed(task_id)
-    
-    for task_id in Scout1_task_graph.pending_tasks:
-        task = Scout1_task_graph.get_task(task_id)
-        if not task.started:
-            if task.task_type == "Command":
-                received = mm.SendCommand(Scout1, task.command.command_type, task.command)
-                if received:
-                    task.started = True
-            elif task.task_type == "Timer":
-                task.start_time = st.SimGlobals_SimClock_GetTimeNow()
-                task.started = True
-        else: # task has started
-            if task.task_type == "Timer":
-                if st.SimGlobals_SimClock_GetTimeNow().as_datetime() - task.start_time.as_datetime() > datetime.timedelta(seconds=task.timer_duration):
-                    Scout1_task_graph.mark_completed(task_id)
-
-    for task_id in Scout2_task_graph.pending_tasks:
-        task = Scout2_task_graph.get_task(task_id)
-        if not task.started:
-            if task.task_type == "Command":
-                received = mm.SendCommand(Scout2, task.command.command_type, task.command)
-                if received:
-                    task.started = True
-            elif task.task_type == "Timer":
-                task.start_time = st.SimGlobals_SimClock_GetTimeNow()
-                task.started = True
-        else: # task has started
-            if task.task_type == "Timer":
-                if st.SimGlobals_SimClock_GetTimeNow().as_datetime() - task.start_time.as_datetime() > datetime.timedelta(seconds=task.timer_duration):
-                    Scout2_task_graph.mark_completed(task_id)
-
-    for task_id in TruckRover_task_graph.pending_tasks:
-        task = TruckRover_task_graph.get_task(task_id)
-        if not task.started:
-            if task.task_type == "Command":
-                received = mm.SendCommand(TruckRover, task.command.command_type, task.command)
-                if received:
-                    task.started = True
-            elif task.task_type == "Timer":
-                task.start_time = st.SimGlobals_SimClock_GetTimeNow()
-                task.started = True
-        else: # task has started
-            if task.task_type == "Timer":
-                if st.SimGlobals_SimClock_GetTimeNow().as_datetime() - task.start_time.as_datetime() > datetime.timedelta(seconds=task.timer_duration):
-                    TruckRover_task_graph.mark_completed(task_id)
-
-    for task_id in ExcavatorRover_task_graph.pending_tasks:
-        task = ExcavatorRover_task_graph.get_task(task_id)
-        if not task.started:
-            if task.task_type == "Command":
-                received = mm.SendCommand(ExcavatorRover, task.command.command_type, task.command)
-                if received:
-                    task.started = True
-            elif task.task_type == "Timer":
-                task.start_time = st.SimGlobals_SimClock_GetTimeNow()
-                task.started = True
-        else: # task has started
-            if task.task_type == "Timer":
-                if st.SimGlobals_SimClock_GetTimeNow().as_datetime() - task.start_time.as_datetime() > datetime.timedelta(seconds=task.timer_duration):
-                    ExcavatorRover_task_graph.mark_completed(task_id)
-
-    for task_id in SamplingRover_task_graph.pending_tasks:
-        task = SamplingRover_task_graph.get_task(task_id)
-        if not task.started:
-            if task.task_type == "Command":
-                received = mm.SendCommand(SamplingRover, task.command.command_type, task.command)
-                if received:
-                    task.started = True
-            elif task.task_type == "Timer":
-                task.start_time = st.SimGlobals_SimClock_GetTimeNow()
-                task.started = True
-        else: # task has started
-            if task.task_type == "Timer":
-                if st.SimGlobals_SimClock_GetTimeNow().as_datetime() - task.start_time.as_datetime() > datetime.timedelta(seconds=task.timer_duration):
-                    SamplingRover_task_graph.mark_completed(task_id)
-
-    # Example of checking for any failures, and clearing all tasks if there was one
-    # if len(LTV1_task_graph.failed_tasks) > 0:
-    #     LTV1_task_graph.clear_all() #wipe existing tasks
-    #     #NOTE might want to do something else here?
+    # Start all unstarted ready-to-start tasks and run timers, for every entity's task graph
+    executor.tick()
+    # Example of logging dispatch stats:
+    # st.logger_info(str(executor.last_stats))
+
+    # Example of finding the rover whose plan will finish last, to re-plan it first:
+    # slowest_en, finish_s = TGA.RankByFinishTime(plan_analyses)[0]
+    # st.logger_info(f"{slowest_en.getName()} finishes last; critical path: {plan_analyses[slowest_en].critical_path()}")
+
+    # Failed tasks fail their dependents by default (Task.on_failure), so nothing stays blocked.
+    # Example of abandoning part of a plan: cancels Move2 and everything after it, and stops LTV1 if it is driving
+    # LTV1_task_graph.cancel("Move2")
 
     # if image_changed:
     #     # HOW TO SHOW AN IMAGE ON-SCREEN; PROBABLY DEACTIVATE THIS SO IT DOESN'T POP UP WHEN NOT TESTING
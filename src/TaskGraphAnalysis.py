@@ -0,0 +1,313 @@
+import heapq
+from typing import Dict, List
+import numpy as np
+import spaceteams as st
+import TaskGraph as TG
+
+# Seconds, for command types that have not been seen to complete yet
+DEFAULT_DURATIONS_S = {
+    "RotateToAzimuth": 10.0,
+    "CameraPan": 3.0,
+    "CaptureImage": 2.0,
+    "PickUpAntenna": 15.0,
+    "PlaceDownAntenna": 15.0,
+    "Stop": 1.0,
+}
+
+
+def _MoveTarget(task: TG.Task) -> np.ndarray:
+    # The PCPF location a MoveToCoord task drives to, or None for any other task
+    if task.task_type == "Command" and task.command is not None and task.command.command_type == "MoveToCoord":
+        return np.asarray(task.command.payload.GetParam(st.VarType.doubleV3, "Loc"), dtype=np.float64)
+    return None
+
+
+class DurationModel:
+    """
+    Estimates how long tasks take, in seconds, and learns from the ones that complete.
+
+    Moves take their straight-line distance over the entity's observed speed, Timer tasks
+    take their timer_duration, and other commands take the observed duration of their
+    command type (starting from DEFAULT_DURATIONS_S). Observations are blended in with an
+    exponential moving average, so recent ones count the most.
+
+    Any object with the same estimate() and observe() methods can be given to PlanAnalysis instead.
+    """
+    def __init__(self, default_speed_mps: float = 1.0, default_duration_s: float = 5.0, smoothing: float = 0.3):
+        self.default_speed = default_speed_mps
+        self.default_duration = default_duration_s
+        self.smoothing = smoothing
+        # Entity name -> observed driving speed in m/s
+        self.speeds: Dict[str, float] = {}
+        # Command type -> observed duration in s
+        self.durations: Dict[str, float] = dict(DEFAULT_DURATIONS_S)
+
+    def _Blend(self, old: float, new: float) -> float:
+        return new if old is None else old + self.smoothing * (new - old)
+
+    def estimate(self, task: TG.Task, start_loc: np.ndarray, target: np.ndarray = None) -> float:
+        """
+        Seconds the task should take.
+
+        param start_loc: PCPF location of the entity when the task starts, or None if unknown.
+
+        param target: PCPF location a MoveToCoord task drives to, if already known; read from its payload otherwise.
+        """
+        if task.task_type == "Timer":
+            return task.timer_duration
+        if task.command is None:
+            # Conditions, and other entities' tasks (FleetTaskGraph placeholders), take no time of their own here
+            return 0.0
+        if target is None:
+            target = _MoveTarget(task)
+        if target is not None and start_loc is not None:
+            speed = self.speeds.get(task.command.en.getName(), self.default_speed)
+            return float(np.linalg.norm(target - start_loc)) / speed
+        return self.durations.get(task.command.command_type, self.default_duration)
+
+    def observe(self, task: TG.Task, start_loc: np.ndarray, duration_s: float):
+        """
+        Learn from a task that completed duration_s seconds after it started at start_loc.
+        """
+        if task.task_type != "Command" or duration_s <= 0.0:
+            return
+        target = _MoveTarget(task)
+        if target is not None and start_loc is not None:
+            distance = float(np.linalg.norm(target - start_loc))
+            # Very short moves are mostly turning and settling, not driving
+            if distance > 1.0:
+                name = task.command.en.getName()
+                self.speeds[name] = self._Blend(self.speeds.get(name), distance / duration_s)
+        command_type = task.command.command_type
+        self.durations[command_type] = self._Blend(self.durations.get(command_type), duration_s)
+
+
+class PlanAnalysis:
+    def __init__(self, graph: TG.TaskGraph, model: DurationModel = None, start_loc: np.ndarray = None):
+        """
+        Earliest start and finish times, slack and the critical path of a TaskGraph's unfinished
+        tasks, from a DurationModel's estimates. Times are sim seconds.
+
+        The analysis listens to the graph. A task starting or completing only updates the tasks
+        downstream of it, and stops where their times do not change; completed tasks also teach
+        the model. Adding, failing or cancelling tasks changes the plan's shape, so the next
+        query recomputes everything, in O(tasks + dependencies).
+
+        Estimates are as of the last change: a ready task that is still waiting, e.g. on comms,
+        keeps its old start time until refresh() is called.
+
+        param graph: The TaskGraph to analyse; one entity's plan.
+
+        param model: The DurationModel, or an object with the same methods. Share one between
+        entities so command durations are learned fleet-wide.
+
+        param start_loc: PCPF location of the entity now, for the first move's distance; None if unknown.
+        """
+        self.graph = graph
+        self.model = model if model is not None else DurationModel()
+        # Where the entity is after its last completed move
+        self.location = start_loc
+        # Per unfinished task
+        self.duration: Dict[str, float] = {}
+        self.earliest_start: Dict[str, float] = {}
+        self.earliest_finish: Dict[str, float] = {}
+        self.start_loc: Dict[str, np.ndarray] = {}
+        self.end_loc: Dict[str, np.ndarray] = {}
+        # Where each unfinished MoveToCoord task drives to (None for other tasks), read from its payload once
+        self.targets: Dict[str, np.ndarray] = {}
+        # Where the entity was when each running task started
+        self.started_from: Dict[str, np.ndarray] = {}
+        # Unfinished dependents of each unfinished task, and each task's place in a topological order
+        self.successors: Dict[str, List[str]] = {}
+        self.rank: Dict[str, int] = {}
+        self.order: List[str] = []
+        self.latest_finish: Dict[str, float] = {}
+        self.now_s = 0.0
+        # The plan's shape changed; everything is recomputed on the next query
+        self._stale = True
+        self._latest_valid = False
+        graph.add_listener(self._OnTaskEvent)
+
+    def refresh(self, now_ns: int = None):
+        """
+        Recompute every unfinished task's times. O(tasks + dependencies).
+
+        param now_ns: The current sim time in ns; read from the graph's clock if not given.
+        """
+        graph = self.graph
+        self.now_s = (now_ns if now_ns is not None else graph.clock()) / 1e9
+        unfinished = set(graph.ready_tasks)
+        unfinished.update(graph.running_tasks)
+        unfinished.update(graph.blocked_tasks)
+        for mapping in (self.duration, self.earliest_start, self.earliest_finish, self.start_loc, self.end_loc, self.targets):
+            mapping.clear()
+        self.successors = {task_id: [dependent for dependent in graph.reverse_dependencies.get(task_id, ()) if dependent in unfinished]
+                           for task_id in unfinished}
+        # Kahn's algorithm, computing each task once all of its dependencies have been
+        in_degree = {task_id: 0 for task_id in unfinished}
+        for task_id in unfinished:
+            for dependent in self.successors[task_id]:
+                in_degree[dependent] += 1
+        order = [task_id for task_id in unfinished if in_degree[task_id] == 0]
+        i = 0
+        while i < len(order):
+            self._Compute(order[i])
+            for dependent in self.successors[order[i]]:
+                in_degree[dependent] -= 1
+                if in_degree[dependent] == 0:
+                    order.append(dependent)
+            i += 1
+        self.order = order
+        self.rank = {task_id: i for i, task_id in enumerate(order)}
+        self._stale = False
+        self._latest_valid = False
+
+    def _Compute(self, task_id: str) -> bool:
+        # Sets a task's times from its dependencies'; returns whether its finish time or end location changed
+        task = self.graph.tasks[task_id]
+        if task_id not in self.targets:
+            self.targets[task_id] = _MoveTarget(task)
+        target = self.targets[task_id]
+        earliest_finish = self.earliest_finish
+        last_dep = None
+        for dep in self.graph.dependencies.get(task_id, ()):
+            if dep in earliest_finish and (last_dep is None or earliest_finish[dep] > earliest_finish[last_dep]):
+                last_dep = dep
+        if task_id in self.started_from:
+            start_loc = self.started_from[task_id]
+        elif last_dep is not None:
+            # The entity is wherever the last dependency to finish leaves it
+            start_loc = self.end_loc[last_dep]
+        else:
+            start_loc = self.location
+        duration = self.model.estimate(task, start_loc, target)
+        if task.started and task.start_ns is not None:
+            start = task.start_ns / 1e9
+            # A running task that has overrun its estimate finishes no earlier than now
+            finish = max(start + duration, self.now_s)
+        else:
+            start = max(self.now_s, earliest_finish[last_dep]) if last_dep is not None else self.now_s
+            finish = start + duration
+        end_loc = target if target is not None else start_loc
+        self.duration[task_id] = duration
+        self.earliest_start[task_id] = start
+        self.start_loc[task_id] = start_loc
+        # Locations are only ever passed along, so an unchanged one is the same object
+        changed = earliest_finish.get(task_id) != finish or self.end_loc.get(task_id) is not end_loc
+        self.end_loc[task_id] = end_loc
+        earliest_finish[task_id] = finish
+        return changed
+
+    def _Propagate(self, seeds: List[str]):
+        # Recompute seeds and, in topological order, everything downstream whose inputs changed
+        heap = [(self.rank[task_id], task_id) for task_id in seeds if task_id in self.rank]
+        heapq.heapify(heap)
+        queued = {task_id for _, task_id in heap}
+        while heap:
+            _, task_id = heapq.heappop(heap)
+            if self._Compute(task_id):
+                for dependent in self.successors[task_id]:
+                    if dependent not in queued:
+                        queued.add(dependent)
+                        heapq.heappush(heap, (self.rank[dependent], dependent))
+        self._latest_valid = False
+
+    def _OnTaskEvent(self, task_id: str, event: str):
+        task = self.graph.tasks[task_id]
+        if event == "completed":
+            start_loc = self.started_from.pop(task_id, None)
+            if task.start_ns is not None and task.end_ns is not None:
+                self.model.observe(task, start_loc, (task.end_ns - task.start_ns) / 1e9)
+            target = _MoveTarget(task)
+            if target is not None:
+                self.location = target
+            if self._stale or task_id not in self.rank:
+                return
+            self.now_s = task.end_ns / 1e9
+            for mapping in (self.duration, self.earliest_start, self.earliest_finish, self.start_loc, self.end_loc, self.targets):
+                mapping.pop(task_id, None)
+            seeds = self.successors.pop(task_id, [])
+            if target is not None:
+                # Tasks that are not waiting on anything start from the entity's new location
+                seeds = seeds + list(self.graph.ready_tasks)
+            self._Propagate(seeds)
+        elif event == "started":
+            self.started_from[task_id] = self.location
+            if self._stale or task_id not in self.rank:
+                return
+            self.now_s = task.start_ns / 1e9
+            self._Propagate([task_id])
+        else:
+            self.started_from.pop(task_id, None)
+            self._stale = True
+
+    def _Ensure(self):
+        if self._stale:
+            self.refresh()
+
+    def finish_time(self) -> float:
+        """
+        The sim time, in seconds, that every unfinished task should be done by.
+        """
+        self._Ensure()
+        return max(self.earliest_finish.values(), default=self.now_s)
+
+    def critical_path(self) -> List[str]:
+        """
+        The chain of unfinished tasks that decides finish_time(), first task first.
+        Speeding up anything else does not finish the plan sooner.
+        """
+        self._Ensure()
+        if not self.earliest_finish:
+            return []
+        earliest_finish = self.earliest_finish
+        task_id = max(earliest_finish, key=earliest_finish.get)
+        path = [task_id]
+        while True:
+            deps = [dep for dep in self.graph.dependencies.get(task_id, ()) if dep in earliest_finish]
+            if not deps:
+                break
+            binding = max(deps, key=earliest_finish.get)
+            # The task waited on now, or on having started, rather than on its dependencies
+            if earliest_finish[binding] < self.earliest_start[task_id] - 1e-9:
+                break
+            task_id = binding
+            path.append(task_id)
+        path.reverse()
+        return path
+
+    def slack(self) -> Dict[str, float]:
+        """
+        How many seconds each unfinished task can slip without delaying finish_time().
+        Tasks on the critical path have none.
+        """
+        self._Ensure()
+        if not self._latest_valid:
+            end = self.finish_time()
+            latest_finish = {}
+            for task_id in reversed(self.order):
+                if task_id not in self.earliest_finish:
+                    continue
+                latest = end
+                for dependent in self.successors.get(task_id, ()):
+                    if dependent in latest_finish:
+                        span = self.earliest_finish[dependent] - self.earliest_start[dependent]
+                        latest = min(latest, latest_finish[dependent] - span)
+                latest_finish[task_id] = latest
+            self.latest_finish = latest_finish
+            self._latest_valid = True
+        return {task_id: self.latest_finish[task_id] - finish for task_id, finish in self.earliest_finish.items()}
+
+    def __repr__(self):
+        return f"<PlanAnalysis | Tasks: {len(self.earliest_finish)}, Finish: {self.finish_time():.1f} s, Critical path: {len(self.critical_path())} tasks>"
+
+
+def RankByFinishTime(analyses: Dict) -> List[tuple]:
+    """
+    Order entities by when their plans should finish, last first: the bottleneck rover comes first.
+
+    param analyses: Dict of entity to that entity's PlanAnalysis.
+
+    return: List of (entity, finish time in sim seconds).
+    """
+    return sorted(((en, analysis.finish_time()) for en, analysis in analyses.items()), key=lambda item: item[1], reverse=True)
@@ -0,0 +1,797 @@
+import heapq
+from collections import defaultdict, deque
+from typing import Callable, Dict, List, Set
+import spaceteams as st
+import API.STU_Common as STU
+from TaskGraphTask import MOVE_COMMAND_TYPES, RESEND_PARAM, Task, TaskResources, _FinalIDs
+from TaskGraphHistory import TaskGraphCompaction, TaskHistory
+from TaskGraphPersistence import TaskGraphPersistence
+
+
+class TaskGraph(TaskGraphCompaction, TaskGraphPersistence):
+    def __init__(self):
+        self.tasks: Dict[str, Task] = {}
+        # Unfinished dependencies of each task
+        self.dependencies: Dict[str, Set[str]] = defaultdict(set)
+        self.reverse_dependencies: Dict[str, Set[str]] = defaultdict(set)
+        # Every unfinished task is in exactly one of ready, running or blocked:
+        #   ready   - dependencies done, not started yet
+        #   running - started, waiting on completion/failure
+        #   blocked - waiting on dependencies
+        # pending_tasks is ready and running together.
+        self.ready_tasks: Set[str] = set()
+        self.running_tasks: Set[str] = set()
+        self.blocked_tasks: Set[str] = set()
+        self.pending_tasks: Set[str] = set()
+        self.completed_tasks: Set[str] = set()
+        self.failed_tasks: Set[str] = set()
+        self.cancelled_tasks: Set[str] = set()
+        # Finished tasks still held in full, roughly in the order they finished; compact() archives them into history
+        self.finished_order: deque = deque()
+        self.history = TaskHistory()
+        # Failed or spliced tasks whose dependents wait on a fallback or replacement subgraph instead: task_id -> the subgraph's final tasks
+        self.redirects: Dict[str, List[str]] = {}
+        # Blocked joins (Task.join_count) -> how many more of their dependencies must complete
+        self.join_needs: Dict[str, int] = {}
+        # Dependencies on task_ids that have not been added yet: missing task_id -> tasks waiting on it
+        self.missing_dependencies: Dict[str, Set[str]] = defaultdict(set)
+        # Tasks that became ready since the last drain_ready(), in order
+        self.newly_ready: deque = deque()
+        # Ready Command tasks by the resources they use (joined by "+", e.g. "manipulator+mobility"), each a heap
+        # of (-priority, deadline, sequence, task_id), most urgent first; see next_ready(). Entries whose sequence is not ready_sequence[task_id] are stale,
+        # and are dropped when they reach the top.
+        self.ready_queues: Dict[str, list] = defaultdict(list)
+        self.ready_sequence: Dict[str, int] = {}
+        self._ready_count = 0
+        # Created first so that Stop tasks are looked at before the commands they make room for
+        self.ready_queues["Stop"]
+        # Tasks archived since compact() last rebuilt the tables above
+        self._archived_since_rebuild = 0
+        # Bumped on every change, so callers can skip work when nothing happened
+        self.version = 0
+        # Reads the sim time in ns for Task.start_ns/end_ns when the caller does not give one
+        self.clock: Callable[[], int] = STU.SimTimeNs
+        # Called as listener(task_id, event) on every task change; see add_listener()
+        self.listeners: List[Callable[[str, str], None]] = []
+
+    def add_task(self, task: Task, depends_on: List[str] = None):
+        """
+        Add a task to the task graph.
+
+        param task: The Task object to be added.
+
+        param depends_on: List of task_ids that this task depends on. Ones that have already completed are ignored.
+        If one has already failed (and was not skipped) or was cancelled, the task fails right away;
+        for a join (Task.join_count), only once too few are left to reach its count.
+        Ones that have not been added yet are allowed, and listed by unresolved_dependencies() until they are.
+        Archived ones (see compact()) count as they finished.
+
+        Raises ValueError if the task_id is already in the graph or its history (see unique_id()), or if the
+        dependencies would make a cycle; the graph is left unchanged.
+        """
+        task_id = task.task_id
+        if task_id in self.tasks or task_id in self.history:
+            raise ValueError(f"TaskGraph already has a task with id '{task_id}'.")
+        unfinished = []
+        dead_dependency = False
+        # Skipped failures count as done
+        done = sum(1 for dep in depends_on or [] if dep not in self.redirects and self._FinishedStatus(dep) == "skipped")
+        for dep in self._ResolveDependencies(depends_on or []):
+            status = self._FinishedStatus(dep)
+            if status is None:
+                unfinished.append(dep)
+            elif status == "completed":
+                done += 1
+            else:
+                dead_dependency = True
+        needs = None
+        losers = []
+        if task.join_count is not None:
+            needs = task.join_count - done
+            dead_dependency = 0 < needs and len(unfinished) < needs
+            if needs <= 0:
+                losers = unfinished if task.cancel_losers else []
+                unfinished = []
+        cycle = self._FindCycle(task_id, unfinished)
+        if cycle:
+            raise ValueError(f"Adding task '{task_id}' would make a dependency cycle: {' -> '.join(cycle)}")
+
+        self.tasks[task_id] = task
+        self.version += 1
+        # Tasks added earlier may have been waiting for this one to show up
+        self.missing_dependencies.pop(task_id, None)
+        if dead_dependency:
+            self.failed_tasks.add(task_id)
+            self.finished_order.append(task_id)
+            task.failed = True
+        elif unfinished:
+            self.dependencies[task_id].update(unfinished)
+            for dep in unfinished:
+                self.reverse_dependencies[dep].add(task_id)
+                if dep not in self.tasks:
+                    self.missing_dependencies[dep].add(task_id)
+            self.blocked_tasks.add(task_id)
+            if needs is not None:
+                self.join_needs[task_id] = needs
+        else:
+            # If no dependencies, the task is ready to start
+            self._MakeReady(task_id)
+        self._Notify(task_id, "added")
+        for loser in losers:
+            self.cancel(loser)
+
+    def _FindCycle(self, task_id: str, depends_on: List[str]) -> List[str]:
+        # A new edge dep -> task_id closes a cycle only if task_id already reaches dep through tasks
+        # that named it before it was added, so only those forward references are searched
+        targets = set(depends_on)
+        if task_id in targets:
+            return [task_id, task_id]
+        if not self.reverse_dependencies.get(task_id) or not targets:
+            return None
+        parents = {task_id: None}
+        stack = [task_id]
+        while stack:
+            current = stack.pop()
+            for dependent in self.reverse_dependencies.get(current, ()):
+                if dependent in parents:
+                    continue
+                parents[dependent] = current
+                if dependent in targets:
+                    path = [dependent]
+                    while path[-1] != task_id:
+                        path.append(parents[path[-1]])
+                    return [dependent] + path[::-1]
+                stack.append(dependent)
+        return None
+
+    def unique_id(self, base_id: str) -> str:
+        """
+        Get a task_id based on base_id that is not in the graph or its history yet: base_id itself, or base_id_2, base_id_3, ...
+
+        Use this for tasks that can be added more than once, e.g. from a command-failure reaction.
+        """
+        if base_id not in self.tasks and base_id not in self.history:
+            return base_id
+        n = 2
+        while f"{base_id}_{n}" in self.tasks or f"{base_id}_{n}" in self.history:
+            n += 1
+        return f"{base_id}_{n}"
+
+    def unresolved_dependencies(self) -> Dict[str, List[str]]:
+        """
+        Get the dependencies that name tasks which have not been added, as missing task_id -> unfinished tasks waiting on it.
+        """
+        report = {}
+        for missing_id, dependents in self.missing_dependencies.items():
+            waiting = [dependent for dependent in dependents if not self._IsFinished(dependent)]
+            if waiting:
+                report[missing_id] = waiting
+        return report
+
+    def validate(self) -> List[str]:
+        """
+        Check that every unfinished task can eventually run, and get the order they can run in.
+
+        Run this once the plan is built, before the simulation loop starts, so a bad plan fails
+        right away instead of stalling. O(tasks + dependencies).
+
+        return: The unfinished task_ids in a topological order (dependencies first).
+
+        Raises ValueError listing every dependency on a task that was never added, every
+        task caught in a dependency cycle, and fallback tasks whose ids are already taken.
+        """
+        unfinished = [task_id for task_id in self.tasks if not self._IsFinished(task_id)]
+        # Kahn's algorithm over the remaining dependencies
+        in_degree = {task_id: 0 for task_id in unfinished}
+        for task_id in unfinished:
+            for dep in self.dependencies.get(task_id, ()):
+                if dep in in_degree:
+                    in_degree[task_id] += 1
+        order = [task_id for task_id in unfinished if in_degree[task_id] == 0]
+        i = 0
+        while i < len(order):
+            for dependent in self.reverse_dependencies.get(order[i], ()):
+                if dependent in in_degree:
+                    in_degree[dependent] -= 1
+                    if in_degree[dependent] == 0:
+                        order.append(dependent)
+            i += 1
+
+        problems = []
+        for missing_id, waiting in self.unresolved_dependencies().items():
+            problems.append(f"'{missing_id}' is never added, but {sorted(waiting)} depend on it")
+        if len(order) < len(unfinished):
+            # Whatever is left is waiting on a missing task (reported above) or on a cycle
+            behind_missing = set()
+            queue = deque(self.missing_dependencies)
+            while queue:
+                for dependent in self.reverse_dependencies.get(queue.popleft(), ()):
+                    if dependent not in behind_missing:
+                        behind_missing.add(dependent)
+                        queue.append(dependent)
+            placed = set(order)
+            stuck = sorted(task_id for task_id in unfinished if task_id not in placed and task_id not in behind_missing)
+            if stuck:
+                problems.append(f"tasks in or behind a dependency cycle: {stuck}")
+        for task_id in unfinished:
+            fallback = self.tasks[task_id].fallback_tasks
+            if fallback:
+                fallback_ids = [t.task_id for t, _ in fallback]
+                taken = sorted({fallback_id for fallback_id in fallback_ids if fallback_id in self.tasks or fallback_ids.count(fallback_id) > 1})
+                if taken:
+                    problems.append(f"fallback of '{task_id}' reuses task ids {taken}")
+        if problems:
+            raise ValueError("TaskGraph is not valid: " + "; ".join(problems))
+        return order
+
+    def _ResolveDependencies(self, depends_on: List[str]) -> List[str]:
+        # Skipped failures count as done, and fallen-back ones are replaced by their fallback's final tasks
+        resolved = []
+        for dep in depends_on:
+            if dep in self.redirects:
+                resolved.extend(self._ResolveDependencies(self.redirects[dep]))
+            elif self._FinishedStatus(dep) != "skipped":
+                resolved.append(dep)
+        return resolved
+
+    def _IsFinished(self, task_id: str) -> bool:
+        return task_id in self.completed_tasks or task_id in self.failed_tasks or task_id in self.cancelled_tasks
+
+    def _FinishedStatus(self, task_id: str) -> str:
+        # How a task held in full or archived finished, one of HISTORY_STATUSES; None if it has not, or was never added
+        if task_id in self.completed_tasks:
+            return "completed"
+        if task_id in self.failed_tasks:
+            return "skipped" if self.tasks[task_id].on_failure == "Skip" else "failed"
+        if task_id in self.cancelled_tasks:
+            return "cancelled"
+        return self.history.status(task_id)
+
+    def _Release(self, task_id: str):
+        # Dependents no longer wait on task_id
+        losers = []
+        for dependent in self.reverse_dependencies.pop(task_id, ()):
+            if dependent not in self.blocked_tasks:
+                continue
+            self.dependencies[dependent].discard(task_id)
+            if dependent in self.join_needs:
+                self.join_needs[dependent] -= 1
+                if self.join_needs[dependent] <= 0:
+                    losers.extend(self._ReadyJoin(dependent))
+            elif not self.dependencies[dependent]:
+                del self.dependencies[dependent]
+                self._MakeReady(dependent)
+        for loser in losers:
+            self.cancel(loser)
+
+    def _ReadyJoin(self, task_id: str) -> List[str]:
+        # The join has enough completed dependencies; it stops waiting on the rest, which are returned to be cancelled
+        del self.join_needs[task_id]
+        losers = self.dependencies.pop(task_id, set())
+        for loser in losers:
+            self.reverse_dependencies[loser].discard(task_id)
+        self._MakeReady(task_id)
+        return sorted(losers) if self.tasks[task_id].cancel_losers else []
+
+    def _DropFromJoins(self, dead_ids: List[str]):
+        # Joins that outlive some of their dependencies stop counting them
+        for dead_id in dead_ids:
+            self.join_needs.pop(dead_id, None)
+            for dependent in self.reverse_dependencies.get(dead_id, ()):
+                if dependent in self.join_needs:
+                    self.dependencies[dependent].discard(dead_id)
+
+    def _FailDescendants(self, task_id: str, time_ns: int):
+        # Nothing downstream of task_id can run, so fail it all now rather than leave it blocked
+        descendants = self._Descendants(task_id)
+        self._DropFromJoins([task_id] + descendants)
+        for descendant in descendants:
+            self.tasks[descendant].failed = True
+            self.failed_tasks.add(descendant)
+            self._Finish(descendant, time_ns)
+            self.reverse_dependencies.pop(descendant, None)
+            self.dependencies.pop(descendant, None)
+        self.reverse_dependencies.pop(task_id, None)
+        for descendant in descendants:
+            self._Notify(descendant, "failed")
+
+    def _Descendants(self, task_id: str) -> List[str]:
+        # Unfinished tasks that can no longer run without task_id, directly or indirectly, in breadth-first order.
+        # A join is only one of them once too few of its dependencies are left to reach its count.
+        found = []
+        seen = {task_id}
+        lost = defaultdict(int)
+        queue = deque([task_id])
+        while queue:
+            for dependent in self.reverse_dependencies.get(queue.popleft(), ()):
+                if dependent in seen or self._IsFinished(dependent):
+                    continue
+                if dependent in self.join_needs:
+                    lost[dependent] += 1
+                    if len(self.dependencies[dependent]) - lost[dependent] >= self.join_needs[dependent]:
+                        continue
+                seen.add(dependent)
+                found.append(dependent)
+                queue.append(dependent)
+        return found
+
+    def _MakeReady(self, task_id: str):
+        self.blocked_tasks.discard(task_id)
+        self.ready_tasks.add(task_id)
+        self.pending_tasks.add(task_id)
+        self.newly_ready.append(task_id)
+        self._Enqueue(task_id)
+
+    def _Enqueue(self, task_id: str, ahead: bool = False):
+        # ahead puts the task before every other of the same priority and deadline
+        task = self.tasks[task_id]
+        if task.task_type != "Command":
+            return
+        self._ready_count += 1
+        sequence = -self._ready_count if ahead else self._ready_count
+        self.ready_sequence[task_id] = sequence
+        deadline = task.deadline_ns if task.deadline_ns is not None else float("inf")
+        heapq.heappush(self.ready_queues["+".join(sorted(TaskResources(task)))], (-task.priority, deadline, sequence, task_id))
+
+    def next_ready(self, resources: str) -> str:
+        """
+        Get the most urgent ready Command task that uses exactly the given resources, without removing it:
+        the highest priority, then the earliest deadline, then the first to become ready. O(log n) amortized.
+
+        param resources: A key of ready_queues: resource names, sorted and joined by "+".
+
+        return: The task_id, or None if no such task is ready.
+        """
+        queue = self.ready_queues.get(resources)
+        while queue:
+            task_id = queue[0][3]
+            if self.ready_sequence.get(task_id) == queue[0][2]:
+                return task_id
+            heapq.heappop(queue)
+        return None
+
+    def ready_by_priority(self) -> List[str]:
+        """
+        Get every ready Command task, most urgent first.
+        """
+        entries = [entry for queue in self.ready_queues.values() for entry in queue if self.ready_sequence.get(entry[3]) == entry[2]]
+        return [entry[3] for entry in sorted(entries)]
+
+    def set_priority(self, task_id: str, priority: int, deadline_ns: int = None):
+        """
+        Change a task's priority and deadline; a ready task moves to its new place in the queue right away.
+        """
+        task = self.tasks[task_id]
+        task.priority = priority
+        task.deadline_ns = deadline_ns
+        if task_id in self.ready_tasks:
+            self._Enqueue(task_id)
+        self.version += 1
+
+    def _Finish(self, task_id: str, time_ns: int):
+        self.tasks[task_id].end_ns = time_ns
+        self.finished_order.append(task_id)
+        self.ready_tasks.discard(task_id)
+        self.ready_sequence.pop(task_id, None)
+        self.running_tasks.discard(task_id)
+        self.blocked_tasks.discard(task_id)
+        self.pending_tasks.discard(task_id)
+        self.version += 1
+
+    def _Notify(self, task_id: str, event: str):
+        for listener in self.listeners:
+            listener(task_id, event)
+
+    def add_listener(self, listener: Callable[[str, str], None]):
+        """
+        Call listener(task_id, event) after every task change, once the graph is consistent again.
+
+        Events are "added", "started", "completed", "failed", "cancelled" and "preempted". Tasks failed
+        because a dependency failed, or cancelled along with one, get their own event.
+        """
+        self.listeners.append(listener)
+
+    def add_tasks(self, tasks_and_dependencies: List[tuple]):
+        """
+        Add several tasks to the task graph.
+
+        param tasks_and_dependencies: List of (Task, depends_on) pairs, as made by CreateMoveChain.
+        """
+        for task, depends_on in tasks_and_dependencies:
+            self.add_task(task, depends_on)
+
+    def add_branch(self, task: Task, options: Dict[str, List[tuple]], depends_on: List[str] = None):
+        """
+        Add a Branch task and the subgraph of each of its options. Once the branch has run and
+        task.choose(fleet) names an option (see TaskGraphExecutor.update_telemetry()), that
+        option's subgraph runs and the others are cancelled; see choose_branch().
+
+        param task: The branch; its task_type is set to "Branch".
+
+        param options: Option name -> list of (Task, depends_on) pairs, as for add_tasks. Tasks
+        that depend on nothing else in their option are made to depend on the branch.
+
+        param depends_on: List of task_ids that the branch depends on.
+        """
+        task.task_type = "Branch"
+        task.branches = {option: [t.task_id for t, _ in subgraph] for option, subgraph in options.items()}
+        self.add_task(task, depends_on)
+        for subgraph in options.values():
+            option_ids = {t.task_id for t, _ in subgraph}
+            for option_task, deps in subgraph:
+                deps = list(deps or [])
+                if not any(dep in option_ids for dep in deps):
+                    deps.append(task.task_id)
+                self.add_task(option_task, deps)
+
+    def choose_branch(self, task_id: str, option: str, time_ns: int = None) -> List[str]:
+        """
+        Complete a Branch task with one of its options: the other options' tasks, and
+        whatever depends on them, are cancelled, then the chosen option's subgraph is released.
+
+        param task_id: The id of the branch.
+
+        param option: One of the branch's options.
+
+        param time_ns: The sim time it was chosen at, in ns; read from the clock if not given.
+
+        return: The ids of the cancelled tasks.
+
+        Raises ValueError if option is not one of the branch's.
+        """
+        task = self.tasks[task_id]
+        if option not in task.branches:
+            raise ValueError(f"Branch '{task_id}' has no option '{option}'; options are {sorted(task.branches)}.")
+        if self._IsFinished(task_id):
+            return []
+        if time_ns is None:
+            time_ns = self.clock()
+        cancelled = []
+        for other, other_ids in task.branches.items():
+            if other != option:
+                for other_id in other_ids:
+                    cancelled.extend(self.cancel(other_id, time_ns))
+        self.mark_completed(task_id, time_ns)
+        return cancelled
+
+    def get_task(self, task_id: str) -> Task:
+        """
+        Get a task by its id. Archived tasks (see compact()) are only in history.
+
+        param task_id: The id of the task.
+
+        return: The Task object.
+        """
+        return self.tasks[task_id]
+
+    def mark_started(self, task_id: str, time_ns: int = None):
+        """
+        Mark a task as started.
+
+        param task_id: The id of the started task.
+
+        param time_ns: The sim time it started at, in ns; read from the clock if not given.
+        """
+        task = self.tasks[task_id]
+        task.started = True
+        task.start_ns = time_ns if time_ns is not None else self.clock()
+        self.ready_tasks.discard(task_id)
+        self.ready_sequence.pop(task_id, None)
+        self.running_tasks.add(task_id)
+        self.pending_tasks.add(task_id)
+        self.version += 1
+        self._Notify(task_id, "started")
+
+    def mark_completed(self, task_id: str, time_ns: int = None, resend: int = None):
+        """
+        Mark a task as completed and update the dependencies.
+
+        Unknown or already-finished tasks are ignored, e.g. a cancelled move reporting back, as are
+        reports from a command stopped by preempt().
+
+        param task_id: The id of the completed task.
+
+        param time_ns: The sim time it completed at, in ns; read from the clock if not given.
+
+        param resend: ReportedResend() of the report, which tells the stopped command's report from the
+        one sent again; see _StaleReport() for what is assumed without it.
+        """
+        if task_id not in self.tasks or self._IsFinished(task_id) or self._StaleReport(task_id, resend):
+            return
+        self.tasks[task_id].completed = True
+        self.completed_tasks.add(task_id)
+        self._Finish(task_id, time_ns if time_ns is not None else self.clock())
+
+        # Check for reverse dependencies to see if other tasks are unblocked
+        self._Release(task_id)
+        self._Notify(task_id, "completed")
+
+    def mark_failed(self, task_id: str, time_ns: int = None, resend: int = None):
+        """
+        Mark a task as failed and apply its on_failure policy to its dependents.
+
+        Unknown or already-finished tasks are ignored, e.g. a cancelled move reporting back, as are
+        reports from a command stopped by preempt().
+
+        param task_id: The id of the failed task.
+
+        param time_ns: The sim time it failed at, in ns; read from the clock if not given.
+
+        param resend: ReportedResend() of the report, as for mark_completed().
+        """
+        if task_id not in self.tasks or self._IsFinished(task_id) or self._StaleReport(task_id, resend):
+            return
+        if time_ns is None:
+            time_ns = self.clock()
+        task = self.tasks[task_id]
+        task.failed = True
+        self.failed_tasks.add(task_id)
+        self._Finish(task_id, time_ns)
+        self._ApplyFailurePolicy(task_id, time_ns)
+        self._Notify(task_id, "failed")
+
+    def _StaleReport(self, task_id: str, resend: int = None) -> bool:
+        # Whether a report is from a command preempt() stopped rather than the one the task was sent again with
+        task = self.tasks[task_id]
+        if resend is not None:
+            task.preempted = False
+            return resend != task.resends
+        # Without the count, the first report after preempt() is taken to be the stopped command's. This relies on
+        # the entity reporting every stopped move, as EntityBehavior_LTV does: a Stop fails the active MoveToCoord
+        # with "Stop command received". A stopped command that never reports would drop the real one's report
+        if task.preempted:
+            task.preempted = False
+            return True
+        return False
+
+    def _ApplyFailurePolicy(self, task_id: str, time_ns: int):
+        task = self.tasks[task_id]
+        if task.on_failure == "Skip" or (task.on_failure == "Fallback" and not task.fallback_tasks):
+            self._Release(task_id)
+        elif task.on_failure == "Fallback":
+            fallback = task.fallback_tasks
+            # Only ever fall back once
+            task.fallback_tasks = None
+            self.add_tasks(fallback)
+            self._Redirect(task_id, _FinalIDs(fallback), time_ns)
+        else:
+            self._FailDescendants(task_id, time_ns)
+
+    def _Redirect(self, task_id: str, final_ids: List[str], time_ns: int):
+        # Dependents of task_id wait on final_ids instead, and so will tasks added later that name task_id
+        self.redirects[task_id] = final_ids
+        resolved = self._ResolveDependencies(final_ids)
+        if any(final_id in self.failed_tasks or final_id in self.cancelled_tasks for final_id in resolved):
+            self._FailDescendants(task_id, time_ns)
+            return
+        unfinished = [final_id for final_id in resolved if final_id not in self.completed_tasks]
+        losers = []
+        for dependent in self.reverse_dependencies.pop(task_id, ()):
+            if dependent not in self.blocked_tasks:
+                continue
+            self.dependencies[dependent].discard(task_id)
+            self.dependencies[dependent].update(unfinished)
+            for final_id in unfinished:
+                self.reverse_dependencies[final_id].add(dependent)
+            if dependent in self.join_needs:
+                # A join counts each final task as one more dependency to complete
+                self.join_needs[dependent] += len(unfinished) - 1
+                if self.join_needs[dependent] <= 0:
+                    losers.extend(self._ReadyJoin(dependent))
+            elif not self.dependencies[dependent]:
+                del self.dependencies[dependent]
+                self._MakeReady(dependent)
+        for loser in losers:
+            self.cancel(loser)
+
+    def splice(self, task_id: str, replacement: List[tuple], time_ns: int = None, failed: bool = False) -> List[str]:
+        """
+        Replace a task with a detour subgraph, e.g. backing away from an obstacle and driving on,
+        leaving the rest of the plan as it is. O(the task's edges + the subgraph).
+
+        The subgraph's first tasks (those that depend on nothing else in it) also wait on whatever the
+        task was still waiting on, and the task's dependents wait on the subgraph's final tasks instead
+        of it, as do tasks added later that name it. An unfinished task is then cancelled, stopping a
+        running move as in cancel(), or marked failed if failed is set.
+
+        To repair a failed command, splice it from the command's failure reaction with failed=True: the
+        command has already stopped, so no Stop is sent, and the failure never reaches its dependents
+        or its on_failure policy. Marking it failed after is ignored.
+
+        param task_id: The id of the task to replace: blocked, ready, running or failed.
+
+        param replacement: List of (Task, depends_on) pairs, as for add_tasks. depends_on may also name
+        tasks outside the subgraph, but not ones that depend on task_id.
+
+        param time_ns: The sim time of the change, in ns; read from the clock if not given.
+
+        param failed: Whether the task's command has failed, rather than being stopped for the detour.
+
+        return: The ids of the subgraph's final tasks.
+
+        Raises ValueError if the task completed or was cancelled, if replacement is empty, or if one of
+        its task_ids is already in the graph (see unique_id()) or used twice; the graph is left unchanged.
+        """
+        if task_id not in self.tasks or task_id in self.completed_tasks or task_id in self.cancelled_tasks:
+            raise ValueError(f"Cannot splice '{task_id}': only blocked, ready, running or failed tasks can be replaced.")
+        if not replacement:
+            raise ValueError(f"Cannot splice '{task_id}' with an empty subgraph.")
+        new_ids = [t.task_id for t, _ in replacement]
+        new_set = set(new_ids)
+        if len(new_set) < len(new_ids) or any(new_id in self.tasks for new_id in new_ids):
+            taken = sorted({new_id for new_id in new_ids if new_id in self.tasks} | {new_id for new_id in new_set if new_ids.count(new_id) > 1})
+            raise ValueError(f"Cannot splice '{task_id}': task ids {taken} are already in the graph or used twice.")
+        if time_ns is None:
+            time_ns = self.clock()
+        inherited = list(self.dependencies.get(task_id, ())) if task_id in self.blocked_tasks else []
+        for new_task, deps in replacement:
+            deps = list(deps or [])
+            if not any(dep in new_set for dep in deps):
+                deps.extend(inherited)
+            self.add_task(new_task, deps)
+        final_ids = _FinalIDs(replacement)
+        self._Redirect(task_id, final_ids, time_ns)
+        if failed and not self._IsFinished(task_id):
+            # Its dependents now wait on the subgraph, so there is no failure to pass on
+            self.tasks[task_id].failed = True
+            self.failed_tasks.add(task_id)
+            self._Finish(task_id, time_ns)
+            self._Notify(task_id, "failed")
+        elif not self._IsFinished(task_id):
+            self.cancel(task_id, time_ns)
+        return final_ids
+
+    def cancel(self, task_id: str, time_ns: int = None) -> List[str]:
+        """
+        Cancel a task and everything that depends on it, directly or indirectly; joins
+        (Task.join_count) that can still reach their count without it keep waiting.
+
+        Running move commands (MOVE_COMMAND_TYPES) are stopped: a Stop task, "Stop_<task_id>"
+        (or "Stop_<task_id>_2", ... if the move was preempted before), is added for each, so a
+        TaskGraphExecutor sends it on its next tick (and keeps trying while the entity is out
+        of comms). Cancelled commands that report back later are ignored.
+
+        param task_id: The id of the task to cancel.
+
+        param time_ns: The sim time it was cancelled at, in ns; read from the clock if not given.
+
+        return: The ids of the cancelled tasks.
+        """
+        if task_id not in self.tasks or self._IsFinished(task_id):
+            return []
+        if time_ns is None:
+            time_ns = self.clock()
+        cancelled = [task_id] + self._Descendants(task_id)
+        self._DropFromJoins(cancelled)
+        for cancelled_id in cancelled:
+            task = self.tasks[cancelled_id]
+            was_running = cancelled_id in self.running_tasks
+            task.cancelled = True
+            self.cancelled_tasks.add(cancelled_id)
+            self._Finish(cancelled_id, time_ns)
+            self.reverse_dependencies.pop(cancelled_id, None)
+            self.dependencies.pop(cancelled_id, None)
+            if was_running:
+                self._StopIfMoving(task)
+        for cancelled_id in cancelled:
+            self._Notify(cancelled_id, "cancelled")
+        return cancelled
+
+    def mark_timed_out(self, task_id: str, time_ns: int = None):
+        """
+        Mark a running command as failed because it never reported back; a move is also stopped as in cancel().
+
+        param task_id: The id of the timed-out task.
+
+        param time_ns: The sim time it timed out at, in ns; read from the clock if not given.
+        """
+        if task_id not in self.running_tasks:
+            return
+        self.tasks[task_id].failure_reason = "Timeout"
+        self.mark_failed(task_id, time_ns)
+        self._StopIfMoving(self.tasks[task_id])
+
+    def _StopIfMoving(self, task: Task):
+        if task.task_type == "Command" and task.command is not None and task.command.command_type in MOVE_COMMAND_TYPES:
+            # A move preempted and sent again may already have had a Stop; each send needs its own
+            stop_id = self.unique_id(f"Stop_{task.task_id}")
+            self.add_task(Task(stop_id, STU.Command_Stop(task.command.en, stop_id)), [])
+
+    def preempt(self, task_id: str, priority: int = 0, time_ns: int = None) -> str:
+        """
+        Stop a running move so a more urgent task can have its resources, and make it ready to be sent again.
+
+        A Stop task with the given priority is added, and the move's task goes back in the ready queue,
+        ahead of the others of its priority; dependents keep waiting on it. Its command is sent again with
+        Task.resends one higher, so the stopped command's report can be told apart and is ignored.
+        Listeners get a "preempted" event.
+
+        param task_id: The id of the running move (MOVE_COMMAND_TYPES).
+
+        param priority: Priority of the Stop task, usually that of the task taking the slot.
+
+        param time_ns: The sim time it was preempted at, in ns; read from the clock if not given.
+
+        return: The id of the Stop task, or None if task_id is not a running move.
+        """
+        task = self.tasks.get(task_id)
+        if task_id not in self.running_tasks or task.task_type != "Command" or task.command is None \
+                or task.command.command_type not in MOVE_COMMAND_TYPES:
+            return None
+        if time_ns is None:
+            time_ns = self.clock()
+        stop_id = self.unique_id(f"Stop_{task_id}")
+        stop = Task(stop_id, STU.Command_Stop(task.command.en, stop_id))
+        stop.priority = priority
+        self.add_task(stop, [])
+        task.started = False
+        task.start_ns = None
+        task.preempted = True
+        task.resends += 1
+        task.command.payload.AddOrSetParam(st.VarType.int32, RESEND_PARAM, task.resends)
+        self.running_tasks.discard(task_id)
+        self.ready_tasks.add(task_id)
+        self.newly_ready.append(task_id)
+        self._Enqueue(task_id, ahead=True)
+        self.version += 1
+        self._Notify(task_id, "preempted")
+        return stop_id
+
+    def drain_ready(self) -> List[str]:
+        """
+        Get the tasks that became ready since the last call, in the order they became ready.
+
+        Tasks that have since been started, finished or cleared are left out.
+        """
+        drained = []
+        while self.newly_ready:
+            task_id = self.newly_ready.popleft()
+            if task_id in self.ready_tasks:
+                drained.append(task_id)
+        return drained
+
+    def clear_all(self):
+        """
+        Clear all tasks and dependencies.
+
+        May result in unexpected behavior if commands are still active.
+        """
+        self.tasks.clear()
+        self.dependencies.clear()
+        self.reverse_dependencies.clear()
+        self.ready_tasks.clear()
+        self.running_tasks.clear()
+        self.blocked_tasks.clear()
+        self.pending_tasks.clear()
+        self.completed_tasks.clear()
+        self.failed_tasks.clear()
+        self.cancelled_tasks.clear()
+        self.finished_order.clear()
+        self.history = TaskHistory()
+        self.redirects.clear()
+        self.join_needs.clear()
+        self.missing_dependencies.clear()
+        self.newly_ready.clear()
+        self.ready_queues.clear()
+        self.ready_queues["Stop"]
+        self.ready_sequence.clear()
+        self._archived_since_rebuild = 0
+        self.version += 1
+
+    def get_status(self):
+        """
+        Get the status of all tasks.
+        """
+        status_report = {
+            'Ready': [task_id for task_id in self.ready_tasks],
+            'Running': [task_id for task_id in self.running_tasks],
+            'Blocked': [task_id for task_id in self.blocked_tasks],
+            'Pending': [task_id for task_id in self.pending_tasks],
+            'Completed': [task_id for task_id in self.completed_tasks],
+            'Failed': [task_id for task_id in self.failed_tasks],
+            'Cancelled': [task_id for task_id in self.cancelled_tasks],
+        }
+        return status_report
+
+    def __repr__(self):
+        return f"<TaskGraph | Ready: {len(self.ready_tasks)}, Running: {len(self.running_tasks)}, Blocked: {len(self.blocked_tasks)}, Completed: {len(self.completed_tasks)}, Failed: {len(self.failed_tasks)}, Cancelled: {len(self.cancelled_tasks)}, Archived: {len(self.history)}>"
@@ -0,0 +1,389 @@
+import heapq
+from typing import Callable, Dict, List
+import API.STU_Common as STU
+from TaskGraphTask import MOVE_COMMAND_TYPES, RetryPolicy, Task, TaskResources
+from TaskGraphCore import TaskGraph
+
+
+class TimerService:
+    """
+    Deadlines in integer sim nanoseconds, kept in a min-heap so each check only
+    touches the timers that have expired.
+    """
+    def __init__(self):
+        self.heap: List[tuple] = []
+        # Tie-breaker so items with equal deadlines are never compared
+        self._count = 0
+
+    def add(self, deadline_ns: int, item):
+        """
+        Schedule an item to be returned by pop_expired once the sim time reaches deadline_ns.
+        """
+        heapq.heappush(self.heap, (deadline_ns, self._count, item))
+        self._count += 1
+
+    def pop_expired(self, now_ns: int) -> List:
+        """
+        Remove and return every item whose deadline is at or before now_ns, earliest first.
+        """
+        expired = []
+        while self.heap and self.heap[0][0] <= now_ns:
+            expired.append(heapq.heappop(self.heap)[2])
+        return expired
+
+    def next_deadline(self) -> int:
+        """
+        The earliest deadline, or None if nothing is scheduled.
+        """
+        return self.heap[0][0] if self.heap else None
+
+    def __len__(self):
+        return len(self.heap)
+
+
+def _SecondsToNs(seconds: float) -> int:
+    return int(round(seconds * 1_000_000_000))
+
+
+class ExecutorStats:
+    """
+    What a TaskGraphExecutor did in one tick.
+    """
+    def __init__(self):
+        self.dispatched = 0
+        self.deferred = 0
+        self.timers_started = 0
+        self.timers_completed = 0
+        self.timed_out = 0
+        self.gave_up = 0
+        self.preempted = 0
+        self.late = 0
+        self.conditions_met = 0
+        self.archived = 0
+        self.ready = 0
+        self.waiting_entities = 0
+        self.scheduled_timers = 0
+
+    def __repr__(self):
+        return (f"<ExecutorStats | Dispatched: {self.dispatched}, Deferred: {self.deferred}, "
+                f"Timers started: {self.timers_started}, Timers completed: {self.timers_completed}, "
+                f"Timed out: {self.timed_out}, Gave up: {self.gave_up}, Preempted: {self.preempted}, "
+                f"Late: {self.late}, Conditions met: {self.conditions_met}, Archived: {self.archived}, Ready: {self.ready}, "
+                f"Waiting entities: {self.waiting_entities}, Scheduled timers: {self.scheduled_timers}>")
+
+
+class TaskGraphExecutor:
+    def __init__(self, mm, entity_to_task_graph: Dict = None, default_timeout_s: float = None, default_retry: RetryPolicy = None,
+                 keep_finished: int = None, keep_history: int = None):
+        """
+        Runs the task graphs of several entities: sends ready Command tasks through
+        the MissionManager and runs Timer tasks, in one pass per tick.
+
+        Each command holds the rover resources it uses (TaskResources()) while it runs, so an entity
+        runs commands that use different resources, e.g. driving and taking pictures, at the same
+        time, and ones that share a resource one after another. Each tick, ready tasks are given
+        resources most urgent first, and a task that has to wait keeps less urgent ones off the
+        resources it needs. If it waits on moves of lower priority, they are preempted
+        (TaskGraph.preempt()) and it is sent right after their Stops, in the same tick, unless a
+        preempt hook (add_preempt_hook()) says no. Only the front of each ready queue and expired
+        timers are looked at each tick, not every pending task in every graph.
+
+        Predicate and Branch tasks are checked against the telemetry given to update_telemetry()
+        when they start and on every tick after, until they complete or time out (Task.timeout_s).
+
+        When a send fails because the entity is out of comms, the entity waits as its task's
+        RetryPolicy says: nothing is sent or checked for it until the wait ends or
+        comms_restored() is called. Its Timer tasks still start and end on time.
+
+        param mm: The MissionManager used to send commands.
+
+        param entity_to_task_graph: Dict of entity to that entity's TaskGraph.
+
+        param default_timeout_s: Timeout for commands whose task has no timeout_s of its own; None for no timeout.
+
+        param default_retry: RetryPolicy for tasks without one of their own; by default, exponential backoff
+        from 0.1 s to 5 s that never gives up.
+
+        param keep_finished: If set, a graph holding twice this many finished tasks is compacted
+        (TaskGraph.compact()) down to this many at the end of the tick, so memory stays bounded over
+        a long mission; None to keep every finished task in full.
+
+        param keep_history: If set along with keep_finished, each graph's history of archived tasks
+        is trimmed to this many rows whenever it holds twice as many (see TaskGraph.compact());
+        None to keep a row for every archived task.
+        """
+        self.mm = mm
+        self.graphs: Dict = {}
+        self.default_timeout_s = default_timeout_s
+        self.default_retry = default_retry if default_retry is not None else RetryPolicy()
+        self.keep_finished = keep_finished
+        self.keep_history = keep_history
+        # Per entity, resource -> the Task last sent that uses it, which holds it while it runs
+        self.running: Dict = {}
+        # Called as hook(en, running Task, urgent Task) before a preemption; any returning False stops it
+        self.preempt_hooks: List[Callable] = []
+        # Per entity, running Predicate and Branch tasks by task_id, checked against telemetry every tick
+        self.conditions: Dict = {}
+        # The latest EntityTelemetry.FleetState given to update_telemetry()
+        self.telemetry = None
+        # Entities waiting to retry a send -> the token of their "Retry" timer
+        self.waiting: Dict = {}
+        self._wait_token = 0
+        # Timer task ends and command timeouts, as (kind, entity, Task), and retry waits, as ("Retry", entity, token)
+        self.timers = TimerService()
+        self.last_stats = ExecutorStats()
+        for en, graph in (entity_to_task_graph or {}).items():
+            self.add_graph(en, graph)
+
+    def add_graph(self, en, graph: TaskGraph):
+        """
+        Add an entity's task graph; tasks that are already pending will be started on the next tick.
+
+        Tasks that are already running, e.g. in a graph from TaskGraph.load(), get their timers back:
+        Timer tasks end at their saved start time plus their duration, and command timeouts restart now.
+
+        param en: The entity that runs the graph's commands.
+
+        param graph: The entity's TaskGraph.
+        """
+        self.graphs[en] = graph
+        self.running[en] = {}
+        self.conditions[en] = {}
+        self.waiting.pop(en, None)
+        # Every ready task goes through the next tick's intake, in the order they became ready
+        ready = dict.fromkeys(graph.drain_ready())
+        ready.update(dict.fromkeys(graph.ready_tasks))
+        graph.newly_ready.extend(ready)
+        if graph.running_tasks:
+            now_ns = STU.SimTimeNs()
+            for task_id in graph.running_tasks:
+                task = graph.tasks[task_id]
+                if task.task_type == "Timer":
+                    start_ns = task.timer_start if task.timer_start is not None else now_ns
+                    self.timers.add(start_ns + _SecondsToNs(task.timer_duration), ("Timer", en, task))
+                    continue
+                if task.task_type == "Predicate" or task.task_type == "Branch":
+                    self.conditions[en][task_id] = task
+                    continue
+                if task.task_type != "Command":
+                    continue
+                for resource in TaskResources(task):
+                    self.running[en][resource] = task
+                timeout_s = self._TimeoutS(task)
+                if timeout_s is not None:
+                    self.timers.add(now_ns + _SecondsToNs(timeout_s), ("Timeout", en, task))
+
+    def add_preempt_hook(self, hook: Callable):
+        """
+        Call hook(en, running Task, urgent Task) before preempting a running move for a more urgent
+        task; if any hook returns False, the urgent task waits for the move to finish instead.
+        """
+        self.preempt_hooks.append(hook)
+
+    def get_graph(self, en) -> TaskGraph:
+        """
+        Get an entity's task graph.
+        """
+        return self.graphs[en]
+
+    def comms_restored(self, en):
+        """
+        Report that an entity is back in comms, so its waiting commands are sent on the next tick.
+        """
+        # Its Retry timer is left to expire unmatched
+        self.waiting.pop(en, None)
+
+    def needs_telemetry(self) -> bool:
+        """
+        Whether update_telemetry() has anything to do: a Predicate or Branch task to check, or an
+        entity waiting to send while out of comms. Lets a caller skip reading fleet telemetry otherwise.
+        """
+        return bool(self.waiting) or any(self.conditions.values())
+
+    def update_comms(self, fleet):
+        """
+        Call comms_restored() for every waiting entity that had comms in an EntityTelemetry.FleetState.
+        O(waiting entities).
+        """
+        for en in list(self.waiting):
+            if fleet.has_comms[fleet.Index(en)]:
+                self.comms_restored(en)
+
+    def update_telemetry(self, fleet):
+        """
+        Give the executor this tick's EntityTelemetry.FleetState, for Predicate and Branch tasks
+        to be checked against on the next tick(). Also calls update_comms().
+        """
+        self.telemetry = fleet
+        self.update_comms(fleet)
+
+    def _CheckCondition(self, en, graph: TaskGraph, task: Task, now_ns: int, stats: ExecutorStats):
+        task_id = task.task_id
+        if graph.tasks.get(task_id) is not task or task_id not in graph.running_tasks:
+            # Cleared, replaced, timed out or cancelled
+            self.conditions[en].pop(task_id, None)
+            return
+        if task.task_type == "Predicate":
+            if task.predicate is None or not task.predicate(self.telemetry):
+                return
+            del self.conditions[en][task_id]
+            graph.mark_completed(task_id, now_ns)
+        else:
+            option = task.choose(self.telemetry) if task.choose is not None else None
+            if option is None:
+                return
+            del self.conditions[en][task_id]
+            graph.choose_branch(task_id, option, now_ns)
+        stats.conditions_met += 1
+
+    def _Wait(self, en, task: Task, now_ns: int):
+        policy = task.retry if task.retry is not None else self.default_retry
+        self._wait_token += 1
+        self.waiting[en] = self._wait_token
+        self.timers.add(now_ns + _SecondsToNs(policy.delay_s(task.send_attempts)), ("Retry", en, self._wait_token))
+
+    def _TimeoutS(self, task: Task) -> float:
+        return task.timeout_s if task.timeout_s is not None else self.default_timeout_s
+
+    def _Dispatch(self, en, graph: TaskGraph, now_ns: int, stats: ExecutorStats):
+        # Tasks that use no resources never wait for each other
+        unshared = graph.next_ready("")
+        while unshared is not None:
+            if not self._Send(en, graph, graph.tasks[unshared], now_ns, stats):
+                return
+            unshared = graph.next_ready("")
+        # Otherwise only the front of each queue can start: the rest of a queue needs the same resources.
+        # Pending Stops go out first, then the fronts most urgent first.
+        fronts = []
+        for resources, queue in list(graph.ready_queues.items()):
+            if graph.next_ready(resources) is not None:
+                fronts.append((resources != "Stop", queue[0]))
+        if not fronts:
+            return
+        fronts.sort()
+        running = self.running[en]
+        # Resources a more urgent task is waiting for
+        reserved = set()
+        for _, (_, _, _, task_id) in fronts:
+            task = graph.tasks[task_id]
+            needs = TaskResources(task)
+            if not needs.isdisjoint(reserved):
+                continue
+            holders = {running[r] for r in needs if r in running}
+            holders = [h for h in holders if h.task_id in graph.running_tasks and graph.tasks.get(h.task_id) is h]
+            if holders and not all(self._ShouldPreempt(en, holder, task) for holder in holders):
+                reserved.update(needs)
+                continue
+            for holder in holders:
+                stop_id = graph.preempt(holder.task_id, task.priority, now_ns)
+                stats.preempted += 1
+                if not self._Send(en, graph, graph.tasks[stop_id], now_ns, stats):
+                    return
+            if not self._Send(en, graph, task, now_ns, stats):
+                return
+            reserved.update(needs)
+
+    def _ShouldPreempt(self, en, running: Task, urgent: Task) -> bool:
+        if urgent.priority <= running.priority or not running.preemptible or running.command is None \
+                or running.command.command_type not in MOVE_COMMAND_TYPES:
+            return False
+        return all(hook(en, running, urgent) is not False for hook in self.preempt_hooks)
+
+    def _Send(self, en, graph: TaskGraph, task: Task, now_ns: int, stats: ExecutorStats) -> bool:
+        # False if the entity is out of comms; it then waits, and the rest of its commands wait with it
+        task_id = task.task_id
+        if task.command is None:
+            # Nothing to send; the task is done as soon as it is dispatched
+            graph.mark_started(task_id, now_ns)
+            graph.mark_completed(task_id, now_ns)
+            stats.dispatched += 1
+            return True
+        if self.mm.SendCommand(en, task.command.command_type, task.command):
+            graph.mark_started(task_id, now_ns)
+            for resource in TaskResources(task):
+                self.running[en][resource] = task
+            timeout_s = self._TimeoutS(task)
+            if timeout_s is not None:
+                self.timers.add(now_ns + _SecondsToNs(timeout_s), ("Timeout", en, task))
+            stats.dispatched += 1
+            if task.deadline_ns is not None and now_ns > task.deadline_ns:
+                stats.late += 1
+            return True
+        stats.deferred += 1
+        task.send_attempts += 1
+        policy = task.retry if task.retry is not None else self.default_retry
+        if policy.max_attempts is not None and task.send_attempts >= policy.max_attempts:
+            task.failure_reason = "NoComms"
+            graph.mark_failed(task_id, now_ns)
+            stats.gave_up += 1
+            # Nothing left to retry; the entity's next command is tried on the next tick
+            return False
+        self._Wait(en, task, now_ns)
+        return False
+
+    def tick(self) -> ExecutorStats:
+        """
+        Complete finished timers, then start ready tasks, most urgent first. Call once per loop iteration.
+
+        return: The ExecutorStats for this tick, also kept as last_stats.
+        """
+        stats = ExecutorStats()
+        # One clock read for every timer this tick
+        now_ns = STU.SimTimeNs()
+
+        for kind, en, item in self.timers.pop_expired(now_ns):
+            if kind == "Retry":
+                if self.waiting.get(en) == item:
+                    del self.waiting[en]
+                continue
+            graph = self.graphs[en]
+            task = item
+            task_id = task.task_id
+            if graph.tasks.get(task_id) is not task or task_id not in graph.running_tasks:
+                # Cleared, replaced or finished some other way
+                continue
+            if kind == "Timer":
+                graph.mark_completed(task_id, now_ns)
+                stats.timers_completed += 1
+            elif task.start_ns is None or now_ns >= task.start_ns + _SecondsToNs(self._TimeoutS(task)):
+                # Otherwise the timeout is from before the task was preempted and sent again
+                graph.mark_timed_out(task_id, now_ns)
+                stats.timed_out += 1
+
+        if self.telemetry is not None:
+            for en, conditions in self.conditions.items():
+                for task in list(conditions.values()):
+                    self._CheckCondition(en, self.graphs[en], task, now_ns, stats)
+
+        for en, graph in self.graphs.items():
+            # Completion callbacks may have unblocked tasks since the last tick.
+            # Timers and conditions need no comms, so they start right away; commands wait in the graph's ready queues
+            if graph.newly_ready:
+                for task_id in graph.drain_ready():
+                    task = graph.tasks[task_id]
+                    if task.task_type == "Timer":
+                        task.timer_start = now_ns
+                        graph.mark_started(task_id, now_ns)
+                        self.timers.add(now_ns + _SecondsToNs(task.timer_duration), ("Timer", en, task))
+                        stats.timers_started += 1
+                    elif task.task_type == "Predicate" or task.task_type == "Branch":
+                        graph.mark_started(task_id, now_ns)
+                        self.conditions[en][task_id] = task
+                        if task.timeout_s is not None:
+                            self.timers.add(now_ns + _SecondsToNs(task.timeout_s), ("Timeout", en, task))
+                        # Checked right away, so whatever it releases can be sent this tick
+                        if self.telemetry is not None:
+                            self._CheckCondition(en, graph, task, now_ns, stats)
+            if graph.ready_tasks and en not in self.waiting:
+                self._Dispatch(en, graph, now_ns, stats)
+            stats.ready += len(graph.ready_tasks)
+            if self.keep_finished is not None and len(graph.finished_order) > 2 * self.keep_finished:
+                stats.archived += graph.compact(self.keep_finished, self.keep_history)
+
+        stats.waiting_entities = len(self.waiting)
+        stats.scheduled_timers = len(self.timers)
+        self.last_stats = stats
+        return stats
+
+    def __repr__(self):
+        return f"<TaskGraphExecutor | Graphs: {len(self.graphs)}, {self.last_stats}>"
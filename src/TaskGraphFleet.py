@@ -0,0 +1,253 @@
+from collections import defaultdict
+from typing import Dict, List
+from TaskGraphTask import Task
+from TaskGraphCore import TaskGraph
+
+# Separates the entity name from the task_id in a fleet-wide task id, e.g. "LTV2/Move2"
+ENTITY_SEPARATOR = "/"
+
+
+def QualifiedID(en, task_id: str) -> str:
+    """
+    The fleet-wide id of an entity's task, "<entity name>/<task_id>".
+    """
+    return f"{en.getName()}{ENTITY_SEPARATOR}{task_id}"
+
+
+def SplitQualifiedID(qualified_id: str) -> tuple:
+    """
+    The (entity name, task_id) of a fleet-wide task id.
+    """
+    en_name, task_id = qualified_id.split(ENTITY_SEPARATOR, 1)
+    return en_name, task_id
+
+
+class FleetTaskGraph:
+    def __init__(self, entity_to_task_graph: Dict = None):
+        """
+        Links the entities' task graphs, so a task for one entity can depend on tasks for others,
+        e.g. TruckRover leaving the charger once LTV2 has arrived.
+
+        Each entity keeps its own TaskGraph and task ids. Across entities, tasks are named by
+        qualified ids, "<entity name>/<task_id>" (QualifiedID()). A dependency on another entity's
+        task is an "External" placeholder in the dependent's graph, with the qualified id as its
+        task_id: it is never sent, and completes or fails when the task it stands for does. The
+        fleet listens to every graph, and routes each finished task to its placeholders with one dict lookup.
+        Cancelling a placeholder, e.g. as the loser of a join, cancels the task it stands for,
+        unless other placeholders still wait on it.
+
+        param entity_to_task_graph: Dict of entity to that entity's TaskGraph.
+        """
+        self.graphs: Dict = {}
+        self.entities: Dict[str, object] = {}
+        # Qualified id -> placeholders waiting on it, each as [graph, placeholder id, qualified ids it still waits on]
+        self.watchers: Dict[str, List[list]] = defaultdict(list)
+        for en, graph in (entity_to_task_graph or {}).items():
+            self.add_graph(en, graph)
+
+    def add_graph(self, en, graph: TaskGraph):
+        """
+        Add an entity's task graph, e.g. after replacing it with TaskGraph.load(). Placeholders
+        already in the graph start waiting on their tasks again.
+
+        param en: The entity that runs the graph's commands.
+
+        param graph: The entity's TaskGraph.
+        """
+        replaced = self.graphs.get(en)
+        if replaced is not None and replaced is not graph:
+            # The replaced graph's placeholders no longer hold anything up
+            for qualified_id in list(self.watchers):
+                self.watchers[qualified_id] = [watcher for watcher in self.watchers[qualified_id] if watcher[0] is not replaced]
+                if not self.watchers[qualified_id]:
+                    del self.watchers[qualified_id]
+        self.graphs[en] = graph
+        self.entities[en.getName()] = en
+        graph.add_listener(lambda task_id, event, en=en: self._OnTaskEvent(en, task_id, event))
+        for task_id in list(graph.running_tasks):
+            if graph.tasks[task_id].task_type == "External":
+                self._Watch([graph, task_id, set()], [task_id])
+        # Placeholders in other graphs may have been waiting for this entity's graph to show up
+        name_prefix = en.getName() + ENTITY_SEPARATOR
+        for qualified_id in [qualified_id for qualified_id in self.watchers if qualified_id.startswith(name_prefix)]:
+            if self._IsFinished(qualified_id):
+                for watcher in self.watchers.pop(qualified_id):
+                    self._Resolve(watcher, qualified_id)
+
+    def get_graph(self, en) -> TaskGraph:
+        """
+        Get an entity's task graph.
+        """
+        return self.graphs[en]
+
+    def add_task(self, en, task: Task, depends_on: List = None):
+        """
+        Add a task to an entity's graph, with dependencies on tasks of any entity.
+
+        param en: The entity the task is for.
+
+        param task: The Task object to be added; its task_id is the entity's own.
+
+        param depends_on: The entity's own task_ids, and other entities' tasks as qualified ids
+        ("LTV2/Move2") or (entity, task_id) pairs. Other entities' tasks do not have to be added yet.
+        """
+        graph = self.graphs[en]
+        local = []
+        for dep in depends_on or []:
+            if isinstance(dep, tuple):
+                other_en, dep_id = dep
+                dep = dep_id if other_en is en else QualifiedID(other_en, dep_id)
+            elif ENTITY_SEPARATOR in dep:
+                en_name, dep_id = SplitQualifiedID(dep)
+                if en_name == en.getName():
+                    dep = dep_id
+            if ENTITY_SEPARATOR in dep and dep not in graph.tasks and dep not in graph.history:
+                self._AddPlaceholder(graph, dep)
+            local.append(dep)
+        graph.add_task(task, local)
+
+    def _AddPlaceholder(self, graph: TaskGraph, qualified_id: str):
+        placeholder = Task(qualified_id)
+        placeholder.task_type = "External"
+        graph.add_task(placeholder, [])
+        graph.mark_started(qualified_id)
+        self._Watch([graph, qualified_id, set()], [qualified_id])
+
+    def _IsFinished(self, qualified_id: str) -> bool:
+        en_name, task_id = SplitQualifiedID(qualified_id)
+        source = self.graphs.get(self.entities.get(en_name))
+        return source is not None and source._FinishedStatus(task_id) is not None
+
+    def _Watch(self, watcher: list, qualified_ids: List[str]):
+        # Every id goes into the waiting set before any is resolved, so finding one finished cannot complete the placeholder early
+        watcher[2].update(qualified_ids)
+        for qualified_id in qualified_ids:
+            if self._IsFinished(qualified_id):
+                self._Resolve(watcher, qualified_id)
+            else:
+                self.watchers[qualified_id].append(watcher)
+
+    def _Resolve(self, watcher: list, qualified_id: str):
+        # qualified_id has finished; settle the placeholder if nothing else holds it up
+        graph, placeholder_id, remaining = watcher
+        if qualified_id not in remaining:
+            return
+        remaining.discard(qualified_id)
+        en_name, task_id = SplitQualifiedID(qualified_id)
+        source = self.graphs[self.entities[en_name]]
+        if task_id in source.redirects:
+            # Fell back or was spliced; the source's own dependents now wait on the final tasks that replaced it, and so does the placeholder
+            self._Watch(watcher, [QualifiedID(self.entities[en_name], final_id) for final_id in source.redirects[task_id]])
+        elif source._FinishedStatus(task_id) in ("failed", "cancelled"):
+            graph.mark_failed(placeholder_id)
+            return
+        if not remaining:
+            graph.mark_completed(placeholder_id)
+
+    def _OnTaskEvent(self, en, task_id: str, event: str):
+        if event != "completed" and event != "failed" and event != "cancelled":
+            return
+        if not self.watchers:
+            return
+        if event == "cancelled" and self.graphs[en].tasks[task_id].task_type == "External":
+            self._Unwatch(self.graphs[en], task_id)
+        waiting = self.watchers.pop(QualifiedID(en, task_id), None)
+        if waiting:
+            for watcher in waiting:
+                self._Resolve(watcher, QualifiedID(en, task_id))
+
+    def _Unwatch(self, graph: TaskGraph, placeholder_id: str):
+        # A cancelled placeholder, e.g. the loser of a join, cancels the tasks it stood for once nothing else waits on them
+        for watcher in self.watchers.get(placeholder_id, ()):
+            if watcher[0] is graph and watcher[1] == placeholder_id:
+                break
+        else:
+            return
+        for qualified_id in list(watcher[2]):
+            waiting = self.watchers.get(qualified_id, [])
+            if watcher in waiting:
+                waiting.remove(watcher)
+            if not waiting:
+                self.watchers.pop(qualified_id, None)
+                en_name, task_id = SplitQualifiedID(qualified_id)
+                source = self.graphs.get(self.entities.get(en_name))
+                if source is not None:
+                    source.cancel(task_id)
+        watcher[2].clear()
+
+    def mark_completed(self, en, task_id: str, resend: int = None):
+        """
+        Mark an entity's task as completed, e.g. from a command-complete reaction; other entities' tasks waiting on it are released.
+        """
+        self.graphs[en].mark_completed(task_id, resend=resend)
+
+    def mark_failed(self, en, task_id: str, resend: int = None):
+        """
+        Mark an entity's task as failed, e.g. from a command-failure reaction; other entities' tasks waiting on it fail too, unless it is skipped.
+        """
+        self.graphs[en].mark_failed(task_id, resend=resend)
+
+    def validate(self) -> List[str]:
+        """
+        Validate every entity's graph, and check that no tasks wait on each other across entities.
+
+        return: The qualified ids of every unfinished task, placeholders left out, in an order they can run in.
+
+        Raises ValueError naming the entity for a problem in one graph, every other-entity
+        task that is waited on but never added, and tasks caught in a cycle across entities.
+        """
+        problems = []
+        for en, graph in self.graphs.items():
+            try:
+                graph.validate()
+            except ValueError as e:
+                problems.append(f"{en.getName()}: {e}")
+        # One graph over the whole fleet: each entity's own dependencies, plus placeholder -> the task it stands for
+        dependencies = {}
+        placeholders = set()
+        for en, graph in self.graphs.items():
+            for task_id in graph.tasks:
+                if graph._IsFinished(task_id):
+                    continue
+                qualified_id = QualifiedID(en, task_id)
+                deps = [QualifiedID(en, dep) for dep in graph.dependencies.get(task_id, ())]
+                if graph.tasks[task_id].task_type == "External":
+                    placeholders.add(qualified_id)
+                    deps = [dep for dep in self.watchers if any(w[0] is graph and w[1] == task_id for w in self.watchers[dep])]
+                dependencies[qualified_id] = deps
+        for qualified_id in self.watchers:
+            en_name, task_id = SplitQualifiedID(qualified_id)
+            source = self.graphs.get(self.entities.get(en_name))
+            if source is None or (task_id not in source.tasks and task_id not in source.history):
+                problems.append(f"'{qualified_id}' is never added, but other entities depend on it")
+        dependents = defaultdict(list)
+        in_degree = {}
+        for qualified_id, deps in dependencies.items():
+            in_degree[qualified_id] = 0
+            for dep in deps:
+                if dep in dependencies:
+                    dependents[dep].append(qualified_id)
+                    in_degree[qualified_id] += 1
+        order = [qualified_id for qualified_id, degree in in_degree.items() if degree == 0]
+        i = 0
+        while i < len(order):
+            for dependent in dependents[order[i]]:
+                in_degree[dependent] -= 1
+                if in_degree[dependent] == 0:
+                    order.append(dependent)
+            i += 1
+        if len(order) < len(dependencies) and not problems:
+            placed = set(order)
+            problems.append(f"tasks in or behind a dependency cycle across entities: {sorted(q for q in dependencies if q not in placed and q not in placeholders)}")
+        if problems:
+            raise ValueError("FleetTaskGraph is not valid: " + "; ".join(problems))
+        return [qualified_id for qualified_id in order if qualified_id not in placeholders]
+
+    def get_status(self) -> Dict[str, Dict]:
+        """
+        Get the status of every entity's tasks, by entity name.
+        """
+        return {en.getName(): graph.get_status() for en, graph in self.graphs.items()}
+
+    def __repr__(self):
+        return f"<FleetTaskGraph | Entities: {len(self.graphs)}, Waiting on other entities: {len(self.watchers)}>"
@@ -0,0 +1,200 @@
+import heapq
+from array import array
+from typing import Dict, List
+
+# How an archived task finished, by its code in TaskHistory.statuses; "skipped" is a failure whose on_failure was "Skip"
+HISTORY_STATUSES = ("completed", "failed", "skipped", "cancelled")
+
+
+class TaskHistory:
+    """
+    Finished tasks archived by TaskGraph.compact(), one column per field instead of a Task each,
+    rather than the Task, its command and the command's payload. A row still costs about 150 bytes
+    for ids like "Waypoint1234": the id string (61), its entry in rows and the row number (50-65),
+    a slot in task_ids (8) and the columns (19). History grows by that for every archived task
+    unless it is trimmed (trim(), or compact()'s keep_history).
+    Row i is task_ids[i], HISTORY_STATUSES[statuses[i]], start_ns[i], end_ns[i] (-1 if never
+    started or ended) and entity_names[entities[i]] ("" for tasks without a command).
+    """
+    def __init__(self):
+        self.task_ids: List[str] = []
+        self.statuses = array("B")
+        self.start_ns = array("q")
+        self.end_ns = array("q")
+        self.entities = array("H")
+        self.entity_names: List[str] = [""]
+        # task_id -> row, and entity name -> its index in entity_names
+        self.rows: Dict[str, int] = {}
+        self._entity_index: Dict[str, int] = {"": 0}
+
+    def append(self, task_id: str, status: str, start_ns: int, end_ns: int, entity_name: str):
+        """
+        Add a row; status is one of HISTORY_STATUSES, and start_ns/end_ns may be None.
+        """
+        if entity_name not in self._entity_index:
+            self._entity_index[entity_name] = len(self.entity_names)
+            self.entity_names.append(entity_name)
+        self.rows[task_id] = len(self.task_ids)
+        self.task_ids.append(task_id)
+        self.statuses.append(HISTORY_STATUSES.index(status))
+        self.start_ns.append(start_ns if start_ns is not None else -1)
+        self.end_ns.append(end_ns if end_ns is not None else -1)
+        self.entities.append(self._entity_index[entity_name])
+
+    def set_status(self, task_id: str, status: str):
+        """
+        Change an archived task's status to one of HISTORY_STATUSES.
+        """
+        self.statuses[self.rows[task_id]] = HISTORY_STATUSES.index(status)
+
+    def trim(self, keep: int) -> int:
+        """
+        Drop the oldest rows, so that at most keep remain. O(rows).
+
+        return: How many rows were dropped.
+        """
+        dropped = len(self.task_ids) - keep
+        if dropped <= 0:
+            return 0
+        self.task_ids = self.task_ids[dropped:]
+        self.statuses = self.statuses[dropped:]
+        self.start_ns = self.start_ns[dropped:]
+        self.end_ns = self.end_ns[dropped:]
+        self.entities = self.entities[dropped:]
+        self.rows = {task_id: i for i, task_id in enumerate(self.task_ids)}
+        return dropped
+
+    def status(self, task_id: str) -> str:
+        """
+        How an archived task finished, one of HISTORY_STATUSES; None if it is not archived.
+        """
+        row = self.rows.get(task_id)
+        return HISTORY_STATUSES[self.statuses[row]] if row is not None else None
+
+    def row(self, task_id: str) -> dict:
+        """
+        An archived task's row as a dict with task_id, status, start_ns, end_ns (None if never set) and entity.
+        """
+        i = self.rows[task_id]
+        return {"task_id": task_id, "status": HISTORY_STATUSES[self.statuses[i]],
+                "start_ns": self.start_ns[i] if self.start_ns[i] >= 0 else None,
+                "end_ns": self.end_ns[i] if self.end_ns[i] >= 0 else None,
+                "entity": self.entity_names[self.entities[i]]}
+
+    def to_record(self) -> dict:
+        """
+        The columns as lists, for TaskGraph.save().
+        """
+        return {"task_ids": self.task_ids, "statuses": self.statuses.tolist(), "start_ns": self.start_ns.tolist(),
+                "end_ns": self.end_ns.tolist(), "entities": self.entities.tolist(), "entity_names": self.entity_names}
+
+    @classmethod
+    def from_record(cls, record: dict) -> "TaskHistory":
+        """
+        Rebuild the history from to_record()'s columns.
+        """
+        history = cls()
+        history.task_ids = list(record["task_ids"])
+        history.statuses = array("B", record["statuses"])
+        history.start_ns = array("q", record["start_ns"])
+        history.end_ns = array("q", record["end_ns"])
+        history.entities = array("H", record["entities"])
+        history.entity_names = list(record["entity_names"])
+        history.rows = {task_id: i for i, task_id in enumerate(history.task_ids)}
+        history._entity_index = {name: i for i, name in enumerate(history.entity_names)}
+        return history
+
+    def __contains__(self, task_id: str) -> bool:
+        return task_id in self.rows
+
+    def __len__(self):
+        return len(self.task_ids)
+
+
+class TaskGraphCompaction:
+    """
+    TaskGraph.compact(): archives finished tasks into the graph's TaskHistory. Mixed into TaskGraph, whose state it works on.
+    """
+    def compact(self, keep: int = 0, keep_history: int = None) -> int:
+        """
+        Archive finished tasks into history, oldest first, so a long mission's graph only holds
+        what is still to run plus its most recently finished tasks. An archived task keeps a row of
+        its id, status, start and end times and entity (TaskHistory); its Task, command, payload and
+        dependency edges are dropped. Its id stays taken, and tasks added later that depend on it
+        count it as it finished. Tasks that an unfinished task still depends on are kept in full.
+
+        A failed or spliced task whose fallback or replacement has been archived too loses its
+        redirect: its row says "skipped" if every final task of the replacement completed, so later
+        dependents run (a join counts it once), and keeps its status otherwise.
+
+        Listeners get no event. O(tasks archived), plus the ready queues when they are mostly stale,
+        plus every table once as many tasks have been archived since the last rebuild as are held:
+        Python's dicts and sets never shrink on their own.
+
+        param keep: How many of the most recently finished tasks to keep in full.
+
+        param keep_history: If set, once history holds twice this many rows it is trimmed to the
+        most recent this many (TaskHistory.trim()). A trimmed task is forgotten: its id can be added
+        again, and tasks added later that depend on it wait for it as for one not added yet.
+
+        return: How many tasks were archived.
+        """
+        archived = 0
+        kept = []
+        while len(self.finished_order) > keep:
+            task_id = self.finished_order.popleft()
+            task = self.tasks.get(task_id)
+            if task is None or not self._IsFinished(task_id):
+                # Cleared or archived already
+                continue
+            if any(dependent in self.tasks and not self._IsFinished(dependent) for dependent in self.reverse_dependencies.get(task_id, ())):
+                kept.append(task_id)
+                continue
+            entity_name = task.command.en.getName() if task.command is not None else ""
+            self.history.append(task_id, self._FinishedStatus(task_id), task.start_ns, task.end_ns, entity_name)
+            del self.tasks[task_id]
+            self.completed_tasks.discard(task_id)
+            self.failed_tasks.discard(task_id)
+            self.cancelled_tasks.discard(task_id)
+            self.dependencies.pop(task_id, None)
+            self.reverse_dependencies.pop(task_id, None)
+            archived += 1
+        self.finished_order.extendleft(reversed(kept))
+        trimmed = keep_history is not None and len(self.history) > 2 * keep_history and self.history.trim(keep_history)
+        if archived or trimmed:
+            for redirected_id in [redirected_id for redirected_id in self.redirects if redirected_id not in self.tasks]:
+                final_ids = self._ResolveDependencies(self.redirects[redirected_id])
+                if any(final_id in self.tasks for final_id in final_ids):
+                    continue
+                del self.redirects[redirected_id]
+                if redirected_id in self.history and all(self.history.status(final_id) == "completed" for final_id in final_ids):
+                    self.history.set_status(redirected_id, "skipped")
+            for missing_id, dependents in list(self.missing_dependencies.items()):
+                dependents.difference_update([dependent for dependent in dependents if dependent not in self.tasks])
+                if not dependents:
+                    del self.missing_dependencies[missing_id]
+            # Finished tasks' entries are only dropped from the ready queues as they reach the front
+            for queue in self.ready_queues.values():
+                if len(queue) > 2 * len(self.ready_tasks) + 8:
+                    queue[:] = [entry for entry in queue if self.ready_sequence.get(entry[3]) == entry[2]]
+                    heapq.heapify(queue)
+            self._archived_since_rebuild += archived
+            if self._archived_since_rebuild > len(self.tasks) + 1024:
+                self._Rebuild()
+            self.version += 1
+        return archived
+
+    def _Rebuild(self):
+        # Deleting keys leaves a dict's or set's table at its largest size; copying the live entries back in after clear() sizes it for them.
+        # Done in place, since the executor and listeners hold on to these
+        for table in (self.tasks, self.dependencies, self.reverse_dependencies, self.redirects, self.join_needs,
+                      self.missing_dependencies, self.ready_sequence):
+            entries = list(table.items())
+            table.clear()
+            table.update(entries)
+        for task_ids in (self.ready_tasks, self.running_tasks, self.blocked_tasks, self.pending_tasks,
+                         self.completed_tasks, self.failed_tasks, self.cancelled_tasks):
+            entries = list(task_ids)
+            task_ids.clear()
+            task_ids.update(entries)
+        self._archived_since_rebuild = 0
@@ -0,0 +1,226 @@
+import json, os
+from typing import Dict, List
+import spaceteams as st
+import API.STU_Common as STU
+from TaskGraphTask import RESEND_PARAM, RetryPolicy, Task
+from TaskGraphHistory import TaskHistory
+
+# Bumped whenever the TaskGraph.save() file layout changes
+SAVE_FORMAT = 2
+
+
+def _TaskToRecord(task: Task) -> dict:
+    # Only fields that differ from a new Task's are written, to keep files small
+    record = {"id": task.task_id}
+    if task.task_type != "Command":
+        record["type"] = task.task_type
+    if task.started:
+        record["started"] = True
+    if task.on_failure != "Propagate":
+        record["on_failure"] = task.on_failure
+    if task.priority:
+        record["priority"] = task.priority
+    if task.deadline_ns is not None:
+        record["deadline_ns"] = task.deadline_ns
+    if task.resources is not None:
+        record["resources"] = sorted(task.resources)
+    if not task.preemptible:
+        record["preemptible"] = False
+    if task.preempted:
+        record["preempted"] = True
+    if task.resends:
+        record["resends"] = task.resends
+    if task.fallback_tasks:
+        record["fallback"] = [[_TaskToRecord(t), list(deps or [])] for t, deps in task.fallback_tasks]
+    if task.timeout_s is not None:
+        record["timeout_s"] = task.timeout_s
+    if task.retry is not None:
+        record["retry"] = vars(task.retry)
+    if task.send_attempts:
+        record["send_attempts"] = task.send_attempts
+    if task.failure_reason is not None:
+        record["failure_reason"] = task.failure_reason
+    if task.timer_duration is not None:
+        record["timer_duration"] = task.timer_duration
+    if task.timer_start is not None:
+        record["timer_start"] = task.timer_start
+    if task.join_count is not None:
+        record["join_count"] = task.join_count
+    if not task.cancel_losers:
+        record["cancel_losers"] = False
+    if task.branches is not None:
+        record["branches"] = task.branches
+    if task.start_ns is not None:
+        record["start_ns"] = task.start_ns
+    if task.end_ns is not None:
+        record["end_ns"] = task.end_ns
+    if task.command is not None:
+        record["cmd"] = STU.CommandToDict(task.command)
+    return record
+
+
+def _TaskFromRecord(record: dict, entities_by_name: Dict) -> Task:
+    command = None
+    if "cmd" in record:
+        en_name = record["cmd"]["en"]
+        if en_name not in entities_by_name:
+            raise ValueError(f"Saved task '{record['id']}' has a command for entity '{en_name}', which was not given to TaskGraph.load().")
+        command = STU.CommandFromDict(record["cmd"], entities_by_name[en_name])
+    task = Task(record["id"], command)
+    task.task_type = record.get("type", "Command")
+    task.started = record.get("started", False)
+    task.on_failure = record.get("on_failure", "Propagate")
+    task.priority = record.get("priority", 0)
+    task.deadline_ns = record.get("deadline_ns")
+    task.resources = set(record["resources"]) if "resources" in record else None
+    task.preemptible = record.get("preemptible", True)
+    task.preempted = record.get("preempted", False)
+    task.resends = record.get("resends", 0)
+    if task.resends:
+        command.payload.AddOrSetParam(st.VarType.int32, RESEND_PARAM, task.resends)
+    if "fallback" in record:
+        task.fallback_tasks = [(_TaskFromRecord(r, entities_by_name), deps) for r, deps in record["fallback"]]
+    task.timeout_s = record.get("timeout_s")
+    if "retry" in record:
+        task.retry = RetryPolicy(**record["retry"])
+    task.send_attempts = record.get("send_attempts", 0)
+    task.failure_reason = record.get("failure_reason")
+    task.timer_duration = record.get("timer_duration")
+    task.timer_start = record.get("timer_start")
+    task.join_count = record.get("join_count")
+    task.cancel_losers = record.get("cancel_losers", True)
+    task.branches = record.get("branches")
+    task.start_ns = record.get("start_ns")
+    task.end_ns = record.get("end_ns")
+    return task
+
+
+class TaskGraphPersistence:
+    """
+    TaskGraph.save(), load() and reconcile(): picking a plan up again after the mission manager restarts.
+    Mixed into TaskGraph, whose state it works on.
+    """
+    def _Status(self, task_id: str) -> str:
+        for status, task_ids in (("ready", self.ready_tasks), ("running", self.running_tasks), ("blocked", self.blocked_tasks),
+                                 ("completed", self.completed_tasks), ("failed", self.failed_tasks), ("cancelled", self.cancelled_tasks)):
+            if task_id in task_ids:
+                return status
+        return "blocked"
+
+    def save(self, path: str):
+        """
+        Save every task, its status and remaining dependencies, and its command's payload to a JSON file,
+        along with the history of archived tasks (compact()), so the plan can be picked up again with load() after the mission manager restarts.
+
+        The file is written next to path first and then moved over it, so a crash while saving
+        leaves the previous save intact.
+
+        param path: The file to write.
+        """
+        records = []
+        for task_id, task in self.tasks.items():
+            record = _TaskToRecord(task)
+            record["status"] = self._Status(task_id)
+            deps = self.dependencies.get(task_id)
+            if deps:
+                record["deps"] = sorted(deps)
+            if task_id in self.join_needs:
+                record["join_needs"] = self.join_needs[task_id]
+            records.append(record)
+        data = {"format": SAVE_FORMAT, "tasks": records, "redirects": self.redirects, "history": self.history.to_record()}
+        temp_path = path + ".tmp"
+        with open(temp_path, "w") as f:
+            # dumps() rather than dump(): it runs the C encoder instead of streaming through the Python one
+            f.write(json.dumps(data, separators=(",", ":")))
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: str, entities: List) -> "TaskGraph":
+        """
+        Load a task graph written by save(). Statuses are restored as saved; call reconcile()
+        with the entity's live active commands before running it, since commands may have
+        finished while nothing was listening. O(tasks + dependencies).
+
+        Functions are not saved: set Task.predicate and Task.choose again on Predicate and Branch tasks.
+
+        param path: The file written by save().
+
+        param entities: The sim entities the saved commands were for, matched by name.
+
+        return: The loaded TaskGraph.
+        """
+        with open(path) as f:
+            data = json.load(f)
+        # Format 1 files are the same, less the history
+        if data.get("format") not in (1, SAVE_FORMAT):
+            raise ValueError(f"'{path}' is TaskGraph save format {data.get('format')}; expected {SAVE_FORMAT}.")
+        entities_by_name = {en.getName(): en for en in entities}
+        graph = cls()
+        status_sets = {"ready": graph.ready_tasks, "running": graph.running_tasks, "blocked": graph.blocked_tasks,
+                       "completed": graph.completed_tasks, "failed": graph.failed_tasks, "cancelled": graph.cancelled_tasks}
+        for record in data["tasks"]:
+            task = _TaskFromRecord(record, entities_by_name)
+            task_id = task.task_id
+            status = record["status"]
+            graph.tasks[task_id] = task
+            status_sets[status].add(task_id)
+            task.completed = status == "completed"
+            task.failed = status == "failed"
+            task.cancelled = status == "cancelled"
+            if status == "ready" or status == "running":
+                graph.pending_tasks.add(task_id)
+            elif status != "blocked":
+                graph.finished_order.append(task_id)
+            if status == "ready":
+                graph.newly_ready.append(task_id)
+                graph._Enqueue(task_id)
+            for dep in record.get("deps", ()):
+                graph.dependencies[task_id].add(dep)
+                graph.reverse_dependencies[dep].add(task_id)
+            if "join_needs" in record:
+                graph.join_needs[task_id] = record["join_needs"]
+        for dep, dependents in graph.reverse_dependencies.items():
+            if dep not in graph.tasks:
+                graph.missing_dependencies[dep] = set(dependents)
+        graph.redirects = data.get("redirects", {})
+        if "history" in data:
+            graph.history = TaskHistory.from_record(data["history"])
+        return graph
+
+    def reconcile(self, active_commands: Dict[str, str]) -> Dict[str, List[str]]:
+        """
+        Bring a loaded graph in line with the commands its entity is actually running, as from
+        EntityTelemetry.GetActiveCommands. Only call this with a reading taken while the entity had comms.
+
+        Running command tasks that the entity is no longer running finished or failed while
+        nothing was listening; that report is lost, so they are made ready to be sent again.
+        Ready tasks the entity is already running were sent after the last save, and are marked started.
+        Timer tasks keep running from their saved start time.
+
+        param active_commands: Dict of command type -> TaskID of the entity's active commands.
+
+        return: Dict with the task_ids that are 'Running' as saved, 'Resend' and 'Adopted', and the
+        command types in active_commands that match no task in the graph ('Unknown').
+        """
+        report = {'Running': [], 'Resend': [], 'Adopted': [], 'Unknown': []}
+        for task_id in list(self.running_tasks):
+            task = self.tasks[task_id]
+            if task.task_type != "Command" or task.command is None:
+                continue
+            if active_commands.get(task.command.command_type) == task_id:
+                report['Running'].append(task_id)
+            else:
+                task.started = False
+                self.running_tasks.discard(task_id)
+                self._MakeReady(task_id)
+                report['Resend'].append(task_id)
+        for command_type, task_id in active_commands.items():
+            task = self.tasks.get(task_id)
+            if task_id in self.ready_tasks and task.task_type == "Command" and task.command is not None \
+                    and task.command.command_type == command_type:
+                self.mark_started(task_id)
+                report['Adopted'].append(task_id)
+            elif task_id not in self.running_tasks:
+                report['Unknown'].append(command_type)
+        self.version += 1
+        return report
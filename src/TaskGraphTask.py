@@ -0,0 +1,195 @@
+from typing import Callable, Dict, List, Set
+import spaceteams as st
+import API.STU_Common as STU
+
+# Running commands of these types get a Stop command when their task is cancelled
+MOVE_COMMAND_TYPES = {"MoveToCoord", "RotateToAzimuth"}
+
+# Rover resources each command type uses; an entity runs at most one command per resource at a time.
+# Handling the antenna needs the rover standing still, so it holds mobility too.
+# Other command types use a resource named after the type, as an entity runs one command of each type at a time.
+COMMAND_RESOURCES = {
+    "MoveToCoord": {"mobility"},
+    "RotateToAzimuth": {"mobility"},
+    "CameraPan": {"camera"},
+    "CaptureImage": {"camera"},
+    "PickUpAntenna": {"manipulator", "mobility"},
+    "PlaceDownAntenna": {"manipulator", "mobility"},
+}
+
+
+# Command payload param holding Task.resends, echoed back under "Orig_Cmd" in complete and fail reports
+RESEND_PARAM = "Resend"
+
+
+class RetryPolicy:
+    def __init__(self, mode: str = "Exponential", max_attempts: int = None, initial_delay_s: float = 0.1,
+                 max_delay_s: float = 5.0, multiplier: float = 2.0):
+        """
+        How a TaskGraphExecutor retries sending a command while its entity is out of comms.
+
+        param mode: "Exponential" - wait initial_delay_s after the first failed send, multiplying the wait
+        by multiplier after each further one, up to max_delay_s.
+        "Comms" - wait for TaskGraphExecutor.comms_restored() (or update_comms()); max_delay_s is only a
+        fallback, in case nothing reports comms coming back.
+        Either way, the executor does no work for the entity while it waits, and reported comms end the wait early.
+
+        param max_attempts: Sends to try before the task fails with failure_reason "NoComms"; None to keep trying.
+        """
+        self.mode = mode
+        self.max_attempts = max_attempts
+        self.initial_delay_s = initial_delay_s
+        self.max_delay_s = max_delay_s
+        self.multiplier = multiplier
+
+    def delay_s(self, attempts: int) -> float:
+        """
+        Seconds to wait after the given number of failed sends.
+        """
+        if self.mode == "Comms":
+            return self.max_delay_s
+        return min(self.initial_delay_s * self.multiplier ** (attempts - 1), self.max_delay_s)
+
+    def __repr__(self):
+        return f"<RetryPolicy {self.mode} | Max attempts: {self.max_attempts}, Delay: {self.initial_delay_s}-{self.max_delay_s} s>"
+
+
+class Task:
+    def __init__(self, task_id: str, command : STU.Command = None):
+        """
+        Initialize a task.
+
+        param task_id: A unique identifier for the task.
+
+        param command: A STU command that will be sent on starting this task. The command completing/failing will end this task.
+        """
+        # Metadata
+        self.task_id = task_id
+        self.completed = False
+        self.failed = False
+        self.cancelled = False
+        # What happens to dependents if this task fails:
+        #   "Propagate" - they fail too, without running
+        #   "Skip"      - they run as if this task had completed
+        #   "Fallback"  - fallback_tasks is added to the graph, and they wait on it instead
+        self.on_failure = "Propagate"
+        self.fallback_tasks: List[tuple] = None
+        # Scheduling: higher priority goes first; at equal priority, the earliest deadline (sim time in ns) does
+        self.priority = 0
+        self.deadline_ns = None
+        # Rover resources the command uses, e.g. {"mobility"}; None for its type's COMMAND_RESOURCES
+        self.resources: Set[str] = None
+        # Whether a running move may be stopped for a higher-priority task that needs its resources; see TaskGraph.preempt()
+        self.preemptible = True
+        # Set while the stopped command of a preempted task has yet to report back
+        self.preempted = False
+        # Times the command has been sent again after preempt(); stamped into its payload as RESEND_PARAM
+        self.resends = 0
+        # Contents
+        self.started = False
+        self.task_type = "Command"
+        # Sim times in ns, set by TaskGraph when the task starts and when it completes, fails or is cancelled
+        self.start_ns = None
+        self.end_ns = None
+        # Command-specific stuff
+        self.command = command
+        # If set, the command fails if it has not reported back this many seconds after being sent
+        self.timeout_s = None
+        # How sends are retried while the entity is out of comms; None for the TaskGraphExecutor's default
+        self.retry: RetryPolicy = None
+        # Sends that failed because the entity was out of comms
+        self.send_attempts = 0
+        # Why the task failed, when it was not the command reporting failure: "Timeout" or "NoComms"
+        self.failure_reason = None
+        # Timer-specific stuff
+        self.timer_duration = None
+        self.timer_start = None # sim time in ns, set by TaskGraphExecutor when the timer starts
+        # Join: how many dependencies must complete for the task to run; None for all of them.
+        # When enough have, the rest (the losers) are cancelled, unless cancel_losers is False.
+        self.join_count = None
+        self.cancel_losers = True
+        # Predicate-specific stuff: completes once predicate(fleet) is true for the latest EntityTelemetry.FleetState
+        self.predicate: Callable = None
+        # Branch-specific stuff: choose(fleet) returns the option to run, or None to keep waiting;
+        # branches is option -> the task_ids of its subgraph. See TaskGraph.add_branch()
+        self.choose: Callable = None
+        self.branches: Dict[str, List[str]] = None
+
+    def __repr__(self):
+        status = 'Completed' if self.completed else ('Failed' if self.failed else ('Cancelled' if self.cancelled else 'Pending'))
+        return f"<Task {self.task_id} - {status}>"
+
+    def set_fallback(self, tasks_and_dependencies: List[tuple]):
+        """
+        Run a subgraph if this task fails; dependents of this task then wait on the subgraph's final tasks.
+
+        param tasks_and_dependencies: List of (Task, depends_on) pairs, as for TaskGraph.add_tasks.
+        """
+        self.on_failure = "Fallback"
+        self.fallback_tasks = tasks_and_dependencies
+
+
+def TaskResources(task: Task) -> frozenset:
+    """
+    The rover resources a Command task uses: its own resources if set, else its command type's COMMAND_RESOURCES.
+    A task without a command uses none.
+    """
+    if task.resources is not None:
+        return frozenset(task.resources)
+    if task.command is None:
+        return frozenset()
+    command_type = task.command.command_type
+    return frozenset(COMMAND_RESOURCES.get(command_type, (command_type,)))
+
+
+def ReportedResend(payload) -> int:
+    """
+    The Task.resends of the command a complete or fail report is for, to pass to TaskGraph.mark_completed() or mark_failed().
+    """
+    if payload.HasParam(st.VarType.int32, ["Orig_Cmd", RESEND_PARAM]):
+        return payload.GetParam(st.VarType.int32, ["Orig_Cmd", RESEND_PARAM])
+    return 0
+
+
+def CreatePredicateTask(task_id: str, predicate: Callable, timeout_s: float = None) -> Task:
+    """
+    Create a task that completes once predicate(fleet) is true, checked by a TaskGraphExecutor
+    against the EntityTelemetry.FleetState given to update_telemetry() each tick.
+
+    param timeout_s: Seconds after which the task fails if the predicate is still false; None to wait forever.
+    """
+    task = Task(task_id)
+    task.task_type = "Predicate"
+    task.predicate = predicate
+    task.timeout_s = timeout_s
+    return task
+
+
+def CreateMoveChain(en, waypoints: List[STU.XY], prefix: str, depends_on: List[str] = None) -> List[tuple]:
+    """
+    Create a chain of MoveToCoord tasks that visit waypoints in order, e.g. from PathPlanner.PlanWaypoints.
+
+    param en: The entity that will drive the chain.
+
+    param waypoints: XY waypoints, in driving order.
+
+    param prefix: Task ids are "<prefix>_0", "<prefix>_1", ...
+
+    param depends_on: List of task_ids that the first move depends on.
+
+    return: A list of (Task, depends_on) pairs for TaskGraph.add_tasks; each move depends on the one before it.
+    """
+    chain = []
+    previous = list(depends_on) if depends_on else []
+    for i, xy in enumerate(waypoints):
+        task_id = f"{prefix}_{i}"
+        chain.append((Task(task_id, STU.Command_MoveToCoord(en, xy, task_id)), previous))
+        previous = [task_id]
+    return chain
+
+
+def _FinalIDs(tasks_and_dependencies: List[tuple]) -> List[str]:
+    # The task_ids of a subgraph that nothing else in it depends on
+    depended_on = {dep for _, deps in tasks_and_dependencies for dep in deps or []}
+    return [t.task_id for t, _ in tasks_and_dependencies if t.task_id not in depended_on]
+
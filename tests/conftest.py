@@ -0,0 +1,76 @@
+# Shared setup for the TaskGraph tests. Run from the repository root:
+#   python -m pytest -q tests
+# TaskGraph and API.STU_Common import the Space Teams SDK (spaceteams), so each test module
+# skips itself when it is not installed. No sim is needed: commands are built on plain rovers
+# and the executor's clock is set by the test.
+import os, sys
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path[:0] = [ROOT, os.path.join(ROOT, "src")]
+
+
+class Rover:
+    '''
+    Stands in for an st.Entity; commands only need its name, and graphs key on it.
+    '''
+    def __init__(self, name: str):
+        self.name = name
+
+    def getName(self) -> str:
+        return self.name
+
+    def __repr__(self):
+        return f"<Rover {self.name}>"
+
+
+class Mission:
+    '''
+    Records what a TaskGraphExecutor sends, in place of the MissionManager.
+    Entities in out_of_comms refuse every command.
+    '''
+    def __init__(self):
+        self.sent = []
+        self.out_of_comms = set()
+
+    def SendCommand(self, en, command_type: str, command) -> bool:
+        if en in self.out_of_comms:
+            return False
+        self.sent.append((en.getName(), command_type, command))
+        return True
+
+    def SentTypes(self) -> list:
+        return [command_type for _, command_type, _ in self.sent]
+
+
+class Clock:
+    '''
+    Sim time in ns for graphs and executors; advance() moves it on.
+    '''
+    def __init__(self, now_ns: int = 1_000_000_000):
+        self.now_ns = now_ns
+
+    def __call__(self) -> int:
+        return self.now_ns
+
+    def advance(self, seconds: float):
+        self.now_ns += int(round(seconds * 1e9))
+
+
+@pytest.fixture
+def rover():
+    return Rover("LTV1")
+
+
+@pytest.fixture
+def mission():
+    return Mission()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # The executor reads sim time through STU.SimTimeNs, and graphs default to it too
+    import API.STU_Common as STU
+    clock = Clock()
+    monkeypatch.setattr(STU, "SimTimeNs", clock)
+    return clock
@@ -0,0 +1,119 @@
+# Plan analysis: finish times, the critical path and slack from a DurationModel's estimates,
+# kept up to date as tasks start and complete, and learning from the ones that do.
+import pytest
+
+pytest.importorskip("spaceteams")
+import numpy as np
+import API.STU_Common as STU
+import TaskGraph as TG
+import TaskGraphAnalysis as TGA
+from conftest import Rover
+
+
+def Timer(task_id: str, duration_s: float) -> TG.Task:
+    task = TG.Task(task_id)
+    task.task_type = "Timer"
+    task.timer_duration = duration_s
+    return task
+
+
+def Command(rover, task_id: str, command_type: str) -> TG.Task:
+    return TG.Task(task_id, STU.Command(command_type, rover))
+
+
+def Move(rover, task_id: str, x: float) -> TG.Task:
+    command = STU.CommandFromDict({"type": "MoveToCoord", "en": rover.getName(), "TaskID": task_id, "Loc": [x, 0.0, 0.0]}, rover)
+    return TG.Task(task_id, command)
+
+
+def test_finish_time_critical_path_and_slack(rover, clock):
+    graph = TG.TaskGraph()
+    graph.add_task(Timer("Wait", 5.0), [])
+    graph.add_task(Command(rover, "Pan", "CameraPan"), ["Wait"])
+    graph.add_task(Command(rover, "Capture", "CaptureImage"), [])
+    graph.add_task(Timer("Settle", 1.0), ["Pan", "Capture"])
+    analysis = TGA.PlanAnalysis(graph)
+    # Now is 1 s; the pan takes 3 s and the capture 2 s
+    assert analysis.finish_time() == pytest.approx(10.0)
+    assert analysis.critical_path() == ["Wait", "Pan", "Settle"]
+    slack = analysis.slack()
+    assert slack["Wait"] == pytest.approx(0.0) and slack["Pan"] == pytest.approx(0.0)
+    assert slack["Settle"] == pytest.approx(0.0)
+    assert slack["Capture"] == pytest.approx(6.0)
+
+
+def test_moves_take_their_distance_over_the_speed(rover, clock):
+    graph = TG.TaskGraph()
+    graph.add_task(Move(rover, "Drive1", 10.0), [])
+    graph.add_task(Move(rover, "Drive2", 30.0), ["Drive1"])
+    analysis = TGA.PlanAnalysis(graph, TGA.DurationModel(default_speed_mps=2.0), start_loc=np.zeros(3))
+    # 10 m then 20 m at 2 m/s
+    assert analysis.duration == {} and analysis.finish_time() == pytest.approx(16.0)
+    assert analysis.duration == pytest.approx({"Drive1": 5.0, "Drive2": 10.0})
+
+
+def test_completed_moves_teach_the_speed_and_update_the_plan(rover, clock):
+    graph = TG.TaskGraph()
+    graph.add_task(Move(rover, "Drive1", 10.0), [])
+    graph.add_task(Move(rover, "Drive2", 30.0), ["Drive1"])
+    model = TGA.DurationModel()
+    analysis = TGA.PlanAnalysis(graph, model, start_loc=np.zeros(3))
+    assert analysis.finish_time() == pytest.approx(31.0)
+    graph.mark_started("Drive1")
+    clock.advance(5.0)
+    graph.mark_completed("Drive1")
+    # The first observation is taken as is: 10 m in 5 s
+    assert model.speeds == {"LTV1": pytest.approx(2.0)}
+    assert list(analysis.location) == [10.0, 0.0, 0.0]
+    assert analysis.finish_time() == pytest.approx(16.0)
+    assert analysis.critical_path() == ["Drive2"]
+
+
+def test_command_durations_are_a_moving_average(rover, clock):
+    model = TGA.DurationModel(smoothing=0.5)
+    capture = Command(rover, "Capture", "CaptureImage")
+    assert model.estimate(capture, None) == TGA.DEFAULT_DURATIONS_S["CaptureImage"]
+    model.observe(capture, None, 4.0)
+    assert model.estimate(capture, None) == pytest.approx(3.0)
+    # Unknown command types use the default until one is seen
+    grab = Command(rover, "Grab", "Unheard")
+    assert model.estimate(grab, None) == model.default_duration
+    model.observe(grab, None, 8.0)
+    assert model.estimate(grab, None) == pytest.approx(8.0)
+
+
+def test_running_task_that_overran_finishes_no_earlier_than_now(rover, clock):
+    graph = TG.TaskGraph()
+    graph.add_task(Command(rover, "Pan", "CameraPan"), [])
+    graph.add_task(Command(rover, "Capture", "CaptureImage"), ["Pan"])
+    analysis = TGA.PlanAnalysis(graph)
+    graph.mark_started("Pan")
+    assert analysis.finish_time() == pytest.approx(6.0)
+    clock.advance(10.0)
+    analysis.refresh()
+    assert analysis.earliest_finish["Pan"] == pytest.approx(11.0)
+    assert analysis.finish_time() == pytest.approx(13.0)
+
+
+def test_changes_to_the_plan_are_picked_up(rover, clock):
+    graph = TG.TaskGraph()
+    graph.add_task(Timer("Wait", 5.0), [])
+    analysis = TGA.PlanAnalysis(graph)
+    assert analysis.finish_time() == pytest.approx(6.0)
+    graph.add_task(Timer("Longer", 8.0), ["Wait"])
+    assert analysis.finish_time() == pytest.approx(14.0)
+    graph.cancel("Longer")
+    assert analysis.finish_time() == pytest.approx(6.0)
+    graph.mark_completed("Wait")
+    assert analysis.finish_time() == pytest.approx(1.0)
+    assert analysis.critical_path() == []
+
+
+def test_rank_by_finish_time_puts_the_bottleneck_first(clock):
+    analyses = {}
+    for name, duration_s in (("LTV1", 5.0), ("LTV2", 20.0), ("LTV3", 10.0)):
+        graph = TG.TaskGraph()
+        graph.add_task(Timer("Wait", duration_s), [])
+        analyses[Rover(name)] = TGA.PlanAnalysis(graph)
+    ranked = TGA.RankByFinishTime(analyses)
+    assert [(en.getName(), finish) for en, finish in ranked] == [("LTV2", 21.0), ("LTV3", 11.0), ("LTV1", 6.0)]
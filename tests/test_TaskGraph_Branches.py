@@ -0,0 +1,142 @@
+# Joins, Predicate tasks and Branch tasks: a join runs once enough of its dependencies have
+# completed, a predicate once the telemetry makes it true, and a branch runs only the option it chooses.
+import pytest
+
+pytest.importorskip("spaceteams")
+import TaskGraph as TG
+
+
+def Join(task_id: str, count: int, cancel_losers: bool = True) -> TG.Task:
+    task = TG.Task(task_id)
+    task.join_count = count
+    task.cancel_losers = cancel_losers
+    return task
+
+
+def Racing(join: TG.Task) -> TG.TaskGraph:
+    # Three tasks racing to release the join
+    graph = TG.TaskGraph()
+    for task_id in ("a", "b", "c"):
+        graph.add_task(TG.Task(task_id), [])
+    graph.add_task(join, ["a", "b", "c"])
+    return graph
+
+
+def test_join_cancels_the_losers(clock):
+    graph = Racing(Join("First", 1))
+    graph.add_task(TG.Task("AfterB"), ["b"])
+    graph.mark_started("b")
+    graph.mark_completed("a")
+    assert "First" in graph.ready_tasks
+    assert graph.cancelled_tasks == {"b", "c", "AfterB"}
+    # A loser's late report is ignored
+    graph.mark_completed("b")
+    assert "b" not in graph.completed_tasks
+
+
+def test_join_waits_for_its_count(clock):
+    graph = Racing(Join("Two", 2))
+    graph.mark_completed("c")
+    assert "Two" in graph.blocked_tasks
+    graph.mark_completed("a")
+    assert "Two" in graph.ready_tasks and graph.cancelled_tasks == {"b"}
+
+
+def test_join_can_let_the_losers_finish(clock):
+    graph = Racing(Join("First", 1, cancel_losers=False))
+    graph.mark_completed("b")
+    assert "First" in graph.ready_tasks
+    assert graph.ready_tasks == {"a", "c", "First"} and not graph.cancelled_tasks
+    # The join no longer waits on them, so their failure does not reach it
+    graph.mark_failed("a")
+    assert "First" in graph.ready_tasks
+
+
+def test_join_fails_once_too_few_dependencies_are_left(clock):
+    graph = Racing(Join("Two", 2))
+    graph.add_task(TG.Task("After"), ["Two"])
+    graph.mark_failed("a")
+    assert "Two" in graph.blocked_tasks
+    graph.mark_failed("b")
+    assert graph.failed_tasks == {"a", "b", "Two", "After"}
+    assert graph.ready_tasks == {"c"}
+
+
+def test_predicate_completes_when_the_telemetry_makes_it_true(rover, mission, clock):
+    graph = TG.TaskGraph()
+    graph.add_task(TG.CreatePredicateTask("AtSite", lambda fleet: fleet["at_site"]), [])
+    graph.add_task(TG.Task("Survey"), ["AtSite"])
+    executor = TG.TaskGraphExecutor(mission, {rover: graph})
+    executor.tick()
+    # Nothing is checked before there is telemetry
+    assert graph.running_tasks == {"AtSite"} and executor.needs_telemetry()
+    executor.update_telemetry({"at_site": False})
+    assert executor.tick().conditions_met == 0
+    executor.update_telemetry({"at_site": True})
+    assert executor.tick().conditions_met == 1
+    assert "AtSite" in graph.completed_tasks and "Survey" in graph.completed_tasks
+    assert not executor.needs_telemetry()
+
+
+def test_predicate_times_out(rover, mission, clock):
+    graph = TG.TaskGraph()
+    graph.add_task(TG.CreatePredicateTask("AtSite", lambda fleet: False, timeout_s=5.0), [])
+    executor = TG.TaskGraphExecutor(mission, {rover: graph})
+    executor.update_telemetry({})
+    executor.tick()
+    clock.advance(5.0)
+    assert executor.tick().timed_out == 1
+    assert "AtSite" in graph.failed_tasks and graph.get_task("AtSite").failure_reason == "Timeout"
+
+
+def Branching(graph: TG.TaskGraph, choose=None) -> TG.Task:
+    # Dig here if the ground is soft, otherwise drive on and dig there
+    branch = TG.Task("Soil")
+    branch.choose = choose
+    graph.add_branch(branch, {
+        "Soft": [(TG.Task("DigHere"), [])],
+        "Hard": [(TG.Task("DriveOn"), []), (TG.Task("DigThere"), ["DriveOn"])],
+    })
+    graph.add_task(TG.Task("Report"), ["DigThere"])
+    return branch
+
+
+def test_option_tasks_wait_on_the_branch(clock):
+    graph = TG.TaskGraph()
+    branch = Branching(graph)
+    assert branch.task_type == "Branch"
+    assert branch.branches == {"Soft": ["DigHere"], "Hard": ["DriveOn", "DigThere"]}
+    assert graph.dependencies["DigHere"] == {"Soil"} and graph.dependencies["DigThere"] == {"DriveOn"}
+
+
+def test_choosing_an_option_cancels_the_others(clock):
+    graph = TG.TaskGraph()
+    Branching(graph)
+    graph.mark_started("Soil")
+    cancelled = graph.choose_branch("Soil", "Soft")
+    assert sorted(cancelled) == ["DigThere", "DriveOn", "Report"]
+    assert "Soil" in graph.completed_tasks and graph.ready_tasks == {"DigHere"}
+    # Already chosen
+    assert graph.choose_branch("Soil", "Hard") == []
+    assert "DriveOn" in graph.cancelled_tasks
+
+
+def test_unknown_option_is_refused(clock):
+    graph = TG.TaskGraph()
+    Branching(graph)
+    with pytest.raises(ValueError, match="no option 'Sandy'; options are \\['Hard', 'Soft'\\]"):
+        graph.choose_branch("Soil", "Sandy")
+    assert "Soil" in graph.ready_tasks and not graph.cancelled_tasks
+
+
+def test_executor_chooses_from_the_telemetry(rover, mission, clock):
+    graph = TG.TaskGraph()
+    Branching(graph, choose=lambda fleet: fleet.get("soil"))
+    executor = TG.TaskGraphExecutor(mission, {rover: graph})
+    executor.update_telemetry({})
+    executor.tick()
+    assert graph.running_tasks == {"Soil"}
+    executor.update_telemetry({"soil": "Hard"})
+    executor.tick()
+    assert graph.cancelled_tasks == {"DigHere"}
+    assert graph.completed_tasks == {"Soil", "DriveOn", "DigThere", "Report"}
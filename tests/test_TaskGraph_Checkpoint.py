@@ -0,0 +1,131 @@
+# Checkpoint and resume: save() and load() round-trip a plan, and reconcile() squares it with
+# what the entity is actually running after the mission manager restarts.
+import json
+import pytest
+
+pytest.importorskip("spaceteams")
+import spaceteams as st
+import API.STU_Common as STU
+import TaskGraph as TG
+
+
+def Move(rover, task_id: str, x: float) -> TG.Task:
+    command = STU.CommandFromDict({"type": "MoveToCoord", "en": rover.getName(), "TaskID": task_id, "Loc": [x, 0.0, 1737400.0]}, rover)
+    return TG.Task(task_id, command)
+
+
+def Capture(rover, task_id: str) -> TG.Task:
+    command = STU.CommandFromDict({"type": "CaptureImage", "en": rover.getName(), "TaskID": task_id, "Exposure": 0.5}, rover)
+    return TG.Task(task_id, command)
+
+
+def Reload(graph: TG.TaskGraph, path, rover) -> TG.TaskGraph:
+    graph.save(str(path))
+    return TG.TaskGraph.load(str(path), [rover])
+
+
+def test_save_and_load_round_trip_the_plan(rover, clock, tmp_path):
+    graph = TG.TaskGraph()
+    graph.add_task(Move(rover, "Drive1", 10.0), [])
+    graph.add_task(Move(rover, "Drive2", 20.0), ["Drive1"])
+    graph.add_task(Capture(rover, "Capture"), ["Drive2"])
+    pan = Capture(rover, "Optional")
+    pan.on_failure = "Skip"
+    pan.priority = 3
+    pan.deadline_ns = 9_000_000_000
+    graph.add_task(pan, [])
+    graph.mark_started("Drive1")
+    graph.mark_completed("Drive1")
+    graph.mark_started("Drive2")
+    loaded = Reload(graph, tmp_path / "plan.json", rover)
+    assert {k: sorted(v) for k, v in loaded.get_status().items()} == {k: sorted(v) for k, v in graph.get_status().items()}
+    assert loaded.dependencies["Capture"] == {"Drive2"}
+    optional = loaded.get_task("Optional")
+    assert (optional.on_failure, optional.priority, optional.deadline_ns) == ("Skip", 3, 9_000_000_000)
+    drive2 = loaded.get_task("Drive2")
+    assert drive2.started and drive2.start_ns == clock.now_ns
+    assert drive2.command.en is rover
+    assert list(drive2.command.payload.GetParam(st.VarType.doubleV3, "Loc")) == [20.0, 0.0, 1737400.0]
+    # The loaded graph runs on from where it was
+    loaded.mark_completed("Drive2")
+    assert "Capture" in loaded.ready_tasks
+    assert not (tmp_path / "plan.json.tmp").exists()
+
+
+def test_reconcile_resends_lost_commands_and_adopts_sent_ones(rover, mission, clock, tmp_path):
+    graph = TG.TaskGraph()
+    graph.add_task(Move(rover, "Drive", 10.0), [])
+    graph.add_task(Capture(rover, "Capture"), [])
+    graph.mark_started("Drive")
+    loaded = Reload(graph, tmp_path / "plan.json", rover)
+    # Drive finished while nothing was listening, and Capture was sent after the save
+    report = loaded.reconcile({"CaptureImage": "Capture", "CameraPan": "Pan"})
+    assert report == {"Running": [], "Resend": ["Drive"], "Adopted": ["Capture"], "Unknown": ["CameraPan"]}
+    assert loaded.ready_tasks == {"Drive"} and loaded.running_tasks == {"Capture"}
+    TG.TaskGraphExecutor(mission, {rover: loaded}).tick()
+    assert mission.SentTypes() == ["MoveToCoord"]
+
+
+def test_reconcile_keeps_commands_still_running(rover, clock, tmp_path):
+    graph = TG.TaskGraph()
+    graph.add_task(Move(rover, "Drive", 10.0), [])
+    graph.mark_started("Drive")
+    loaded = Reload(graph, tmp_path / "plan.json", rover)
+    assert loaded.reconcile({"MoveToCoord": "Drive"})["Running"] == ["Drive"]
+    assert loaded.running_tasks == {"Drive"}
+
+
+def test_resends_survive_a_restart(rover, clock, tmp_path):
+    graph = TG.TaskGraph()
+    graph.add_task(Move(rover, "Drive", 10.0), [])
+    graph.mark_started("Drive")
+    graph.preempt("Drive", priority=5)
+    graph.mark_started("Drive")
+    loaded = Reload(graph, tmp_path / "plan.json", rover)
+    drive = loaded.get_task("Drive")
+    assert drive.resends == 1 and drive.preempted
+    assert drive.command.payload.GetParam(st.VarType.int32, TG.RESEND_PARAM) == 1
+    assert loaded.reconcile({"MoveToCoord": "Drive"})["Running"] == ["Drive"]
+    # The stopped command's report is told apart from the one sent again
+    loaded.mark_completed("Drive", resend=0)
+    assert loaded.running_tasks == {"Drive"}
+    loaded.mark_completed("Drive", resend=1)
+    assert "Drive" in loaded.completed_tasks
+
+
+def test_history_and_redirects_survive_a_restart(rover, clock, tmp_path):
+    graph = TG.TaskGraph()
+    graph.add_task(Move(rover, "Drive", 10.0), [])
+    graph.mark_started("Drive")
+    graph.mark_completed("Drive")
+    detour = Move(rover, "Detour", 15.0)
+    blocked = Move(rover, "Blocked", 20.0)
+    blocked.set_fallback([(detour, [])])
+    graph.add_task(blocked, ["Drive"])
+    graph.mark_failed("Blocked")
+    graph.compact()
+    assert "Drive" in graph.history and "Blocked" in graph.history
+    loaded = Reload(graph, tmp_path / "plan.json", rover)
+    assert loaded.history.row("Drive") == graph.history.row("Drive")
+    assert loaded.history.row("Drive")["entity"] == "LTV1"
+    assert loaded.redirects == {"Blocked": ["Detour"]}
+    with pytest.raises(ValueError):
+        loaded.add_task(TG.Task("Drive"), [])
+    loaded.add_task(TG.Task("Survey"), ["Blocked"])
+    assert loaded.dependencies["Survey"] == {"Detour"}
+    loaded.mark_completed("Detour")
+    assert "Survey" in loaded.ready_tasks
+
+
+def test_load_refuses_other_formats_and_missing_entities(rover, clock, tmp_path):
+    path = tmp_path / "plan.json"
+    graph = TG.TaskGraph()
+    graph.add_task(Move(rover, "Drive", 10.0), [])
+    graph.save(str(path))
+    with pytest.raises(ValueError, match="was not given to TaskGraph.load"):
+        TG.TaskGraph.load(str(path), [])
+    data = json.loads(path.read_text())
+    data["format"] = TG.SAVE_FORMAT + 1
+    path.write_text(json.dumps(data))
+    with pytest.raises(ValueError, match="save format"):
+        TG.TaskGraph.load(str(path), [rover])
@@ -0,0 +1,165 @@
+# Compaction: finished tasks are archived into a TaskHistory row each, and a long mission's graph
+# holds about the same whatever its length.
+import sys
+import pytest
+
+pytest.importorskip("spaceteams")
+import API.STU_Common as STU
+import TaskGraph as TG
+
+
+def Chain(graph: TG.TaskGraph, n: int, prefix: str = "Step") -> list:
+    task_ids = [f"{prefix}{i}" for i in range(n)]
+    for i, task_id in enumerate(task_ids):
+        graph.add_task(TG.Task(task_id), task_ids[i - 1:i])
+    return task_ids
+
+
+def test_compact_archives_finished_tasks_into_history(clock):
+    graph = TG.TaskGraph()
+    graph.add_task(TG.Task("a"), [])
+    graph.add_task(TG.Task("b"), [])
+    graph.mark_started("a")
+    clock.advance(2)
+    graph.mark_completed("a")
+    graph.mark_failed("b")
+    assert graph.compact() == 2
+    assert not graph.tasks and not graph.completed_tasks and not graph.failed_tasks
+    assert graph.history.row("a") == {"task_id": "a", "status": "completed", "start_ns": 1_000_000_000,
+                                      "end_ns": 3_000_000_000, "entity": ""}
+    assert graph.history.status("b") == "failed"
+
+
+def test_compact_keeps_the_most_recently_finished(clock):
+    graph = TG.TaskGraph()
+    for task_id in ("a", "b", "c"):
+        graph.add_task(TG.Task(task_id), [])
+        graph.mark_completed(task_id)
+    assert graph.compact(keep=1) == 2
+    assert list(graph.tasks) == ["c"]
+    assert "a" in graph.history and "b" in graph.history
+
+
+def test_compact_keeps_unfinished_tasks_and_what_they_wait_on(clock):
+    graph = TG.TaskGraph()
+    for task_id in ("a", "b", "c"):
+        graph.add_task(TG.Task(task_id), [])
+    join = TG.Task("join")
+    join.join_count = 2
+    graph.add_task(join, ["a", "b", "c"])
+    graph.add_task(TG.Task("after"), ["join"])
+    graph.mark_completed("a")
+    assert graph.compact() == 1
+    assert set(graph.tasks) == {"b", "c", "join", "after"}
+    # The join still counts a, archived, as one of its two
+    graph.mark_completed("b")
+    assert "join" in graph.ready_tasks
+    assert "c" in graph.cancelled_tasks
+
+
+def test_archived_ids_stay_taken_and_count_as_they_finished(clock):
+    graph = TG.TaskGraph()
+    graph.add_task(TG.Task("done"), [])
+    graph.add_task(TG.Task("broken"), [])
+    graph.mark_completed("done")
+    graph.mark_failed("broken")
+    graph.compact()
+    with pytest.raises(ValueError):
+        graph.add_task(TG.Task("done"), [])
+    graph.add_task(TG.Task("after_done"), ["done"])
+    graph.add_task(TG.Task("after_broken"), ["broken"])
+    assert "after_done" in graph.ready_tasks
+    assert "after_broken" in graph.failed_tasks
+
+
+def test_archived_fallback_folds_its_redirect_into_history(clock):
+    graph = TG.TaskGraph()
+    drive = TG.Task("Drive")
+    drive.on_failure = "Fallback"
+    drive.fallback_tasks = [(TG.Task("Detour1"), []), (TG.Task("Detour2"), ["Detour1"])]
+    graph.add_task(drive, [])
+    graph.mark_failed("Drive")
+    assert graph.redirects == {"Drive": ["Detour2"]}
+    graph.mark_completed("Detour1")
+    graph.mark_completed("Detour2")
+    graph.compact()
+    assert graph.redirects == {}
+    # The detour made it, so tasks that name Drive run
+    assert graph.history.status("Drive") == "skipped"
+    graph.add_task(TG.Task("Survey"), ["Drive"])
+    assert "Survey" in graph.ready_tasks
+
+
+def test_failed_fallback_keeps_its_status_when_folded(clock):
+    graph = TG.TaskGraph()
+    drive = TG.Task("Drive")
+    drive.on_failure = "Fallback"
+    drive.fallback_tasks = [(TG.Task("Detour"), [])]
+    graph.add_task(drive, [])
+    graph.mark_failed("Drive")
+    graph.mark_failed("Detour")
+    graph.compact()
+    assert graph.redirects == {}
+    assert graph.history.status("Drive") == "failed"
+    graph.add_task(TG.Task("Survey"), ["Drive"])
+    assert "Survey" in graph.failed_tasks
+
+
+def test_redirect_is_kept_while_the_fallback_runs(clock):
+    graph = TG.TaskGraph()
+    drive = TG.Task("Drive")
+    drive.on_failure = "Fallback"
+    drive.fallback_tasks = [(TG.Task("Detour"), [])]
+    graph.add_task(drive, [])
+    graph.mark_failed("Drive")
+    graph.compact()
+    assert "Drive" in graph.history
+    assert graph.redirects == {"Drive": ["Detour"]}
+    graph.add_task(TG.Task("Survey"), ["Drive"])
+    assert graph.dependencies["Survey"] == {"Detour"}
+
+
+def test_keep_history_trims_the_oldest_rows(clock):
+    graph = TG.TaskGraph()
+    task_ids = Chain(graph, 10)
+    for task_id in task_ids:
+        graph.mark_completed(task_id)
+    graph.compact(keep_history=6)
+    assert len(graph.history) == 10
+    for task_id in ("Last1", "Last2", "Last3"):
+        graph.add_task(TG.Task(task_id), [])
+        graph.mark_completed(task_id)
+    graph.compact(keep_history=6)
+    assert graph.history.task_ids == ["Step7", "Step8", "Step9", "Last1", "Last2", "Last3"]
+    assert graph.history.status("Step9") == "completed"
+    # Trimmed ids are forgotten
+    graph.add_task(TG.Task("Step0"), [])
+    assert "Step0" in graph.ready_tasks
+
+
+def test_compact_rebuilds_tables_in_place(clock):
+    graph = TG.TaskGraph()
+    task_ids = Chain(graph, 5000)
+    blocked_tasks, full_size = graph.blocked_tasks, sys.getsizeof(graph.blocked_tasks)
+    for task_id in task_ids[:-1]:
+        graph.mark_completed(task_id)
+    graph.compact()
+    assert graph.blocked_tasks is blocked_tasks
+    assert sys.getsizeof(graph.blocked_tasks) < full_size / 100
+    assert list(graph.tasks) == ["Step4999"]
+
+
+def test_executor_bounds_a_long_mission(rover, mission, clock):
+    graph = TG.TaskGraph()
+    previous = []
+    for i in range(300):
+        graph.add_task(TG.Task(f"Waypoint{i}", STU.Command("MoveToCoord", rover)), previous)
+        previous = [f"Waypoint{i}"]
+    executor = TG.TaskGraphExecutor(mission, {rover: graph}, keep_finished=10, keep_history=50)
+    executor.tick()
+    while graph.running_tasks:
+        graph.mark_completed(next(iter(graph.running_tasks)))
+        executor.tick()
+    assert len(graph.finished_order) <= 20
+    assert len(graph.history) <= 100
+    assert graph.history.task_ids[-1] in (f"Waypoint{i}" for i in range(270, 300))
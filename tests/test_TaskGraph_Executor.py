@@ -0,0 +1,77 @@
+# TaskGraphExecutor: one pass per tick over every entity's graph, sending ready commands
+# through the MissionManager in place of a dispatch loop per entity.
+import pytest
+
+pytest.importorskip("spaceteams")
+import API.STU_Common as STU
+import TaskGraph as TG
+from conftest import Rover
+
+
+def Command(rover, command_type: str) -> STU.Command:
+    return STU.Command(command_type, rover)
+
+
+def test_tick_sends_the_ready_commands_of_every_graph(mission, clock):
+    ltv1, ltv2 = Rover("LTV1"), Rover("LTV2")
+    graphs = {ltv1: TG.TaskGraph(), ltv2: TG.TaskGraph()}
+    for en, graph in graphs.items():
+        graph.add_task(TG.Task("Drive", Command(en, "MoveToCoord")), [])
+    executor = TG.TaskGraphExecutor(mission, graphs)
+    stats = executor.tick()
+    assert sorted(name for name, _, _ in mission.sent) == ["LTV1", "LTV2"]
+    assert stats.dispatched == 2
+    assert all(graph.running_tasks == {"Drive"} for graph in graphs.values())
+    assert executor.get_graph(ltv2) is graphs[ltv2]
+
+
+def test_commands_are_sent_once(rover, mission, clock):
+    graph = TG.TaskGraph()
+    graph.add_task(TG.Task("Drive", Command(rover, "MoveToCoord")), [])
+    executor = TG.TaskGraphExecutor(mission, {rover: graph})
+    executor.tick()
+    stats = executor.tick()
+    assert mission.SentTypes() == ["MoveToCoord"]
+    assert stats.dispatched == 0
+    assert graph.get_task("Drive").start_ns == clock.now_ns
+
+
+def test_dependents_are_sent_once_their_dependencies_complete(rover, mission, clock):
+    graph = TG.TaskGraph()
+    graph.add_task(TG.Task("Drive", Command(rover, "MoveToCoord")), [])
+    graph.add_task(TG.Task("Pan", Command(rover, "CameraPan")), ["Drive"])
+    graph.add_task(TG.Task("Capture", Command(rover, "CaptureImage")), ["Pan"])
+    executor = TG.TaskGraphExecutor(mission, {rover: graph})
+    executor.tick()
+    assert mission.SentTypes() == ["MoveToCoord"]
+    graph.mark_completed("Drive")
+    executor.tick()
+    assert mission.SentTypes() == ["MoveToCoord", "CameraPan"]
+    graph.mark_completed("Pan")
+    stats = executor.tick()
+    assert mission.SentTypes() == ["MoveToCoord", "CameraPan", "CaptureImage"]
+    assert stats.ready == 0
+
+
+def test_graph_added_later_is_run_from_the_next_tick(rover, mission, clock):
+    executor = TG.TaskGraphExecutor(mission)
+    executor.tick()
+    graph = TG.TaskGraph()
+    graph.add_task(TG.Task("Drive", Command(rover, "MoveToCoord")), [])
+    executor.add_graph(rover, graph)
+    executor.tick()
+    assert mission.SentTypes() == ["MoveToCoord"]
+
+
+def test_added_graph_keeps_its_running_commands_resources(rover, mission, clock):
+    graph = TG.TaskGraph()
+    graph.add_task(TG.Task("Drive", Command(rover, "MoveToCoord")), [])
+    graph.mark_started("Drive")
+    graph.add_task(TG.Task("Turn", Command(rover, "RotateToAzimuth")), [])
+    executor = TG.TaskGraphExecutor(mission, {rover: graph})
+    executor.tick()
+    # Turn needs mobility, which Drive still holds
+    assert mission.sent == []
+    graph.mark_completed("Drive")
+    executor.tick()
+    assert mission.SentTypes() == ["RotateToAzimuth"]
@@ -0,0 +1,99 @@
+# Failure policies (Propagate, Skip, Fallback) and cancelling a task with everything that depends on it.
+import pytest
+
+pytest.importorskip("spaceteams")
+import API.STU_Common as STU
+import TaskGraph as TG
+
+
+def Chain(graph: TG.TaskGraph, tasks: list):
+    # Each task depends on the one before it; plain task_ids are made into Tasks
+    previous = []
+    for task in tasks:
+        task = task if isinstance(task, TG.Task) else TG.Task(task)
+        graph.add_task(task, previous)
+        previous = [task.task_id]
+
+
+def test_failure_propagates_to_every_descendant(clock):
+    graph = TG.TaskGraph()
+    Chain(graph, ["a", "b", "c"])
+    graph.add_task(TG.Task("other"), [])
+    events = []
+    graph.add_listener(lambda task_id, event: events.append((task_id, event)))
+    graph.mark_failed("a")
+    assert graph.failed_tasks == {"a", "b", "c"}
+    assert graph.ready_tasks == {"other"} and not graph.blocked_tasks
+    assert graph.get_task("c").failed
+    assert sorted(events) == [("a", "failed"), ("b", "failed"), ("c", "failed")]
+
+
+def test_skipped_failure_lets_dependents_run(clock):
+    graph = TG.TaskGraph()
+    a = TG.Task("a")
+    a.on_failure = "Skip"
+    Chain(graph, [a, "b"])
+    graph.mark_failed("a")
+    assert "b" in graph.ready_tasks
+    graph.add_task(TG.Task("later"), ["a"])
+    assert "later" in graph.ready_tasks
+
+
+def test_fallback_runs_and_dependents_wait_on_it(clock):
+    graph = TG.TaskGraph()
+    a = TG.Task("a")
+    a.set_fallback([(TG.Task("f1"), []), (TG.Task("f2"), ["f1"])])
+    Chain(graph, [a, "b"])
+    graph.mark_failed("a")
+    assert graph.ready_tasks == {"f1"}
+    assert graph.dependencies["b"] == {"f2"}
+    graph.mark_completed("f1")
+    graph.mark_completed("f2")
+    assert "b" in graph.ready_tasks
+
+
+def test_failed_fallback_fails_the_dependents(clock):
+    graph = TG.TaskGraph()
+    a = TG.Task("a")
+    a.set_fallback([(TG.Task("f"), [])])
+    Chain(graph, [a, "b"])
+    graph.mark_failed("a")
+    graph.mark_failed("f")
+    assert "b" in graph.failed_tasks
+
+
+def test_dependency_on_a_failed_task_fails_right_away(clock):
+    graph = TG.TaskGraph()
+    graph.add_task(TG.Task("a"), [])
+    graph.mark_failed("a")
+    graph.add_task(TG.Task("b"), ["a"])
+    assert "b" in graph.failed_tasks
+
+
+def test_cancel_takes_the_subtree_with_it(clock):
+    graph = TG.TaskGraph()
+    Chain(graph, ["a", "b", "c"])
+    graph.add_task(TG.Task("d"), ["b"])
+    graph.add_task(TG.Task("other"), [])
+    cancelled = graph.cancel("b")
+    assert cancelled[0] == "b" and sorted(cancelled) == ["b", "c", "d"]
+    assert graph.cancelled_tasks == {"b", "c", "d"}
+    assert graph.ready_tasks == {"a", "other"}
+    # Already finished
+    assert graph.cancel("c") == []
+
+
+def test_cancelling_a_running_move_stops_it(rover, clock):
+    graph = TG.TaskGraph()
+    graph.add_task(TG.Task("Drive", STU.Command("MoveToCoord", rover)), [])
+    graph.add_task(TG.Task("Pan", STU.Command("CameraPan", rover)), [])
+    graph.mark_started("Drive")
+    graph.mark_started("Pan")
+    graph.cancel("Drive")
+    graph.cancel("Pan")
+    # Only moves get a Stop
+    assert graph.ready_tasks == {"Stop_Drive"}
+    assert graph.get_task("Stop_Drive").command.command_type == "Stop"
+    # The stopped move reporting back is ignored
+    graph.mark_failed("Drive")
+    assert "Drive" in graph.cancelled_tasks and "Drive" not in graph.failed_tasks
@@ -0,0 +1,117 @@
+# Dependencies across entities: a task waits on another entity's task through an "External"
+# placeholder in its own graph, which completes or fails when that task does.
+import pytest
+
+pytest.importorskip("spaceteams")
+import TaskGraph as TG
+from conftest import Rover
+
+
+@pytest.fixture
+def fleet(clock):
+    ltv1, ltv2 = Rover("LTV1"), Rover("LTV2")
+    return TG.FleetTaskGraph({ltv1: TG.TaskGraph(), ltv2: TG.TaskGraph()}), ltv1, ltv2
+
+
+def test_qualified_ids_name_the_entity():
+    assert TG.QualifiedID(Rover("LTV2"), "Move2") == "LTV2/Move2"
+    assert TG.SplitQualifiedID("LTV2/Sub/Move2") == ("LTV2", "Sub/Move2")
+
+
+def test_other_entitys_task_releases_the_dependent(fleet):
+    fleet, ltv1, ltv2 = fleet
+    fleet.add_task(ltv1, TG.Task("Arrive"), [])
+    fleet.add_task(ltv2, TG.Task("Charge"), [])
+    fleet.add_task(ltv2, TG.Task("Leave"), ["LTV1/Arrive", "Charge"])
+    fleet.add_task(ltv2, TG.Task("Report"), [(ltv1, "Arrive")])
+    graph2 = fleet.get_graph(ltv2)
+    # Both dependents share one placeholder, which is never sent
+    assert graph2.running_tasks == {"LTV1/Arrive"}
+    assert graph2.get_task("LTV1/Arrive").task_type == "External"
+    assert graph2.dependencies["Leave"] == {"LTV1/Arrive", "Charge"}
+    fleet.mark_completed(ltv1, "Arrive")
+    assert "LTV1/Arrive" in graph2.completed_tasks
+    assert graph2.ready_tasks == {"Charge", "Report"}
+    fleet.mark_completed(ltv2, "Charge")
+    assert "Leave" in graph2.ready_tasks
+
+
+def test_own_qualified_ids_are_local_dependencies(fleet):
+    fleet, ltv1, _ = fleet
+    fleet.add_task(ltv1, TG.Task("a"), [])
+    fleet.add_task(ltv1, TG.Task("b"), ["LTV1/a"])
+    fleet.add_task(ltv1, TG.Task("c"), [(ltv1, "a")])
+    graph = fleet.get_graph(ltv1)
+    assert graph.dependencies["b"] == {"a"} and graph.dependencies["c"] == {"a"}
+    assert set(graph.tasks) == {"a", "b", "c"}
+
+
+def test_dependency_on_a_finished_task_resolves_right_away(fleet):
+    fleet, ltv1, ltv2 = fleet
+    fleet.add_task(ltv1, TG.Task("Arrive"), [])
+    fleet.mark_completed(ltv1, "Arrive")
+    fleet.add_task(ltv2, TG.Task("Leave"), ["LTV1/Arrive"])
+    assert "Leave" in fleet.get_graph(ltv2).ready_tasks
+
+
+def test_failure_reaches_other_entities(fleet):
+    fleet, ltv1, ltv2 = fleet
+    fleet.add_task(ltv1, TG.Task("Arrive"), [])
+    fleet.add_task(ltv2, TG.Task("Leave"), ["LTV1/Arrive"])
+    fleet.mark_failed(ltv1, "Arrive")
+    assert fleet.get_graph(ltv2).failed_tasks == {"LTV1/Arrive", "Leave"}
+    assert sorted(fleet.get_status()["LTV2"]["Failed"]) == ["LTV1/Arrive", "Leave"]
+
+
+def test_placeholder_follows_a_fallback(fleet):
+    fleet, ltv1, ltv2 = fleet
+    arrive = TG.Task("Arrive")
+    arrive.set_fallback([(TG.Task("Detour"), []), (TG.Task("ArriveLate"), ["Detour"])])
+    fleet.add_task(ltv1, arrive, [])
+    fleet.add_task(ltv2, TG.Task("Leave"), ["LTV1/Arrive"])
+    graph2 = fleet.get_graph(ltv2)
+    fleet.mark_failed(ltv1, "Arrive")
+    assert graph2.running_tasks == {"LTV1/Arrive"}
+    fleet.mark_completed(ltv1, "Detour")
+    assert "Leave" in graph2.blocked_tasks
+    fleet.mark_completed(ltv1, "ArriveLate")
+    assert "Leave" in graph2.ready_tasks
+
+
+def test_cancelled_placeholder_cancels_the_task_nothing_else_waits_on(fleet):
+    fleet, ltv1, ltv2 = fleet
+    ltv3 = Rover("LTV3")
+    fleet.add_graph(ltv3, TG.TaskGraph())
+    fleet.add_task(ltv1, TG.Task("Survey"), [])
+    fleet.add_task(ltv1, TG.Task("Shared"), [])
+    fleet.add_task(ltv2, TG.Task("UseSurvey"), ["LTV1/Survey"])
+    fleet.add_task(ltv2, TG.Task("UseShared"), ["LTV1/Shared"])
+    fleet.add_task(ltv3, TG.Task("AlsoShared"), ["LTV1/Shared"])
+    graph1 = fleet.get_graph(ltv1)
+    fleet.get_graph(ltv2).cancel("LTV1/Survey")
+    assert "Survey" in graph1.cancelled_tasks
+    fleet.get_graph(ltv2).cancel("LTV1/Shared")
+    # LTV3 still waits on it
+    assert "Shared" in graph1.ready_tasks
+    fleet.mark_completed(ltv1, "Shared")
+    assert "AlsoShared" in fleet.get_graph(ltv3).ready_tasks
+
+
+def test_validate_reports_tasks_never_added(fleet):
+    fleet, ltv1, ltv2 = fleet
+    fleet.add_task(ltv2, TG.Task("Leave"), ["LTV1/Arrive"])
+    with pytest.raises(ValueError, match="'LTV1/Arrive' is never added"):
+        fleet.validate()
+    # Added later, the placeholder picks it up
+    fleet.add_task(ltv1, TG.Task("Arrive"), [])
+    assert fleet.validate() == ["LTV1/Arrive", "LTV2/Leave"]
+    fleet.mark_completed(ltv1, "Arrive")
+    assert "Leave" in fleet.get_graph(ltv2).ready_tasks
+
+
+def test_validate_finds_cycles_across_entities(fleet):
+    fleet, ltv1, ltv2 = fleet
+    fleet.add_task(ltv1, TG.Task("a"), ["LTV2/b"])
+    fleet.add_task(ltv2, TG.Task("b"), ["LTV1/a"])
+    with pytest.raises(ValueError, match="dependency cycle across entities: \\['LTV1/a', 'LTV2/b'\\]"):
+        fleet.validate()
@@ -0,0 +1,138 @@
+# Priorities and deadlines: ready tasks go most urgent first, and an urgent task waiting on a
+# less urgent move preempts it, with the stopped move's late report told apart and ignored.
+import pytest
+
+pytest.importorskip("spaceteams")
+import API.STU_Common as STU
+import TaskGraph as TG
+
+
+def Command(rover, task_id: str, command_type: str, priority: int = 0, deadline_ns: int = None) -> TG.Task:
+    task = TG.Task(task_id, STU.Command(command_type, rover))
+    task.priority = priority
+    task.deadline_ns = deadline_ns
+    return task
+
+
+def Driving(rover, mission) -> tuple:
+    # A graph whose low-priority move is already running
+    graph = TG.TaskGraph()
+    graph.add_task(Command(rover, "Drive", "MoveToCoord"), [])
+    graph.add_task(TG.Task("Arrived"), ["Drive"])
+    executor = TG.TaskGraphExecutor(mission, {rover: graph})
+    executor.tick()
+    return graph, executor
+
+
+def test_ready_tasks_go_by_priority_then_deadline_then_order(rover, clock):
+    graph = TG.TaskGraph()
+    graph.add_task(Command(rover, "First", "MoveToCoord"), [])
+    graph.add_task(Command(rover, "Later", "MoveToCoord", deadline_ns=9_000_000_000), [])
+    graph.add_task(Command(rover, "Sooner", "MoveToCoord", deadline_ns=5_000_000_000), [])
+    graph.add_task(Command(rover, "Urgent", "RotateToAzimuth", priority=2), [])
+    graph.add_task(Command(rover, "Second", "RotateToAzimuth"), [])
+    assert graph.ready_by_priority() == ["Urgent", "Sooner", "Later", "First", "Second"]
+    assert graph.next_ready("mobility") == "Urgent"
+    graph.set_priority("Second", 3)
+    graph.set_priority("Urgent", 0)
+    assert graph.ready_by_priority() == ["Second", "Sooner", "Later", "First", "Urgent"]
+    assert graph.next_ready("mobility") == "Second"
+
+
+def test_preempt_stops_the_move_and_queues_it_again(rover, clock):
+    graph = TG.TaskGraph()
+    graph.add_task(Command(rover, "Drive", "MoveToCoord"), [])
+    graph.add_task(Command(rover, "Other", "MoveToCoord"), [])
+    graph.add_task(TG.Task("Arrived"), ["Drive"])
+    events = []
+    graph.add_listener(lambda task_id, event: events.append((task_id, event)))
+    graph.mark_started("Drive")
+    stop_id = graph.preempt("Drive", priority=5)
+    stop = graph.get_task(stop_id)
+    assert (stop_id, stop.command.command_type, stop.priority) == ("Stop_Drive", "Stop", 5)
+    drive = graph.get_task("Drive")
+    assert drive.resends == 1 and drive.preempted and not drive.started
+    # Back ahead of the task of its own priority that was already waiting
+    assert graph.next_ready("mobility") == "Drive"
+    assert "Arrived" in graph.blocked_tasks
+    assert ("Drive", "preempted") in events
+    # Only running moves can be preempted
+    assert graph.preempt("Other") is None and graph.preempt("Drive") is None
+
+
+def test_stale_report_after_preempt_is_ignored(rover, clock):
+    graph = TG.TaskGraph()
+    graph.add_task(Command(rover, "Drive", "MoveToCoord"), [])
+    graph.add_task(TG.Task("Arrived"), ["Drive"])
+    graph.mark_started("Drive")
+    graph.preempt("Drive")
+    graph.mark_started("Drive")
+    # The stopped command fails with "Stop command received"
+    graph.mark_failed("Drive")
+    assert graph.running_tasks == {"Drive"} and not graph.failed_tasks
+    graph.mark_completed("Drive")
+    assert "Arrived" in graph.ready_tasks
+
+
+def test_reports_with_a_resend_count_are_matched_exactly(rover, clock):
+    graph = TG.TaskGraph()
+    graph.add_task(Command(rover, "Drive", "MoveToCoord"), [])
+    graph.mark_started("Drive")
+    graph.preempt("Drive")
+    graph.mark_started("Drive")
+    graph.preempt("Drive")
+    graph.mark_started("Drive")
+    graph.mark_failed("Drive", resend=0)
+    graph.mark_completed("Drive", resend=1)
+    assert graph.running_tasks == {"Drive"}
+    graph.mark_completed("Drive", resend=2)
+    assert "Drive" in graph.completed_tasks
+
+
+def test_urgent_move_preempts_and_goes_out_after_the_stop(rover, mission, clock):
+    graph, executor = Driving(rover, mission)
+    graph.add_task(Command(rover, "Evade", "MoveToCoord", priority=5), [])
+    stats = executor.tick()
+    assert stats.preempted == 1
+    assert mission.SentTypes() == ["MoveToCoord", "Stop", "MoveToCoord"]
+    assert mission.sent[-1][2] is graph.get_task("Evade").command
+    assert graph.running_tasks == {"Stop_Drive", "Evade"} and "Drive" in graph.ready_tasks
+    graph.mark_failed("Drive")
+    graph.mark_completed("Stop_Drive")
+    graph.mark_completed("Evade")
+    executor.tick()
+    # The preempted move goes out again once the mobility is free
+    assert mission.SentTypes()[-1] == "MoveToCoord" and graph.running_tasks == {"Drive"}
+
+
+def test_hook_can_veto_a_preemption(rover, mission, clock):
+    graph, executor = Driving(rover, mission)
+    asked = []
+    executor.add_preempt_hook(lambda en, running, urgent: asked.append((running.task_id, urgent.task_id)) or False)
+    graph.add_task(Command(rover, "Evade", "MoveToCoord", priority=5), [])
+    stats = executor.tick()
+    assert asked == [("Drive", "Evade")]
+    assert stats.preempted == 0 and mission.SentTypes() == ["MoveToCoord"]
+    assert graph.running_tasks == {"Drive"} and graph.ready_tasks == {"Evade"}
+
+
+def test_no_preemption_of_non_preemptible_or_equally_urgent_moves(rover, mission, clock):
+    graph, executor = Driving(rover, mission)
+    graph.add_task(Command(rover, "Same", "MoveToCoord"), [])
+    assert executor.tick().preempted == 0
+    graph.get_task("Drive").preemptible = False
+    graph.add_task(Command(rover, "Evade", "MoveToCoord", priority=5), [])
+    assert executor.tick().preempted == 0
+    assert graph.running_tasks == {"Drive"}
+    # Once the mobility is free the urgent task goes first
+    graph.mark_completed("Drive")
+    executor.tick()
+    assert graph.running_tasks == {"Evade"} and graph.ready_tasks == {"Same"}
+
+
+def test_tasks_sent_after_their_deadline_are_late(rover, mission, clock):
+    graph = TG.TaskGraph()
+    graph.add_task(Command(rover, "Pan", "CameraPan", deadline_ns=clock.now_ns - 1), [])
+    graph.add_task(Command(rover, "Drive", "MoveToCoord", deadline_ns=clock.now_ns + 1), [])
+    stats = TG.TaskGraphExecutor(mission, {rover: graph}).tick()
+    assert (stats.dispatched, stats.late) == (2, 1)
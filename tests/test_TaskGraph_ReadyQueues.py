@@ -0,0 +1,103 @@
+# Ready, running and blocked bookkeeping: every unfinished task is in exactly one of them, and
+# ready tasks are found without scanning the graph.
+import pytest
+
+pytest.importorskip("spaceteams")
+import API.STU_Common as STU
+import TaskGraph as TG
+
+
+def test_tasks_move_from_blocked_to_ready_to_running(clock):
+    graph = TG.TaskGraph()
+    graph.add_task(TG.Task("a"), [])
+    graph.add_task(TG.Task("b"), ["a"])
+    assert graph.ready_tasks == {"a"} and graph.blocked_tasks == {"b"}
+    assert graph.pending_tasks == {"a"}
+    graph.mark_started("a")
+    assert graph.running_tasks == {"a"} and not graph.ready_tasks
+    assert graph.pending_tasks == {"a"}
+    graph.mark_completed("a")
+    assert graph.completed_tasks == {"a"}
+    assert graph.ready_tasks == {"b"} and not graph.blocked_tasks
+    assert graph.get_status() == {"Ready": ["b"], "Running": [], "Blocked": [], "Pending": ["b"],
+                                  "Completed": ["a"], "Failed": [], "Cancelled": []}
+
+
+def test_drain_ready_gives_newly_ready_tasks_in_order(clock):
+    graph = TG.TaskGraph()
+    for task_id in ("a", "b", "c"):
+        graph.add_task(TG.Task(task_id), [])
+    graph.mark_started("b")
+    assert graph.drain_ready() == ["a", "c"]
+    assert graph.drain_ready() == []
+    graph.add_task(TG.Task("d"), ["a"])
+    graph.mark_completed("a")
+    assert graph.drain_ready() == ["d"]
+
+
+def test_a_task_waits_for_all_its_dependencies(clock):
+    graph = TG.TaskGraph()
+    graph.add_task(TG.Task("a"), [])
+    graph.add_task(TG.Task("b"), [])
+    graph.add_task(TG.Task("c"), ["a", "b"])
+    graph.mark_completed("b")
+    assert "c" in graph.blocked_tasks
+    assert graph.dependencies["c"] == {"a"}
+    graph.mark_completed("a")
+    assert "c" in graph.ready_tasks
+
+
+def test_completed_dependencies_are_ignored(clock):
+    graph = TG.TaskGraph()
+    graph.add_task(TG.Task("a"), [])
+    graph.mark_completed("a")
+    graph.add_task(TG.Task("b"), ["a"])
+    assert "b" in graph.ready_tasks
+
+
+def test_next_ready_looks_only_at_the_tasks_resources(rover, clock):
+    graph = TG.TaskGraph()
+    graph.add_task(TG.Task("Drive", STU.Command("MoveToCoord", rover)), [])
+    graph.add_task(TG.Task("Grab", STU.Command("PickUpAntenna", rover)), [])
+    graph.add_task(TG.Task("Milestone"), [])
+    assert graph.next_ready("mobility") == "Drive"
+    assert graph.next_ready("manipulator+mobility") == "Grab"
+    assert graph.next_ready("camera") is None
+    # A task without a command uses no resources
+    assert graph.next_ready("") == "Milestone"
+    assert graph.ready_by_priority() == ["Drive", "Grab", "Milestone"]
+    graph.mark_started("Drive")
+    assert graph.next_ready("mobility") is None
+
+
+def test_reports_for_unknown_or_finished_tasks_are_ignored(clock):
+    graph = TG.TaskGraph()
+    graph.add_task(TG.Task("a"), [])
+    graph.mark_completed("a")
+    version = graph.version
+    graph.mark_failed("a")
+    graph.mark_completed("nope")
+    assert graph.completed_tasks == {"a"} and not graph.failed_tasks
+    assert graph.version == version
+
+
+def test_listeners_hear_every_change(clock):
+    graph = TG.TaskGraph()
+    events = []
+    graph.add_listener(lambda task_id, event: events.append((task_id, event)))
+    graph.add_task(TG.Task("a"), [])
+    graph.add_task(TG.Task("b"), ["a"])
+    graph.mark_started("a")
+    graph.mark_failed("a")
+    assert events == [("a", "added"), ("b", "added"), ("a", "started"), ("b", "failed"), ("a", "failed")]
+
+
+def test_clear_all_empties_the_graph(clock):
+    graph = TG.TaskGraph()
+    graph.add_task(TG.Task("a"), [])
+    graph.add_task(TG.Task("b"), ["a"])
+    graph.clear_all()
+    assert not graph.tasks and not graph.ready_tasks and not graph.blocked_tasks
+    assert graph.drain_ready() == []
+    graph.add_task(TG.Task("a"), [])
+    assert "a" in graph.ready_tasks
@@ -0,0 +1,66 @@
+# Resource-aware concurrency: an entity runs commands that use different resources at the
+# same time, and ones that share a resource one after another.
+import pytest
+
+pytest.importorskip("spaceteams")
+import API.STU_Common as STU
+import TaskGraph as TG
+
+
+def Command(rover, command_type: str) -> STU.Command:
+    return STU.Command(command_type, rover)
+
+
+def test_resources_come_from_the_command_type(rover):
+    assert TG.TaskResources(TG.Task("Drive", Command(rover, "MoveToCoord"))) == {"mobility"}
+    assert TG.TaskResources(TG.Task("Grab", Command(rover, "PickUpAntenna"))) == {"manipulator", "mobility"}
+    # Unlisted types use a resource named after the type
+    assert TG.TaskResources(TG.Task("Beep", Command(rover, "Beep"))) == {"Beep"}
+
+
+def test_task_resources_override_the_command_type(rover):
+    task = TG.Task("Drive", Command(rover, "MoveToCoord"))
+    task.resources = {"mobility", "camera"}
+    assert TG.TaskResources(task) == {"mobility", "camera"}
+
+
+def test_task_without_a_command_uses_no_resources():
+    task = TG.Task("a")
+    assert TG.TaskResources(task) == frozenset()
+    graph = TG.TaskGraph()
+    graph.add_task(task, [])
+    assert "a" in graph.ready_tasks
+
+
+def test_task_without_a_command_completes_when_dispatched(rover, mission, clock):
+    graph = TG.TaskGraph()
+    graph.add_task(TG.Task("Milestone"), [])
+    graph.add_task(TG.Task("Drive", Command(rover, "MoveToCoord")), ["Milestone"])
+    executor = TG.TaskGraphExecutor(mission, {rover: graph})
+    executor.tick()
+    assert graph.get_task("Milestone").completed
+    assert mission.SentTypes() == ["MoveToCoord"]
+
+
+def test_different_resources_run_together(rover, mission, clock):
+    graph = TG.TaskGraph()
+    graph.add_task(TG.Task("Drive", Command(rover, "MoveToCoord")), [])
+    graph.add_task(TG.Task("Pan", Command(rover, "CameraPan")), [])
+    executor = TG.TaskGraphExecutor(mission, {rover: graph})
+    executor.tick()
+    assert sorted(mission.SentTypes()) == ["CameraPan", "MoveToCoord"]
+    assert graph.running_tasks == {"Drive", "Pan"}
+
+
+def test_shared_resource_runs_one_at_a_time(rover, mission, clock):
+    graph = TG.TaskGraph()
+    graph.add_task(TG.Task("Drive", Command(rover, "MoveToCoord")), [])
+    graph.add_task(TG.Task("Grab", Command(rover, "PickUpAntenna")), [])
+    executor = TG.TaskGraphExecutor(mission, {rover: graph})
+    executor.tick()
+    assert mission.SentTypes() == ["MoveToCoord"]
+    executor.tick()
+    assert mission.SentTypes() == ["MoveToCoord"]
+    graph.mark_completed("Drive")
+    executor.tick()
+    assert mission.SentTypes() == ["MoveToCoord", "PickUpAntenna"]
@@ -0,0 +1,113 @@
+# Retrying sends while an entity is out of comms: the entity waits as its RetryPolicy says,
+# nothing else is sent for it meanwhile, and reported comms end the wait early.
+import pytest
+
+pytest.importorskip("spaceteams")
+import API.STU_Common as STU
+import TaskGraph as TG
+
+
+class Fleet:
+    # Stands in for an EntityTelemetry.FleetState; update_comms() only reads has_comms
+    def __init__(self, entities: list, has_comms: list):
+        self.entities = entities
+        self.has_comms = has_comms
+
+    def Index(self, en) -> int:
+        return self.entities.index(en)
+
+
+def Command(rover, task_id: str, command_type: str) -> TG.Task:
+    return TG.Task(task_id, STU.Command(command_type, rover))
+
+
+def test_exponential_delays_are_capped():
+    policy = TG.RetryPolicy(initial_delay_s=0.5, max_delay_s=3.0, multiplier=2.0)
+    assert [policy.delay_s(attempts) for attempts in range(1, 6)] == [0.5, 1.0, 2.0, 3.0, 3.0]
+    assert TG.RetryPolicy("Comms", max_delay_s=30.0).delay_s(1) == 30.0
+
+
+def test_out_of_comms_entity_waits_before_sending_again(rover, mission, clock):
+    graph = TG.TaskGraph()
+    graph.add_task(Command(rover, "Drive", "MoveToCoord"), [])
+    graph.add_task(Command(rover, "Capture", "CaptureImage"), [])
+    executor = TG.TaskGraphExecutor(mission, {rover: graph}, default_retry=TG.RetryPolicy(initial_delay_s=1.0))
+    mission.out_of_comms.add(rover)
+    stats = executor.tick()
+    # The first refused send stops the rest of the entity's commands for this tick
+    assert stats.deferred == 1 and stats.waiting_entities == 1
+    mission.out_of_comms.clear()
+    clock.advance(0.5)
+    assert executor.tick().dispatched == 0
+    assert graph.ready_tasks == {"Drive", "Capture"}
+    clock.advance(0.5)
+    stats = executor.tick()
+    assert stats.dispatched == 2 and stats.waiting_entities == 0
+    assert sorted(mission.SentTypes()) == ["CaptureImage", "MoveToCoord"]
+
+
+def test_backoff_grows_with_each_refused_send(rover, mission, clock):
+    graph = TG.TaskGraph()
+    graph.add_task(Command(rover, "Drive", "MoveToCoord"), [])
+    executor = TG.TaskGraphExecutor(mission, {rover: graph}, default_retry=TG.RetryPolicy(initial_delay_s=1.0))
+    mission.out_of_comms.add(rover)
+    deferred = []
+    for _ in range(8):
+        deferred.append(executor.tick().deferred)
+        clock.advance(1.0)
+    # Sends are tried after waits of 1, 2 and 4 s
+    assert deferred == [1, 1, 0, 1, 0, 0, 0, 1]
+    assert graph.get_task("Drive").send_attempts == 4
+
+
+def test_reported_comms_end_the_wait(rover, mission, clock):
+    graph = TG.TaskGraph()
+    graph.add_task(Command(rover, "Drive", "MoveToCoord"), [])
+    executor = TG.TaskGraphExecutor(mission, {rover: graph}, default_retry=TG.RetryPolicy("Comms", max_delay_s=60.0))
+    mission.out_of_comms.add(rover)
+    executor.tick()
+    assert executor.needs_telemetry()
+    mission.out_of_comms.clear()
+    executor.update_comms(Fleet([rover], [False]))
+    assert executor.tick().dispatched == 0
+    executor.update_comms(Fleet([rover], [True]))
+    assert not executor.needs_telemetry()
+    assert executor.tick().dispatched == 1
+    assert graph.running_tasks == {"Drive"}
+
+
+def test_task_fails_after_max_attempts(rover, mission, clock):
+    graph = TG.TaskGraph()
+    drive = Command(rover, "Drive", "MoveToCoord")
+    drive.retry = TG.RetryPolicy(max_attempts=2, initial_delay_s=1.0)
+    graph.add_task(drive, [])
+    graph.add_task(Command(rover, "Capture", "CaptureImage"), ["Drive"])
+    graph.add_task(Command(rover, "Pan", "CameraPan"), [])
+    executor = TG.TaskGraphExecutor(mission, {rover: graph})
+    mission.out_of_comms.add(rover)
+    executor.tick()
+    clock.advance(1.0)
+    stats = executor.tick()
+    assert stats.gave_up == 1
+    assert drive.failure_reason == "NoComms"
+    assert graph.failed_tasks == {"Drive", "Capture"}
+    # Giving up leaves no wait behind; the entity's next command is tried on the next tick
+    assert not executor.waiting
+    mission.out_of_comms.clear()
+    executor.tick()
+    assert mission.SentTypes() == ["CameraPan"]
+
+
+def test_timers_run_while_the_entity_waits(rover, mission, clock):
+    graph = TG.TaskGraph()
+    graph.add_task(Command(rover, "Drive", "MoveToCoord"), [])
+    timer = TG.Task("Wait")
+    timer.task_type = "Timer"
+    timer.timer_duration = 2.0
+    graph.add_task(timer, [])
+    executor = TG.TaskGraphExecutor(mission, {rover: graph}, default_retry=TG.RetryPolicy(initial_delay_s=10.0))
+    mission.out_of_comms.add(rover)
+    assert executor.tick().timers_started == 1
+    clock.advance(2.0)
+    assert executor.tick().timers_completed == 1
+    assert "Wait" in graph.completed_tasks and "Drive" in graph.ready_tasks
@@ -0,0 +1,104 @@
+# Splicing a detour subgraph in place of a task: the rest of the plan waits on the detour's final
+# tasks instead, and a running move is stopped unless its command has already failed.
+import pytest
+
+pytest.importorskip("spaceteams")
+import API.STU_Common as STU
+import TaskGraph as TG
+
+
+def Move(rover, task_id: str) -> TG.Task:
+    return TG.Task(task_id, STU.Command("MoveToCoord", rover))
+
+
+def Detour(rover) -> list:
+    return [(Move(rover, "Back"), []), (Move(rover, "Around"), ["Back"]), (TG.Task("Look"), ["Back"])]
+
+
+def Driving(rover) -> TG.TaskGraph:
+    graph = TG.TaskGraph()
+    graph.add_task(Move(rover, "Drive"), [])
+    graph.add_task(TG.Task("Survey"), ["Drive"])
+    graph.mark_started("Drive")
+    return graph
+
+
+def test_splice_stops_a_running_move(rover, clock):
+    graph = Driving(rover)
+    final_ids = graph.splice("Drive", Detour(rover))
+    assert final_ids == ["Around", "Look"]
+    assert "Drive" in graph.cancelled_tasks
+    assert graph.ready_tasks == {"Stop_Drive", "Back"}
+    assert graph.dependencies["Survey"] == {"Around", "Look"}
+    # Survey was handed over, not cancelled along with Drive
+    assert "Survey" in graph.blocked_tasks
+    for task_id in ("Back", "Around", "Look"):
+        graph.mark_completed(task_id)
+    assert "Survey" in graph.ready_tasks
+
+
+def test_splice_of_a_failed_command_sends_no_stop(rover, clock):
+    graph = Driving(rover)
+    drive = graph.get_task("Drive")
+    drive.set_fallback([(TG.Task("Fallback"), [])])
+    graph.splice("Drive", Detour(rover), failed=True)
+    assert "Drive" in graph.failed_tasks and drive.failed
+    assert "Stop_Drive" not in graph.tasks and "Fallback" not in graph.tasks
+    assert graph.dependencies["Survey"] == {"Around", "Look"}
+    # The failure reaction that called splice() marking it failed is ignored
+    graph.mark_failed("Drive")
+    assert "Survey" in graph.blocked_tasks and "Fallback" not in graph.tasks
+
+
+def test_first_tasks_inherit_what_the_task_waited_on(rover, clock):
+    graph = TG.TaskGraph()
+    graph.add_task(TG.Task("Charge"), [])
+    graph.add_task(Move(rover, "Drive"), ["Charge"])
+    graph.add_task(TG.Task("Survey"), ["Drive"])
+    graph.splice("Drive", Detour(rover))
+    assert graph.dependencies["Back"] == {"Charge"}
+    assert graph.dependencies["Look"] == {"Back"}
+    assert "Drive" in graph.cancelled_tasks and "Stop_Drive" not in graph.tasks
+    graph.mark_completed("Charge")
+    assert graph.ready_tasks == {"Back"}
+
+
+def test_tasks_added_later_wait_on_the_detour(rover, clock):
+    graph = TG.TaskGraph()
+    graph.add_task(Move(rover, "Drive"), [])
+    graph.mark_failed("Drive")
+    graph.splice("Drive", [(Move(rover, "Retry"), [])])
+    graph.add_task(TG.Task("Survey"), ["Drive"])
+    assert graph.dependencies["Survey"] == {"Retry"}
+    graph.mark_completed("Retry")
+    assert "Survey" in graph.ready_tasks
+
+
+def test_a_failed_detour_fails_the_dependents(rover, clock):
+    graph = Driving(rover)
+    graph.splice("Drive", [(Move(rover, "Retry"), [])], failed=True)
+    graph.mark_failed("Retry")
+    assert graph.failed_tasks == {"Drive", "Retry", "Survey"}
+
+
+def test_splice_refuses_bad_requests_and_leaves_the_graph_unchanged(rover, clock):
+    graph = Driving(rover)
+    graph.add_task(TG.Task("Done"), [])
+    graph.mark_completed("Done")
+    graph.add_task(TG.Task("Dropped"), [])
+    graph.cancel("Dropped")
+    version = graph.version
+    with pytest.raises(ValueError, match="only blocked, ready, running or failed"):
+        graph.splice("Done", Detour(rover))
+    with pytest.raises(ValueError, match="only blocked, ready, running or failed"):
+        graph.splice("Dropped", Detour(rover))
+    with pytest.raises(ValueError, match="only blocked, ready, running or failed"):
+        graph.splice("Nope", Detour(rover))
+    with pytest.raises(ValueError, match="empty subgraph"):
+        graph.splice("Drive", [])
+    with pytest.raises(ValueError, match="\\['Survey'\\] are already in the graph or used twice"):
+        graph.splice("Drive", [(TG.Task("Survey"), [])])
+    with pytest.raises(ValueError, match="\\['Back'\\] are already in the graph or used twice"):
+        graph.splice("Drive", [(TG.Task("Back"), []), (TG.Task("Back"), [])])
+    assert graph.version == version
+    assert graph.running_tasks == {"Drive"} and graph.dependencies["Survey"] == {"Drive"}
@@ -0,0 +1,92 @@
+# Timer tasks and command timeouts, run from a min-heap of sim-time deadlines.
+import pytest
+
+pytest.importorskip("spaceteams")
+import API.STU_Common as STU
+import TaskGraph as TG
+
+
+def Timer(task_id: str, duration_s: float) -> TG.Task:
+    task = TG.Task(task_id)
+    task.task_type = "Timer"
+    task.timer_duration = duration_s
+    return task
+
+
+def test_timer_service_pops_expired_items_earliest_first():
+    timers = TG.TimerService()
+    timers.add(30, "c")
+    timers.add(10, "a")
+    timers.add(20, "b")
+    timers.add(10, "a2")
+    assert timers.next_deadline() == 10
+    assert timers.pop_expired(20) == ["a", "a2", "b"]
+    assert len(timers) == 1
+    assert timers.pop_expired(29) == []
+    assert timers.pop_expired(30) == ["c"]
+    assert timers.next_deadline() is None
+
+
+def test_timer_task_completes_once_its_duration_has_passed(rover, mission, clock):
+    graph = TG.TaskGraph()
+    graph.add_task(Timer("Wait", 5.0), [])
+    graph.add_task(TG.Task("After"), ["Wait"])
+    executor = TG.TaskGraphExecutor(mission, {rover: graph})
+    stats = executor.tick()
+    assert stats.timers_started == 1
+    assert graph.running_tasks == {"Wait"}
+    clock.advance(4.9)
+    executor.tick()
+    assert graph.running_tasks == {"Wait"}
+    clock.advance(0.1)
+    stats = executor.tick()
+    assert stats.timers_completed == 1
+    assert "Wait" in graph.completed_tasks
+    assert graph.get_task("Wait").end_ns - graph.get_task("Wait").start_ns == 5_000_000_000
+
+
+def test_command_that_never_reports_back_times_out(rover, mission, clock):
+    graph = TG.TaskGraph()
+    graph.add_task(TG.Task("Drive", STU.Command("MoveToCoord", rover)), [])
+    executor = TG.TaskGraphExecutor(mission, {rover: graph}, default_timeout_s=10.0)
+    executor.tick()
+    clock.advance(9.0)
+    assert executor.tick().timed_out == 0
+    clock.advance(1.0)
+    assert executor.tick().timed_out == 1
+    assert "Drive" in graph.failed_tasks
+    assert graph.get_task("Drive").failure_reason == "Timeout"
+    # The move is stopped, and the Stop goes out on the next tick
+    executor.tick()
+    assert mission.SentTypes() == ["MoveToCoord", "Stop"]
+
+
+def test_task_timeout_overrides_the_default(rover, mission, clock):
+    graph = TG.TaskGraph()
+    task = TG.Task("Grab", STU.Command("PickUpAntenna", rover))
+    task.timeout_s = 30.0
+    graph.add_task(task, [])
+    executor = TG.TaskGraphExecutor(mission, {rover: graph}, default_timeout_s=10.0)
+    executor.tick()
+    clock.advance(20.0)
+    executor.tick()
+    assert graph.running_tasks == {"Grab"}
+    graph.mark_completed("Grab")
+    clock.advance(20.0)
+    # The expired timeout is for a task that already completed
+    assert executor.tick().timed_out == 0
+
+
+def test_running_timer_in_an_added_graph_ends_on_time(rover, mission, clock):
+    graph = TG.TaskGraph()
+    timer = Timer("Wait", 10.0)
+    graph.add_task(timer, [])
+    graph.mark_started("Wait")
+    timer.timer_start = clock.now_ns
+    clock.advance(6.0)
+    executor = TG.TaskGraphExecutor(mission, {rover: graph})
+    executor.tick()
+    assert graph.running_tasks == {"Wait"}
+    clock.advance(4.0)
+    executor.tick()
+    assert "Wait" in graph.completed_tasks
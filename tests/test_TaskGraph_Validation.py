@@ -0,0 +1,80 @@
+# Validation: duplicate ids and cycles are refused when the task is added, and validate() finds
+# whatever would stall the plan before the mission starts.
+import pytest
+
+pytest.importorskip("spaceteams")
+import TaskGraph as TG
+
+
+def test_duplicate_id_is_refused_and_the_graph_unchanged(clock):
+    graph = TG.TaskGraph()
+    graph.add_task(TG.Task("a"), [])
+    first = graph.get_task("a")
+    version = graph.version
+    with pytest.raises(ValueError, match="already has a task with id 'a'"):
+        graph.add_task(TG.Task("a"), [])
+    assert graph.get_task("a") is first
+    assert graph.version == version
+
+
+def test_unique_id_skips_taken_ids(clock):
+    graph = TG.TaskGraph()
+    assert graph.unique_id("Retry") == "Retry"
+    graph.add_task(TG.Task("Retry"), [])
+    graph.add_task(TG.Task("Retry_2"), [])
+    assert graph.unique_id("Retry") == "Retry_3"
+
+
+def test_self_dependency_is_a_cycle(clock):
+    graph = TG.TaskGraph()
+    with pytest.raises(ValueError, match="a -> a"):
+        graph.add_task(TG.Task("a"), ["a"])
+    assert not graph.tasks
+
+
+def test_cycle_through_forward_references_is_refused(clock):
+    graph = TG.TaskGraph()
+    # b and c name tasks that are not added yet
+    graph.add_task(TG.Task("b"), ["a"])
+    graph.add_task(TG.Task("c"), ["b"])
+    with pytest.raises(ValueError, match="cycle: c -> a -> b -> c"):
+        graph.add_task(TG.Task("a"), ["c"])
+    assert "a" not in graph.tasks
+    assert graph.unresolved_dependencies() == {"a": ["b"]}
+    graph.add_task(TG.Task("a"), [])
+    assert graph.validate() == ["a", "b", "c"]
+
+
+def test_unknown_dependencies_wait_until_added(clock):
+    graph = TG.TaskGraph()
+    graph.add_task(TG.Task("b"), ["a"])
+    assert "b" in graph.blocked_tasks
+    assert graph.unresolved_dependencies() == {"a": ["b"]}
+    with pytest.raises(ValueError, match="'a' is never added, but \\['b'\\] depend on it"):
+        graph.validate()
+    graph.add_task(TG.Task("a"), [])
+    assert graph.unresolved_dependencies() == {}
+    graph.mark_completed("a")
+    assert "b" in graph.ready_tasks
+
+
+def test_validate_gives_a_topological_order_of_unfinished_tasks(clock):
+    graph = TG.TaskGraph()
+    graph.add_task(TG.Task("a"), [])
+    graph.add_task(TG.Task("b"), ["a"])
+    graph.add_task(TG.Task("c"), ["a"])
+    graph.add_task(TG.Task("d"), ["b", "c"])
+    order = graph.validate()
+    assert order[0] == "a" and order[-1] == "d" and sorted(order) == ["a", "b", "c", "d"]
+    graph.mark_completed("a")
+    assert graph.validate()[-1] == "d" and "a" not in graph.validate()
+
+
+def test_validate_finds_fallbacks_that_reuse_ids(clock):
+    graph = TG.TaskGraph()
+    graph.add_task(TG.Task("Detour"), [])
+    drive = TG.Task("Drive")
+    drive.set_fallback([(TG.Task("Detour"), []), (TG.Task("Back"), []), (TG.Task("Back"), [])])
+    graph.add_task(drive, [])
+    with pytest.raises(ValueError, match="fallback of 'Drive' reuses task ids \\['Back', 'Detour'\\]"):
+        graph.validate()